@@ -0,0 +1,83 @@
+"""
+Per-request overhead of adding the token to a request: oauthlib's `add_token` vs
+the precomputed `Authorization` header (`OAUTH2_CLIENT_FAST_AUTH_HEADER`).
+
+Measures adding the token alone, and whole requests made through the client
+with a transport adapter answering in memory, so no network is involved.
+No database is needed. Run from the project root:
+
+    python benchmarks/auth_header.py [iterations]
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from test_case import setup_django  # noqa: E402
+
+setup_django()
+
+from django.test.utils import override_settings  # noqa: E402
+from requests import Response  # noqa: E402
+from requests.adapters import BaseAdapter  # noqa: E402
+
+from oauth2_client.client import OAuth2Client, TokenSnapshot  # noqa: E402
+from oauth2_client.models import Application  # noqa: E402
+from oauth2_client.tokens import TokenValue, deadline_in  # noqa: E402
+
+
+class InMemoryAdapter(BaseAdapter):
+    """
+    Answers every request with an empty 200 response.
+    """
+
+    def send(self, request, **kwargs):
+        response = Response()
+        response.status_code = 200
+        response.request = request
+        response.url = request.url
+        response._content = b''
+        return response
+
+    def close(self):
+        pass
+
+
+def timed(func, iterations):
+    """
+    Returns:
+        float: microseconds per call of `func`
+    """
+    start = time.time()
+    for _ in range(iterations):
+        func()
+    return (time.time() - start) / iterations * 1e6
+
+
+def run(iterations):
+    app = Application(
+        name='benchmark', client_id='client_id', service_host='https://benchmark.local',
+        authorization_grant_type=Application.GRANT_CLIENT_CREDENTIALS,
+    )
+    token = TokenValue('access_token', 'Bearer', 'read write', deadline_in(3600), app.name)
+    snapshot = TokenSnapshot(app.client_id, token.to_client_dict())
+    client = OAuth2Client(token, app)
+    client.mount('https://', InMemoryAdapter())
+    headers = {'Accept': 'application/json'}
+    return (
+        timed(lambda: snapshot.add_token('GET', 'https://benchmark.local/api/', None, headers), iterations),
+        timed(lambda: client.get('/api/', headers=headers), iterations),
+    )
+
+
+def main(iterations):
+    print('{:<10} {:>16} {:>16}'.format('mode', 'add_token us', 'request us'))
+    for fast in (False, True):
+        with override_settings(OAUTH2_CLIENT_FAST_AUTH_HEADER=fast):
+            add_token, request = run(iterations)
+        print('{:<10} {:>16.2f} {:>16.2f}'.format('fast' if fast else 'oauthlib', add_token, request))
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 20000)
@@ -0,0 +1,73 @@
+"""
+Request compression benchmark: throughput versus CPU of the request compression
+encodings and levels (see `oauth2_client.compression`), on a JSON payload of the
+given size. For each installed encoding and level it prints the compression ratio,
+the CPU time and speed of compressing, and the time to send the payload over a
+link of the given bandwidth, compressing included. No database is needed. Run from
+the project root:
+
+    python benchmarks/compression.py [payload MB] [link Mbit/s]
+"""
+import json
+import os
+import random
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from auth_header import timed  # noqa: E402
+
+from oauth2_client.compression import COMPRESSORS, load_compressor  # noqa: E402
+
+LEVELS = {'gzip': (1, 6, 9), 'zstd': (1, 3, 9), 'br': (1, 4, 6)}
+
+
+def payload(size):
+    """
+    Returns:
+        bytes: JSON of records looking like API data, about `size` bytes long
+    """
+    rand = random.Random(0)
+    records = []
+    length = 0
+    while length < size:
+        record = {
+            'id': rand.randint(1, 10 ** 9),
+            'name': 'user-{}'.format(rand.randint(1, 10 ** 6)),
+            'email': 'user{}@example.com'.format(rand.randint(1, 10 ** 6)),
+            'score': rand.random() * 100,
+            'active': rand.random() > 0.5,
+            'tags': rand.sample(['alpha', 'beta', 'gamma', 'delta', 'epsilon', 'zeta'], 3),
+        }
+        records.append(record)
+        length += len(json.dumps(record)) + 2
+    return json.dumps({'results': records}).encode('utf-8')
+
+
+def main(size_mb, link_mbit):
+    body = payload(int(size_mb * 1024 * 1024))
+    link = link_mbit * 1e6 / 8  # bytes per second
+    print('payload {:.1f} MB, link {:.0f} Mbit/s, uncompressed transfer {:.1f} ms'.format(
+        len(body) / 1048576.0, link_mbit, len(body) / link * 1e3
+    ))
+    print('{:<12} {:>8} {:>12} {:>10} {:>14}'.format('encoding', 'ratio', 'compress ms', 'MB/s', 'transfer ms'))
+    for encoding in COMPRESSORS:
+        for level in LEVELS[encoding]:
+            try:
+                compressor = load_compressor(encoding, level)
+            except ImportError:
+                print('{:<12} not installed'.format(encoding))
+                break
+            compressed = compressor.compress(body)
+            seconds = timed(lambda: compressor.compress(body), 3) / 1e6
+            print('{:<12} {:>8.2f} {:>12.1f} {:>10.1f} {:>14.1f}'.format(
+                '{}-{}'.format(encoding, level), len(body) / float(len(compressed)), seconds * 1e3,
+                len(body) / 1048576.0 / seconds, (seconds + len(compressed) / link) * 1e3
+            ))
+
+
+if __name__ == '__main__':
+    main(
+        float(sys.argv[1]) if len(sys.argv) > 1 else 4.0,
+        float(sys.argv[2]) if len(sys.argv) > 2 else 1000.0,
+    )
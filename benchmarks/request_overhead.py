@@ -0,0 +1,41 @@
+"""
+Per-request Python overhead of the client, regular vs lean mode (see
+`oauth2_client.client.OAuth2Client`). Requests are answered in memory, so
+no network is involved. No database is needed. Run from the project root:
+
+    python benchmarks/request_overhead.py [iterations]
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from auth_header import InMemoryAdapter, timed  # noqa: E402
+
+from oauth2_client.client import OAuth2Client  # noqa: E402
+from oauth2_client.models import Application  # noqa: E402
+from oauth2_client.tokens import TokenValue, deadline_in  # noqa: E402
+
+
+def run(lean, iterations):
+    app = Application(
+        name='benchmark', client_id='client_id', service_host='https://benchmark.local',
+        authorization_grant_type=Application.GRANT_CLIENT_CREDENTIALS,
+    )
+    client = OAuth2Client(TokenValue('access_token', 'Bearer', '', deadline_in(3600), app.name), app, lean=lean)
+    client.mount('https://', InMemoryAdapter())
+    return (
+        timed(lambda: client.get('/api/'), iterations),
+        timed(lambda: client.get('/api/', params={'page': 1}, headers={'Accept': 'application/json'}), iterations),
+        timed(lambda: client.post('/api/', json={'name': 'benchmark'}), iterations),
+    )
+
+
+def main(iterations):
+    print('{:<10} {:>12} {:>18} {:>12}'.format('mode', 'GET us', 'GET params us', 'POST us'))
+    for lean in (False, True):
+        print('{:<10} {:>12.2f} {:>18.2f} {:>12.2f}'.format('lean' if lean else 'regular', *run(lean, iterations)))
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 20000)
@@ -0,0 +1,89 @@
+"""
+Token storage throughput benchmark. Compares inserts and lookups of tokens
+for logged and UNLOGGED token tables, in both token storage modes.
+
+Uses the database from `test_settings.py`, a temporary test database is
+created and destroyed. Run from the project root:
+
+    python benchmarks/token_storage.py [iterations]
+"""
+import os
+import sys
+import time
+from datetime import timedelta
+from importlib import import_module
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from test_case import setup_django  # noqa: E402
+
+setup_django()
+
+from django.apps import apps  # noqa: E402
+from django.db import connection  # noqa: E402
+from django.test.utils import override_settings  # noqa: E402
+from django.utils import timezone  # noqa: E402
+
+from oauth2_client.models import AccessToken, Application  # noqa: E402
+from oauth2_client.storage import load_token, store_token  # noqa: E402
+
+TOKEN_TABLES = import_module('oauth2_client.migrations.0006_unlogged_token_tables').TOKEN_TABLES
+
+
+def set_persistence(persistence):
+    """
+    Switch the token tables to `LOGGED` or `UNLOGGED`.
+    """
+    with connection.cursor() as cursor:
+        for model_name in TOKEN_TABLES:
+            table = apps.get_model('oauth2_client', model_name)._meta.db_table
+            cursor.execute('ALTER TABLE {} SET {}'.format(connection.ops.quote_name(table), persistence))
+
+
+def timed(func, iterations):
+    """
+    Returns:
+        float: calls of `func` per second
+    """
+    start = time.time()
+    for i in range(iterations):
+        func(i)
+    return iterations / (time.time() - start)
+
+
+def run(app, storage, iterations):
+    """
+    Measure stores and loads of tokens of one Application.
+    """
+    expires = timezone.now() + timedelta(hours=1)
+
+    def store(i):
+        store_token(AccessToken(
+            application=app, token='{}-{}-{}'.format(storage, time.time(), i), token_type='Bearer', expires=expires
+        ))
+
+    def load(_):
+        load_token(app.name)
+
+    with override_settings(OAUTH2_CLIENT_TOKEN_STORAGE=storage):
+        return timed(store, iterations), timed(load, iterations)
+
+
+def main(iterations):
+    old_name = connection.creation.create_test_db(verbosity=0)
+    try:
+        app = Application.objects.create(
+            name='benchmark', authorization_grant_type=Application.GRANT_CLIENT_CREDENTIALS
+        )
+        print('{:<10} {:<10} {:>12} {:>12}'.format('storage', 'tables', 'stores/s', 'loads/s'))
+        for persistence in ('LOGGED', 'UNLOGGED'):
+            set_persistence(persistence)
+            for storage in ('history', 'current'):
+                stores, loads = run(app, storage, iterations)
+                print('{:<10} {:<10} {:>12.1f} {:>12.1f}'.format(storage, persistence.lower(), stores, loads))
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 2000)
@@ -0,0 +1,57 @@
+"""
+Transport benchmark: requests per second of the client with the `requests`
+transport, in regular and lean mode, and with the urllib3 transport (see
+`oauth2_client.transport`). Requests go to a local HTTP server answering small
+JSON responses, over loopback. No database is needed. Run from the project root:
+
+    python benchmarks/transport.py [iterations]
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from auth_header import timed  # noqa: E402
+
+from oauth2_client.client import OAuth2Client  # noqa: E402
+from oauth2_client.models import Application  # noqa: E402
+from oauth2_client.tokens import TokenValue, deadline_in  # noqa: E402
+from tests.http_server import TestServer  # noqa: E402
+
+# the local server speaks plain HTTP
+os.environ['OAUTHLIB_INSECURE_TRANSPORT'] = '1'
+
+VARIANTS = [('requests', False), ('requests', True), ('urllib3', False)]
+
+
+def run(server_url, transport, lean, iterations):
+    app = Application(
+        name='benchmark', client_id='client_id', service_host=server_url,
+        authorization_grant_type=Application.GRANT_CLIENT_CREDENTIALS,
+    )
+    token = TokenValue('access_token', 'Bearer', '', deadline_in(3600), app.name)
+    client = OAuth2Client(token, app, lean=lean, transport=transport)
+
+    def get():
+        client.get('/echo').json()
+
+    def post():
+        client.post('/echo', json={'name': 'benchmark'}).json()
+
+    return 1e6 / timed(get, iterations), 1e6 / timed(post, iterations)
+
+
+def main(iterations):
+    server = TestServer()
+    server.start()
+    try:
+        print('{:<20} {:>12} {:>12}'.format('transport', 'GET/s', 'POST/s'))
+        for transport, lean in VARIANTS:
+            name = '{}{}'.format(transport, ' (lean)' if lean else '')
+            print('{:<20} {:>12.1f} {:>12.1f}'.format(name, *run(server.url, transport, lean, iterations)))
+    finally:
+        server.stop()
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 2000)
@@ -0,0 +1,2 @@
+
+default_app_config = 'oauth2_client.apps.OAuth2ClientConfig'
@@ -3,7 +3,7 @@ Django admin for OAuth2 client models.
 """
 from django.contrib import admin
 
-from .models import AccessToken, Application
+from .models import AccessToken, Application, CurrentAccessToken, RawToken
 
 
 class ApplicationAdmin(admin.ModelAdmin):
@@ -20,5 +20,21 @@ class AccessTokenAdmin(admin.ModelAdmin):
     list_display = ("application", "created")
 
 
+class CurrentAccessTokenAdmin(admin.ModelAdmin):
+    """
+    Admin support for CurrentAccessToken model.
+    """
+    list_display = ("application", "updated")
+
+
+class RawTokenAdmin(admin.ModelAdmin):
+    """
+    Admin support for RawToken model.
+    """
+    list_display = ("application", "created")
+
+
 admin.site.register(Application, ApplicationAdmin)
 admin.site.register(AccessToken, AccessTokenAdmin)
+admin.site.register(CurrentAccessToken, CurrentAccessTokenAdmin)
+admin.site.register(RawToken, RawTokenAdmin)
@@ -0,0 +1,14 @@
+"""
+Django application config of `oauth2_client`.
+"""
+from django.apps import AppConfig
+
+
+class OAuth2ClientConfig(AppConfig):
+    """
+    Connects the signal receivers on startup.
+    """
+    name = 'oauth2_client'
+
+    def ready(self):
+        from oauth2_client import broker, notify  # noqa pylint: disable=unused-import
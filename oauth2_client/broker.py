@@ -0,0 +1,313 @@
+"""
+Token broker: one long-lived process per host owns acquisition and refresh of
+the tokens of all the Applications, and serves the current tokens to the worker
+processes over a Unix socket. Workers then don't fetch tokens themselves and
+don't query the token tables.
+
+Run the broker with the `oauth2client_broker` management command, and point the
+workers at its socket with the `OAUTH2_CLIENT_BROKER_SOCKET` setting. Workers
+keep the tokens received from the broker in their local token cache (see
+`oauth2_client.cache`) and fall back to fetching tokens directly when the broker
+is unavailable.
+
+The broker refreshes a token in the background `OAUTH2_CLIENT_BROKER_LEAD_TIME` seconds
+before it expires, workers keep getting the current token meanwhile. The tokens of an
+Application are dropped when it is saved or deleted, in the broker process, or in any
+process when the listener from `oauth2_client.notify` runs in the broker.
+
+Protocol: one JSON object per line, in both directions.
+    request:  {"app": "license", "stale": "<access token the worker found expired, optional>"}
+    response: {"token": {"access_token": "...", "token_type": "...", "scope": "...", "expires": 1577836950.0}}
+              {"error": "<message>"}
+"""
+import json
+import logging
+import socket
+import threading
+import time
+import weakref
+from collections import defaultdict
+from datetime import timedelta
+
+from django.db import connections
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from oauth2_client.compat import socketserver
+from oauth2_client.conf import get_setting
+from oauth2_client.deadline import timeout_for
+from oauth2_client.models import Application
+from oauth2_client.storage import load_application, load_token
+from oauth2_client.tokens import TokenValue, deadline_in
+from oauth2_client.utils.date_time import datetime_to_float
+
+log = logging.getLogger(__name__)
+
+# brokers alive in this process, their tokens are dropped on Application edits
+_brokers = weakref.WeakSet()
+
+
+class BrokerUnavailable(Exception):
+    """
+    The broker didn't provide a token, for whatever reason.
+    """
+
+
+def token_to_message(token):
+    """
+    Args:
+        token (AccessToken or CurrentAccessToken):
+
+    Returns:
+        dict: token as sent over the socket
+    """
+    return {
+        'access_token': token.token,
+        'token_type': token.token_type,
+        'scope': token.scope,
+        'expires': datetime_to_float(token.expires) if token.expires else None,
+    }
+
+
+def token_from_message(app, message):
+    """
+    Args:
+        app (oauth2_client.models.Application): Application the token belongs to
+        message (dict): token as received over the socket
+
+    Returns:
+        oauth2_client.tokens.TokenValue: the token
+    """
+    expires = message.get('expires')
+    return TokenValue(
+        message['access_token'],
+        message['token_type'],
+        message.get('scope', ''),
+        deadline_in(expires - time.time() if expires is not None else None),
+        app.name,
+    )
+
+
+class BrokerClient(object):
+    """
+    Worker side of the broker protocol.
+    """
+
+    def __init__(self, socket_path, timeout):
+        """
+        Args:
+            socket_path (str): path to the Unix socket of the broker
+            timeout (float): seconds to wait for the broker
+        """
+        self.socket_path = socket_path
+        self.timeout = timeout
+
+    def get_token(self, app, stale_token=None):
+        """
+        Get the current token of an Application from the broker.
+
+        Args:
+            app (oauth2_client.models.Application): the Application
+            stale_token (str): access token found expired, the broker replaces it with a new one
+
+        Returns:
+            oauth2_client.tokens.TokenValue: the token
+
+        Raises:
+            BrokerUnavailable: when no token received from the broker
+            DeadlineExceeded: the current deadline has expired, see `oauth2_client.deadline`
+        """
+        request = {'app': app.name}
+        if stale_token:
+            request['stale'] = stale_token
+        timeout = timeout_for(self.timeout)
+        try:
+            response = json.loads(self._exchange(json.dumps(request).encode() + b'\n', timeout).decode())
+        except (socket.error, ValueError) as e:
+            raise BrokerUnavailable('Token broker at {} unavailable: {}'.format(self.socket_path, e))
+        if 'token' not in response:
+            raise BrokerUnavailable('Token broker failed to provide a token: {}'.format(response.get('error')))
+        return token_from_message(app, response['token'])
+
+    def _exchange(self, request, timeout):
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            sock.settimeout(timeout)
+            sock.connect(self.socket_path)
+            sock.sendall(request)
+            return sock.makefile('rb').readline()
+        finally:
+            sock.close()
+
+
+def broker_client():
+    """
+    Returns:
+        BrokerClient: client of the configured broker, None when no broker configured
+    """
+    socket_path = get_setting('BROKER_SOCKET')
+    if not socket_path:
+        return None
+    return BrokerClient(socket_path, get_setting('BROKER_TIMEOUT'))
+
+
+class TokenBroker(object):
+    """
+    Broker side: keeps the current token of every Application requested so far, and
+    fetches a new one when it is expired or reported stale by a worker. Only one fetch
+    per Application runs at a time, concurrent requests wait for its result. Tokens
+    expiring within the lead time are refreshed in the background.
+    """
+
+    def __init__(self, lead_time=None):
+        """
+        Args:
+            lead_time (float): seconds before expiry a token is refreshed in the background,
+                OAUTH2_CLIENT_BROKER_LEAD_TIME when not given
+        """
+        self.lead_time = get_setting('BROKER_LEAD_TIME') if lead_time is None else lead_time
+        self._tokens = {}
+        self._locks = defaultdict(threading.Lock)
+        self._locks_lock = threading.Lock()
+        self._refreshing = set()  # names of the Applications refreshed in the background
+        self._generation = 0  # incremented when the tokens are dropped
+        _brokers.add(self)
+
+    def _lock(self, app_name):
+        with self._locks_lock:
+            return self._locks[app_name]
+
+    def token(self, app_name, stale_token=None):
+        """
+        Get the current token of an Application, fetch a new one if needed.
+
+        Args:
+            app_name (str): name of the Application
+            stale_token (str): access token a worker found expired
+
+        Returns:
+            AccessToken or CurrentAccessToken: a valid token
+        """
+        # NOTE: imported here, the client module depends on this one
+        from oauth2_client.client import fetch_and_store_token
+
+        with self._lock(app_name):
+            generation = self._generation
+            token = self._tokens.get(app_name) or load_token(app_name)
+            if not token or token.is_expired() or token.token == stale_token:
+                app = token.application if token else load_application(app_name)
+                token = fetch_and_store_token(app)
+            elif token.expires and timezone.now() >= token.expires - timedelta(seconds=self.lead_time):
+                self._refresh_ahead(token.application, generation)
+            self._store(app_name, token, generation)
+            return token
+
+    def invalidate(self):
+        """
+        Drop all the tokens, they are loaded again with their Applications. Applications could
+        have been renamed, so all of them are dropped.
+        """
+        with self._locks_lock:
+            self._generation += 1
+            self._tokens.clear()
+
+    def _store(self, app_name, token, generation):
+        """
+        Keep the token, unless the tokens were dropped since it was loaded: its Application may have been edited.
+        """
+        with self._locks_lock:
+            if generation == self._generation:
+                self._tokens[app_name] = token
+
+    def _refresh_ahead(self, app, generation):
+        with self._locks_lock:
+            if app.name in self._refreshing:
+                return
+            self._refreshing.add(app.name)
+        thread = threading.Thread(target=self._refresh, args=(app, generation), name='oauth2-client-broker-refresh')
+        thread.daemon = True
+        thread.start()
+
+    def _refresh(self, app, generation):
+        # NOTE: imported here, the client module depends on this one
+        from oauth2_client.client import fetch_and_store_token
+
+        try:
+            token = fetch_and_store_token(app)
+        except Exception:  # pylint: disable=broad-except
+            # the current token is served until it expires, then fetched by the request finding it expired
+            log.exception('Token broker failed to refresh token for %s ahead of expiry', app)
+        else:
+            with self._lock(app.name):
+                self._store(app.name, token, generation)
+        finally:
+            # every refresh runs in a new thread, with its own database connection
+            connections.close_all()
+            with self._locks_lock:
+                self._refreshing.discard(app.name)
+
+    def handle(self, line):
+        """
+        Answer one request.
+
+        Args:
+            line (bytes): request, as received over the socket
+
+        Returns:
+            bytes: response to send back
+        """
+        try:
+            request = json.loads(line.decode())
+            response = {'token': token_to_message(self.token(request['app'], request.get('stale')))}
+        except Exception as e:  # pylint: disable=broad-except
+            log.exception('Token broker failed to handle request: %s', line)
+            response = {'error': str(e)}
+        return json.dumps(response).encode() + b'\n'
+
+
+def invalidate_brokers():
+    """
+    Drop the tokens of all the brokers of this process, e.g. when an Application is edited.
+    """
+    for broker in list(_brokers):
+        broker.invalidate()
+
+
+@receiver(post_save, sender=Application)
+@receiver(post_delete, sender=Application)
+def invalidate_on_application_change(sender, instance, **kwargs):  # pylint: disable=unused-argument
+    """
+    Brokers load the Application again with its token, with its new settings.
+    """
+    invalidate_brokers()
+
+
+class BrokerRequestHandler(socketserver.StreamRequestHandler):
+    """
+    Serve the requests of one worker connection.
+    """
+
+    def handle(self):
+        try:
+            for line in self.rfile:
+                self.wfile.write(self.server.broker.handle(line))
+        finally:
+            # every connection is served by a new thread, with its own database connection
+            connections.close_all()
+
+
+class BrokerServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    """
+    Unix socket server of the broker.
+    """
+    daemon_threads = True
+
+    def __init__(self, socket_path, broker=None):
+        """
+        Args:
+            socket_path (str): path to bind the socket to
+            broker (TokenBroker): serves the tokens
+        """
+        socketserver.UnixStreamServer.__init__(self, socket_path, BrokerRequestHandler)
+        self.broker = broker or TokenBroker()
@@ -0,0 +1,126 @@
+"""
+Bulkheads: caps of the OAuth2Client requests in flight per Application, so one slow
+service can't take all the threads of the process. Configured in the `extra_settings`
+of the Application, or for all of them with settings:
+
+    {
+        "max_in_flight": 10,       # OAUTH2_CLIENT_BULKHEAD_MAX_IN_FLIGHT when not given, no cap when None
+        "max_in_flight_wait": 0.5  # seconds, OAUTH2_CLIENT_BULKHEAD_MAX_WAIT when not given
+    }
+
+A request over the cap waits up to `max_in_flight_wait` seconds for another one to
+complete, then raises `BulkheadFull`. The time waiting for the rate limit (see
+`oauth2_client.ratelimit`) is spent within the bulkhead.
+
+Rejections are logged and sent as the `oauth2_client.signals.bulkhead_rejected`
+signal. Counters per Application: `bulkhead(app).stats()`.
+"""
+import logging
+import threading
+
+from oauth2_client.compat import monotonic
+from oauth2_client.conf import get_setting
+from oauth2_client.deadline import bounded_wait
+from oauth2_client.signals import bulkhead_rejected
+from oauth2_client.utils.fork import after_fork_in_child
+
+log = logging.getLogger(__name__)
+
+
+class BulkheadFull(Exception):
+    """
+    The bulkhead of an Application doesn't allow another request in flight.
+    """
+
+    def __init__(self, app_name, max_in_flight):
+        super(BulkheadFull, self).__init__(
+            'Bulkhead of {} full: {} requests in flight'.format(app_name, max_in_flight)
+        )
+        self.app_name = app_name
+        self.max_in_flight = max_in_flight
+
+
+class Bulkhead(object):
+    """
+    Thread-safe cap of the requests in flight of an Application.
+    """
+
+    def __init__(self, app_name, max_in_flight, max_wait):
+        self.app_name = app_name
+        self.config = (max_in_flight, max_wait)
+        self.max_in_flight = max_in_flight
+        self.max_wait = max_wait
+        self.in_flight = 0
+        self._counters = {'accepted': 0, 'queued': 0, 'rejected': 0}
+        self._condition = threading.Condition(threading.Lock())
+
+    def acquire(self):
+        """
+        Take a slot, waiting up to `max_wait` seconds for one, and not past the current deadline.
+
+        Raises:
+            BulkheadFull: no slot got free in time
+        """
+        max_wait = bounded_wait(self.max_wait)
+        with self._condition:
+            if self.in_flight >= self.max_in_flight and max_wait > 0:
+                self._counters['queued'] += 1
+                deadline = monotonic() + max_wait
+                remaining = max_wait
+                while self.in_flight >= self.max_in_flight and remaining > 0:
+                    self._condition.wait(remaining)
+                    remaining = deadline - monotonic()
+            if self.in_flight >= self.max_in_flight:
+                self._counters['rejected'] += 1
+                in_flight = self.in_flight
+            else:
+                self._counters['accepted'] += 1
+                self.in_flight += 1
+                return
+        log.warning('Request to %s rejected, %s requests in flight', self.app_name, in_flight)
+        bulkhead_rejected.send(sender=self.__class__, app_name=self.app_name, in_flight=in_flight)
+        raise BulkheadFull(self.app_name, self.max_in_flight)
+
+    def release(self):
+        with self._condition:
+            self.in_flight -= 1
+            self._condition.notify()
+
+    def stats(self):
+        """
+        Returns:
+            dict: cap, requests in flight, and requests accepted, queued before accepted or rejected, and rejected
+        """
+        with self._condition:
+            return dict(self._counters, max_in_flight=self.max_in_flight, in_flight=self.in_flight)
+
+
+_bulkheads = {}
+_lock = threading.Lock()
+
+
+def bulkhead(app):
+    """
+    Args:
+        app (oauth2_client.models.Application): app whose `extra_settings` configure the bulkhead
+
+    Returns:
+        Bulkhead: the bulkhead of the app shared by the process, None if the app has no cap
+    """
+    extra_settings = app.extra_settings or {}
+    max_in_flight = extra_settings.get('max_in_flight', get_setting('BULKHEAD_MAX_IN_FLIGHT'))
+    if not max_in_flight:
+        return None
+    config = (max_in_flight, extra_settings.get('max_in_flight_wait', get_setting('BULKHEAD_MAX_WAIT')))
+    with _lock:
+        existing = _bulkheads.get(app.name)
+        if existing is None or existing.config != config:
+            existing = _bulkheads[app.name] = Bulkhead(app.name, *config)
+        return existing
+
+
+@after_fork_in_child
+def reset_after_fork():
+    global _lock  # pylint: disable=global-statement
+    _lock = threading.Lock()
+    _bulkheads.clear()
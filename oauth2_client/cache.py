@@ -0,0 +1,73 @@
+"""
+Process-local cache of tokens (see `oauth2_client.tokens.TokenValue`), together
+with the Applications they belong to.
+Enabled with the `OAUTH2_CLIENT_LOCAL_TOKEN_CACHE` setting, `get_client` then
+doesn't query the database while a cached token is valid.
+
+Entries are replaced when a token is refreshed in this process, and invalidated
+when other processes refresh a token or edit an Application, if the listener
+from `oauth2_client.notify` runs in this process.
+"""
+import threading
+
+from oauth2_client.utils.fork import after_fork_in_child
+
+
+class TokenCache(object):
+    """
+    Thread-safe mapping of Application names to the Applications and their current tokens.
+    """
+
+    def __init__(self):
+        self._tokens = {}
+        self._lock = threading.Lock()
+
+    def get(self, app_name):
+        """
+        Get an Application with its valid token.
+
+        Args:
+            app_name (str): name of the Application
+
+        Returns:
+            tuple: the Application and its TokenValue, None if not cached or expired
+        """
+        entry = self._tokens.get(app_name)
+        if entry is None or entry[1].is_expired():
+            return None
+        return entry
+
+    def set(self, app, token):
+        """
+        Cache the current token of an Application.
+
+        Args:
+            app (oauth2_client.models.Application): the Application
+            token (oauth2_client.tokens.TokenValue): the token
+        """
+        with self._lock:
+            self._tokens[app.name] = (app, token)
+
+    def invalidate(self, app_name=None):
+        """
+        Drop the token of an Application, or all the tokens when no name given.
+
+        Args:
+            app_name (str): name of the Application
+        """
+        with self._lock:
+            if app_name is None:
+                self._tokens.clear()
+            else:
+                self._tokens.pop(app_name, None)
+
+    def reset_lock(self):
+        """
+        Replace the lock, e.g. in a forked child process, where the lock could have been
+        inherited in the acquired state. Cached tokens are kept.
+        """
+        self._lock = threading.Lock()
+
+
+token_cache = TokenCache()
+after_fork_in_child(token_cache.reset_lock)
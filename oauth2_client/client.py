@@ -26,29 +26,179 @@ Token refresh algorithm:
 4) if the request still fails (for whatever reason): break the circuit
 
 Any exception from the 3rd party code handling the request will also cause the
-breaker to open the circuit.
+breaker to open the circuit. Idempotent requests are retried on connection errors and
+some 5xx responses before that, see `oauth2_client.retry`. A call running out of its time budget doesn't, see
+`oauth2_client.deadline`, nor a hedged attempt losing to another one, see `oauth2_client.hedge`.
+
+Clients are thread-safe, one client can be shared by all the threads of a process.
+The token of a client is an immutable snapshot, replaced as a whole when refreshed,
+requests in flight keep using the token they started with. Concurrent requests finding
+the same token expired refresh it only once.
+
+Preloaded apps (e.g. `gunicorn --preload`): connection pools of the clients and
+the breaker's lock are re-created in forked worker processes, tokens cached in the
+master process are kept. Call `warm_tokens()` in the master, so every worker starts
+with valid tokens in its local token cache.
 """
 import logging
-
-import pybreaker
-from oauthlib.oauth2 import TokenExpiredError
+import threading
+import weakref
+
+import requests
+from django.db import connections
+from requests.cookies import RequestsCookieJar
+from requests.sessions import merge_hooks, merge_setting
+from requests.structures import CaseInsensitiveDict
+from oauthlib.oauth2 import InsecureTransportError, TokenExpiredError, WebApplicationClient, is_secure_transport
+from pybreaker import CircuitBreakerError
 from requests_oauthlib import OAuth2Session
 from retrying import retry
 
-from oauth2_client.compat import urljoin
+from oauth2_client.broker import BrokerUnavailable, broker_client
+from oauth2_client.bulkhead import BulkheadFull, bulkhead
+from oauth2_client.cache import token_cache
+from oauth2_client.coalesce import coalescer, request_key
+from oauth2_client.compat import monotonic, urljoin
+from oauth2_client.compression import accepts_compressed_responses, request_compressor
+from oauth2_client.concurrency import DROPPED_STATUS_CODES, ConcurrencyLimitExceeded, concurrency_limiter
+from oauth2_client.conf import TRANSPORT_REQUESTS, TRANSPORT_URLLIB3, get_setting
+from oauth2_client.deadline import Deadline, DeadlineExceeded, current_deadline
 from oauth2_client.fetcher import fetch_token
-from oauth2_client.models import AccessToken, Application
+from oauth2_client.hedge import hedger, is_lost_attempt_error, is_repeatable_request, sending_attempt
+from oauth2_client.http_cache import SAFE_METHODS, is_cacheable_request, response_cache, url_with_params
+from oauth2_client.models import Application
+from oauth2_client.notify import EVENT_TOKEN, publish
+from oauth2_client.ratelimit import RateLimited, rate_limiter
+from oauth2_client.retry import retry_policy
+from oauth2_client.storage import load_application, load_token, store_token
+from oauth2_client.timeouts import request_timeout
+from oauth2_client.tokens import TokenValue
+from oauth2_client.transport import Urllib3Transport
+from oauth2_client.utils.breaker import CircuitOpenError, ConcurrentCircuitBreaker
+from oauth2_client.utils.fork import after_fork_in_child
+from oauth2_client.utils.json_codec import json_codec
 
 log = logging.getLogger(__name__)
 
 
 # Protect integration point with resource owner and authorization provider
-request_breaker = pybreaker.CircuitBreaker(fail_max=1, reset_timeout=10)
+request_breaker = ConcurrentCircuitBreaker(
+    fail_max=1, reset_timeout=10, exclude=[DeadlineExceeded, is_lost_attempt_error]
+)
+
+# Failures of a request which didn't reach the service host, or was abandoned for the caller's deadline.
+# The failure tripping the breaker is a `CircuitBreakerError` too, but the request was sent.
+NOT_SENT_ERRORS = (CircuitOpenError, DeadlineExceeded, RateLimited, ConcurrencyLimitExceeded, BulkheadFull)
+
+# Failures of a request a stale cached response is served on, see `oauth2_client.http_cache`
+STALE_IF_ERRORS = (
+    requests.ConnectionError, requests.Timeout, CircuitBreakerError, RateLimited, ConcurrencyLimitExceeded,
+    BulkheadFull,
+)
+
+# Clients alive in this process, their connection pools are reset after fork
+_clients = weakref.WeakSet()
+
+
+class TokenSnapshot(object):
+    """
+    Token of a client, together with what adds it to the requests: the `Authorization` header
+    of a Bearer token, built once, or the oauthlib client for other token types.
+    Never modified once created, a refreshed token gets a new snapshot.
+    """
+    __slots__ = ('token', 'expires_at', '_headers', '_oauth_client')
+
+    def __init__(self, client_id, token):
+        """
+        Args:
+            client_id (str): client ID of the Application
+            token (dict): token, as returned by `to_client_dict` of TokenValue
+        """
+        self.token = token
+        expires_in = token.get('expires_in')
+        self.expires_at = monotonic() + float(expires_in) if expires_in is not None else None
+        self._headers = None
+        self._oauth_client = None
+        if get_setting('FAST_AUTH_HEADER') and is_bearer_token(token):
+            self._headers = {'Authorization': 'Bearer {}'.format(token['access_token'])}
+        else:
+            self._oauth_client = WebApplicationClient(client_id, token=token)
+
+    @property
+    def access_token(self):
+        return self.token.get('access_token')
+
+    def add_token(self, method, url, data, headers):
+        """
+        Add the token to a request.
+
+        Returns:
+            tuple: url, headers and data of the request
+
+        Raises:
+            TokenExpiredError: when the token is known to be expired
+        """
+        if not self.token:
+            return url, headers, data
+        if self._headers is None:
+            return self._oauth_client.add_token(url, http_method=method, body=data, headers=headers)
+        self.check_expiry()
+        if headers:
+            headers = dict(headers, **self._headers)
+        else:
+            headers = self._headers.copy()
+        return url, headers, data
+
+    @property
+    def has_static_headers(self):
+        """
+        Returns:
+            bool: True if the token is added to the requests by a precomputed header only
+        """
+        return self._headers is not None
+
+    def check_expiry(self):
+        """
+        Same expiry check as oauthlib's.
+
+        Raises:
+            TokenExpiredError: when the token is known to be expired
+        """
+        if self.expires_at is not None and self.expires_at < monotonic():
+            raise TokenExpiredError()
+
+
+class NullCookieJar(RequestsCookieJar):
+    """
+    Cookie jar ignoring all the cookies, used by lean clients.
+    """
+
+    def set_cookie(self, cookie, *args, **kwargs):
+        pass
+
+    def extract_cookies(self, response, request):
+        pass
+
+    def copy(self):
+        # nothing to copy, and copies ignore the cookies too
+        return self
+
+
+def is_bearer_token(token):
+    """
+    Args:
+        token (dict): token, as returned by `to_client_dict` of TokenValue
+
+    Returns:
+        bool: True if the token can be sent in an `Authorization: Bearer` header
+    """
+    return bool(token.get('access_token')) and (token.get('token_type') or '').lower() == 'bearer'
 
 
 class OAuth2Client(OAuth2Session):
     """
-    OAuth2 client to make authorized HTTP(S) requests with OAuth2 token.
+    OAuth2 client to make authorized HTTP(S) requests with OAuth2 token. Thread-safe,
+    one client can be shared by multiple threads.
 
     Wrapper around OAuth2Session to cache service host on the class instantiation and use it to
     transform relative urls to absolute ones.
@@ -62,52 +212,197 @@ class OAuth2Client(OAuth2Session):
         to handle the refresh ourselves. (Client Credentials MAY issue refresh_token but it
         doesn't in case of the `oauth2_provider` we use as a reference auth provider).
 
+    Lean mode (`lean=True` or the `OAUTH2_CLIENT_LEAN_REQUESTS` setting) cuts the per-request
+    overhead of `requests.Session` our service-to-service traffic doesn't need:
+        - environment settings are not merged: proxy environment variables, netrc and
+            `REQUESTS_CA_BUNDLE` are ignored
+        - cookies are neither sent nor stored
+        - requests without body, params and extra headers are copied from a prepared template,
+            cached per method and URL. Templates include the session headers as they were when
+            the template was built.
+
+    urllib3 transport (`transport='urllib3'` or the `OAUTH2_CLIENT_TRANSPORT` setting) makes the
+    requests with urllib3 directly, and returns `oauth2_client.transport.LightResponse` objects.
+    It is meant for small JSON calls, see `oauth2_client.transport` for what isn't supported.
+
+    Request bodies are compressed and response compression negotiated as configured in the
+    `extra_settings` of the Application, see `oauth2_client.compression`.
+
+    GET responses are cached and revalidated when the `OAUTH2_CLIENT_RESPONSE_CACHE` setting
+    is enabled, see `oauth2_client.http_cache`.
+
+    Coalescing (`coalesce=True` or the `OAUTH2_CLIENT_COALESCE_REQUESTS` setting) makes identical
+    GETs made concurrently by the threads of the process share one upstream call, see
+    `oauth2_client.coalesce`.
+
+    Requests are rate limited, and slowed down on 429 and 503 responses, as configured in the
+    `extra_settings` of the Application, see `oauth2_client.ratelimit`. The `rate_limit` argument
+    of a request chooses the policy of that call, `block` or `fail`.
+
+    The requests in flight to a service host are limited by an adaptive limit, when the
+    `OAUTH2_CLIENT_ADAPTIVE_CONCURRENCY` setting is enabled, see `oauth2_client.concurrency`.
+    The requests in flight of an Application are capped by its bulkhead, if configured, see
+    `oauth2_client.bulkhead`. Slow idempotent requests are sent again, if hedging is enabled in the
+    `extra_settings` of the Application, see `oauth2_client.hedge`.
+
+    Requests without a `timeout` argument get the default timeouts of the Application, see
+    `oauth2_client.timeouts`. The `timeout_budget` argument of a request bounds the time of the
+    whole call, token renewal included, see `oauth2_client.deadline`.
+
     Example:
         > # get OAuth2Client instance for the application
         > client = get_client('license')
         > # make API HTTP call by URL without host
         > r = client.get('/api/license/1/detail/')
     """
-    def __init__(self, token):
+    # Maximum of absolute URLs and prepared templates cached per client, caches are cleared when full
+    URL_CACHE_SIZE = 1024
+    TEMPLATE_CACHE_SIZE = 256
+
+    def __init__(self, token, app=None, lean=None, transport=None, coalesce=None):
         """
         Create OAuth2Client
 
-        :param token: oauth2_client.model.AccessToken
+        :param token: oauth2_client.tokens.TokenValue, or oauth2_client.model.AccessToken or
+            oauth2_client.model.CurrentAccessToken
+        :param app: oauth2_client.model.Application the token belongs to, required with a TokenValue
+        :param lean: use lean mode, `OAUTH2_CLIENT_LEAN_REQUESTS` setting when not given
+        :param transport: `requests` or `urllib3`, `OAUTH2_CLIENT_TRANSPORT` setting when not given
+        :param coalesce: coalesce identical in-flight GETs, `OAUTH2_CLIENT_COALESCE_REQUESTS` setting when not given
         """
-        self.app = token.application  # Application this client talks to
+        if not isinstance(token, TokenValue):
+            app = token.application
+            token = TokenValue.from_token(token)
+        self.app = app  # Application this client talks to
         self.service_host = self.app.service_host  # used to transform relative URLs to absolute
+        self.lean = get_setting('LEAN_REQUESTS') if lean is None else lean
+        self.coalesce = get_setting('COALESCE_REQUESTS') if coalesce is None else coalesce
+        self.timeout = request_timeout(self.app)  # (connect, read) default of the requests, None for no timeout
+        transport = transport or get_setting('TRANSPORT')
+        if transport not in (TRANSPORT_REQUESTS, TRANSPORT_URLLIB3):
+            raise ValueError('Unknown transport: {}'.format(transport))
+        self.compressor = request_compressor(self.app)  # compresses the request bodies, None if not enabled
+        self.transport = Urllib3Transport(compressor=self.compressor) if transport == TRANSPORT_URLLIB3 else None
+        self._snapshot = None  # TokenSnapshot of the current token, replaced on refresh
+        self._refresh_lock = threading.Lock()
+        self._absolute_urls = {}  # relative URL -> absolute URL
+        self._templates = {}  # (method, absolute URL) -> (TokenSnapshot, PreparedRequest)
         super(OAuth2Client, self).__init__(client_id=self.app.client_id, token=token.to_client_dict())
+        if self.lean:
+            self.trust_env = False
+            self.cookies = NullCookieJar()
+        # shared by the clients of the Application, None if not configured
+        self.bulkhead = bulkhead(self.app)
+        self.hedger = hedger(self.app)
+        self.retry_policy = retry_policy(self.app)  # None if disabled
+        self.rate_limiter = rate_limiter(self.app)
+        # shared by the clients of the service host, None if disabled
+        self.concurrency_limiter = concurrency_limiter(self.service_host)
+        # shared response cache, None if disabled or not used for the Application
+        self.response_cache = response_cache() if (self.app.extra_settings or {}).get('response_cache', True) else None
+        if not accepts_compressed_responses(self.app):
+            self.headers['Accept-Encoding'] = 'identity'
+        _clients.add(self)
+
+    @property
+    def token(self):
+        return self._snapshot.token if self._snapshot else None
+
+    @token.setter
+    def token(self, value):
+        # a single assignment, threads see either the old or the new snapshot
+        self._snapshot = TokenSnapshot(self.client_id, value)
+
+    @property
+    def access_token(self):
+        return self._snapshot.access_token if self._snapshot else None
+
+    def reset_refresh_lock(self):
+        """
+        Replace the token refresh lock, e.g. in a forked child process, where the lock could
+        have been inherited in the acquired state.
+        """
+        self._refresh_lock = threading.Lock()
 
-    def make_request(self, method, url, *args, **kwargs):
+    def reset_connection_pools(self):
+        """
+        Replace the connection pools with empty ones, e.g. in a forked child process, where
+        the sockets are shared with the parent. Inherited sockets are left alone, closing them
+        could disturb the connections of the parent.
+        """
+        for adapter in self.adapters.values():
+            adapter.proxy_manager = {}
+            # pylint: disable=protected-access
+            adapter.init_poolmanager(adapter._pool_connections, adapter._pool_maxsize, block=adapter._pool_block)
+        if self.transport is not None:
+            self.transport.reset()
+
+    def make_request(self, method, url, data=None, headers=None, snapshot=None, **kwargs):
         """
         Make HTTP(S) request. Make best effort to detect token expiry.
 
         Two mechanisms are used for expiry detection:
         1) `oauth_provider`: check expiration datetime on the token itself. This is baked into
-            the call to 3rd party's `super().request`. Other tokens are not guaranteed to contain
+            the call to 3rd party's `add_token`. Other tokens are not guaranteed to contain
             this information.
         2) Salesforce: interpret 400 status code along with `invalid_grant` error as token expiry
 
+        Arguments:
+            snapshot (TokenSnapshot): token to authorize the request with, the current one when not given
+
         Raises:
             TokenExpiredError: upon token expiry detection
+            DeadlineExceeded: the time budget of the call has run out
+        """
+        if not is_secure_transport(url):
+            raise InsecureTransportError()
+        snapshot = snapshot or self._snapshot
+        if 'timeout' not in kwargs:
+            kwargs['timeout'] = self.timeout
+        deadline = current_deadline()
+        if deadline is None:
+            return self.send_request(method, url, data, headers, snapshot, **kwargs)
+        kwargs['timeout'] = deadline.timeout(kwargs.get('timeout'))
+        try:
+            return self.send_request(method, url, data, headers, snapshot, **kwargs)
+        except requests.Timeout:
+            # timed out by the deadline: the caller's budget, not a failure of the service
+            if deadline.remaining() <= 0:
+                raise DeadlineExceeded(deadline.budget)
+            raise
+
+    def send_request(self, method, url, data, headers, snapshot, **kwargs):
+        """
+        Make HTTP(S) request with the token of a snapshot, see `make_request`.
         """
         # 1 oauth_provider
-        resp = super(OAuth2Client, self).request(method, url, *args, **kwargs)
+        if self.transport is not None:
+            url, headers, data = snapshot.add_token(method, url, data, headers)
+            headers = merge_setting(headers, self.headers, dict_class=CaseInsensitiveDict)
+            resp = self.transport.request(method, url, headers, data=data, **kwargs)
+        elif self.lean:
+            resp = self.lean_request(snapshot, method, url, data, headers, **kwargs)
+        else:
+            url, headers, data = snapshot.add_token(method, url, data, headers)
+            # NOTE: skips `OAuth2Session.request`, it adds the token of the session, not of the snapshot
+            resp = requests.Session.request(self, method, url, data=data, headers=headers, **kwargs)
         # 2 salesforce
         if self.app.authorization_grant_type == Application.GRANT_JWT_BEARER and is_invalid_jwt_grant(resp):
             raise TokenExpiredError(description="400 status code received in JWT flow. Assuming expired token.")
         return resp
 
-    @request_breaker
-    def request(self, method, url, *args, **kwargs):  # pylint: disable=arguments-differ
+    def request(self, method, url, data=None, headers=None, **kwargs):  # pylint: disable=arguments-differ
         """
         Intercepts all requests, transforms relative URL to absolute and add the OAuth 2 token if present.
         Any communication issues are indicated by raising `CircuitBreakerError`. In this case communication
-        can be reattempted in 10s, after the breaker resets.
+        can be reattempted in 10s, after the breaker resets. GET responses are served from the response
+        cache, and identical in-flight GETs coalesced, if enabled.
 
         Arguments:
             method (str): HTTP method e.g. POST, GET.
             url (str): relative request URL.
+            timeout_budget (float): seconds the whole call may take, token renewal included, see
+                `oauth2_client.deadline`
 
         Returns:
             Response object.
@@ -117,15 +412,314 @@ class OAuth2Client(OAuth2Session):
                 1) token expiry was detected and new token fetched, but we still get errors in
                     communication upon retrying request
                 2) any unexpected error when handling the request
+            DeadlineExceeded: the time budget has run out
+        """
+        timeout_budget = kwargs.pop('timeout_budget', None)
+        if timeout_budget is not None:
+            with Deadline(timeout_budget):
+                return self.request(method, url, data, headers, **kwargs)
+        absolute_url = self.absolute_url(url)
+        if self.coalesce and is_cacheable_request(method, data, headers, kwargs):
+            key = request_key(
+                self.app.name, url_with_params(absolute_url, kwargs.get('params')),
+                merge_setting(headers, self.headers, dict_class=CaseInsensitiveDict), self.transport is not None,
+            )
+            return coalescer.call(key, self.dispatch_request, method, absolute_url, data, headers, **kwargs)
+        return self.dispatch_request(method, absolute_url, data, headers, **kwargs)
+
+    def dispatch_request(self, method, url, data=None, headers=None, **kwargs):
+        """
+        Make a request to an absolute URL, through the response cache if enabled.
+
+        Returns:
+            Response object.
+        """
+        if self.response_cache is None:
+            return self.hedged_request(method, url, data, headers, **kwargs)
+        if is_cacheable_request(method, data, headers, kwargs):
+            return self.cached_request(url, headers, **kwargs)
+        resp = self.hedged_request(method, url, data, headers, **kwargs)
+        if method not in SAFE_METHODS and resp.status_code < 400:
+            self.response_cache.invalidate(self.app.name, url_with_params(url, kwargs.get('params')))
+        return resp
+
+    def hedged_request(self, method, url, data=None, headers=None, **kwargs):
+        """
+        Make a request to an absolute URL, hedged if enabled for the Application and the request
+        is idempotent. Every attempt is a `limited_request`.
+
+        Returns:
+            Response object, the first one received.
+        """
+        if self.hedger is None or not is_repeatable_request(method, data, kwargs):
+            return self.limited_request(method, url, data, headers, **kwargs)
+        return self.hedger.call(self.limited_request, method, url, data, headers, **kwargs)
+
+    def limited_request(self, method, url, data=None, headers=None, **kwargs):
+        """
+        Make a request to an absolute URL within the bulkhead of the Application, if any.
+        See `rate_limited_request`.
+
+        Raises:
+            BulkheadFull: too many requests in flight to the Application
+        """
+        if self.bulkhead is None:
+            return self.rate_limited_request(method, url, data, headers, **kwargs)
+        self.bulkhead.acquire()
+        try:
+            return self.rate_limited_request(method, url, data, headers, **kwargs)
+        finally:
+            self.bulkhead.release()
+
+    def rate_limited_request(self, method, url, data=None, headers=None, rate_limit=None, **kwargs):
+        """
+        Make a request to an absolute URL within the rate limit of the Application and the
+        concurrency limit of the service host, if any. Waiting for the limits happens outside
+        of the circuit breaker, `RateLimited`, `ConcurrencyLimitExceeded` and `BulkheadFull` don't open it.
+
+        Arguments:
+            rate_limit (str): policy of this request, `block` or `fail`, the Application's when not given
+
+        Returns:
+            Response object.
+
+        Raises:
+            RateLimited: the request isn't allowed in time
+            ConcurrencyLimitExceeded: too many requests in flight to the service host
+        """
+        if self.rate_limiter is not None:
+            self.rate_limiter.acquire(rate_limit)
+        if self.concurrency_limiter is None:
+            resp = self.protected_request(method, url, data, headers, **kwargs)
+        else:
+            slot = self.concurrency_limiter.acquire()
+            try:
+                resp = self.protected_request(method, url, data, headers, **kwargs)
+            except NOT_SENT_ERRORS:
+                self.concurrency_limiter.cancel(slot)
+                raise
+            except BaseException:
+                self.concurrency_limiter.release(slot, dropped=True)
+                raise
+            self.concurrency_limiter.release(slot, resp.status_code in DROPPED_STATUS_CODES)
+        if self.rate_limiter is not None:
+            self.rate_limiter.observe(resp)
+        return resp
+
+    @request_breaker
+    def protected_request(self, method, url, data=None, headers=None, **kwargs):
+        """
+        Make a request to an absolute URL, protected by the circuit breaker. The token is renewed
+        and the request repeated once, when the token is found expired.
+
+        Returns:
+            Response object.
+        """
+        snapshot = self._snapshot
+        with sending_attempt():
+            try:
+                return self.retried_request(method, url, data, headers, snapshot, **kwargs)
+            except TokenExpiredError:
+                snapshot = self.renew_snapshot(snapshot)
+                return self.retried_request(method, url, data, headers, snapshot, **kwargs)
+
+    def retried_request(self, method, url, data, headers, snapshot, **kwargs):
+        """
+        Make a request, retried on connection errors and some 5xx responses when it is idempotent
+        and retries are enabled, see `oauth2_client.retry`.
+
+        Returns:
+            Response object, of the last attempt.
+        """
+        if self.retry_policy is None or not is_repeatable_request(method, data, kwargs):
+            return self.make_request(method, url, data, headers, snapshot=snapshot, **kwargs)
+        return self.retry_policy.call(self.make_request, method, url, data, headers, snapshot=snapshot, **kwargs)
+
+    def cached_request(self, url, headers=None, **kwargs):
+        """
+        GET an absolute URL through the response cache: fresh responses are served from the cache,
+        stale ones revalidated, and served when the request fails within their `stale-if-error` time.
+
+        Returns:
+            Response object, a copy of the cached one when served from the cache.
         """
-        absolute_url = urljoin(self.service_host, url)
+        cache = self.response_cache
+        key = url_with_params(url, kwargs.get('params'))
+        request_headers = merge_setting(headers, self.headers, dict_class=CaseInsensitiveDict)
+        light = self.transport is not None
+        entry = cache.get(self.app.name, key, request_headers)
+        if entry is not None and entry.is_fresh():
+            cache.count('hits')
+            return entry.to_response(light)
+        if entry is None:
+            cache.count('misses')
+        else:
+            headers = dict(headers or {}, **entry.validators())
         try:
-            return self.make_request(method, absolute_url, *args, **kwargs)
-        except TokenExpiredError:
-            log.debug("Attempting to fetch a new token for %s", self.app)
-            new_token = fetch_and_store_token(self.app)
-            self.token = new_token.to_client_dict()
-            return self.make_request(method, absolute_url, *args, **kwargs)
+            resp = self.hedged_request('GET', url, None, headers, **kwargs)
+        except STALE_IF_ERRORS:
+            if entry is None or not entry.is_usable_on_error():
+                raise
+            cache.count('stale_if_error')
+            return entry.to_response(light)
+        if entry is not None and resp.status_code == 304:
+            cache.count('revalidated')
+            entry = entry.revalidated(resp)
+            cache.set(self.app.name, key, entry)
+            return entry.to_response(light)
+        if entry is not None and resp.status_code >= 500 and entry.is_usable_on_error():
+            cache.count('stale_if_error')
+            return entry.to_response(light)
+        cache.store(self.app.name, key, resp, request_headers)
+        return resp
+
+    def get_json(self, url, **kwargs):
+        """
+        GET a JSON resource, see `request_json`.
+        """
+        return self.request_json('GET', url, **kwargs)
+
+    def post_json(self, url, obj, **kwargs):
+        """
+        POST an object as JSON, and get the JSON response, see `request_json`.
+        """
+        return self.request_json('POST', url, obj, **kwargs)
+
+    def request_json(self, method, url, obj=None, **kwargs):
+        """
+        Make a request with a JSON body, encoded by the configured codec (see
+        `oauth2_client.utils.json_codec`), and decode the JSON response straight from bytes.
+
+        Arguments:
+            method (str): HTTP method e.g. POST, GET.
+            url (str): relative request URL.
+            obj: object to send as JSON, no body when None
+            kwargs: other arguments of `request`
+
+        Returns:
+            the decoded response, None when the response is empty
+
+        Raises:
+            requests.HTTPError: for 4xx and 5xx responses
+            ValueError: unparseable response
+        """
+        codec = json_codec()
+        if obj is not None:
+            headers = CaseInsensitiveDict(kwargs.pop('headers', None) or {})
+            headers.setdefault('Content-Type', 'application/json')
+            kwargs['headers'] = headers
+            kwargs['data'] = codec.dumps(obj)
+        resp = self.request(method, url, **kwargs)
+        resp.raise_for_status()
+        return codec.loads(resp.content) if resp.content else None
+
+    def send(self, request, **kwargs):  # pylint: disable=arguments-differ
+        """
+        Send a prepared request, with the body compressed if enabled for the Application.
+        Redirected requests keep their compressed body, its `Content-Encoding` prevents compressing it twice.
+        """
+        if self.compressor is not None and request.body:
+            request.body = self.compressor.compress_body(request.headers, request.body)
+        return super(OAuth2Client, self).send(request, **kwargs)
+
+    def absolute_url(self, url):
+        """
+        Arguments:
+            url (str): URL relative to the service host, or absolute
+
+        Returns:
+            str: absolute URL
+        """
+        absolute_url = self._absolute_urls.get(url)
+        if absolute_url is None:
+            if len(self._absolute_urls) >= self.URL_CACHE_SIZE:
+                self._absolute_urls.clear()
+            absolute_url = self._absolute_urls[url] = urljoin(self.service_host, url)
+        return absolute_url
+
+    def lean_request(self, snapshot, method, url, data=None, headers=None, params=None, json=None, files=None,
+                     cookies=None, auth=None, hooks=None, **send_kwargs):
+        """
+        Make HTTP(S) request in lean mode, see the class docstring. Requests with explicit
+        `cookies` or `auth` are made the regular way.
+
+        Arguments:
+            snapshot (TokenSnapshot): token to authorize the request with
+            send_kwargs: arguments of `requests.Session.send`, e.g. `timeout`
+
+        Returns:
+            Response object.
+        """
+        if cookies is not None or auth is not None:
+            url, headers, data = snapshot.add_token(method, url, data, headers)
+            return requests.Session.request(
+                self, method, url, data=data, headers=headers, params=params, json=json, files=files,
+                cookies=cookies, auth=auth, hooks=hooks, **send_kwargs
+            )
+        if data is None and headers is None and params is None and json is None and files is None and hooks is None:
+            prepared = self.prepared_template(snapshot, method, url)
+        else:
+            url, headers, data = snapshot.add_token(method, url, data, headers)
+            prepared = self.prepare_lean(method, url, data, headers, params, json, files, hooks)
+        return self.send(prepared, **send_kwargs)
+
+    def prepare_lean(self, method, url, data=None, headers=None, params=None, json=None, files=None, hooks=None):
+        """
+        Same as `requests.Session.prepare_request`, without cookies and auth.
+
+        Returns:
+            requests.PreparedRequest:
+        """
+        prepared = requests.PreparedRequest()
+        prepared._cookies = self.cookies  # pylint: disable=protected-access
+        prepared.prepare_method(method)
+        prepared.prepare_url(url, params)
+        prepared.prepare_headers(merge_setting(headers, self.headers, dict_class=CaseInsensitiveDict))
+        prepared.prepare_body(data, files, json)
+        prepared.prepare_hooks(merge_hooks(hooks, self.hooks))
+        return prepared
+
+    def prepared_template(self, snapshot, method, url):
+        """
+        Get a request without body, params and extra headers, copied from a cached template.
+        Templates are cached only for tokens added by a precomputed header.
+
+        Returns:
+            requests.PreparedRequest:
+
+        Raises:
+            TokenExpiredError: when the token is known to be expired
+        """
+        key = (method, url)
+        cached = self._templates.get(key)
+        if cached is not None and cached[0] is snapshot:
+            snapshot.check_expiry()
+            return cached[1].copy()
+        url, headers, data = snapshot.add_token(method, url, None, None)
+        template = self.prepare_lean(method, url, data, headers)
+        if snapshot.has_static_headers:
+            if len(self._templates) >= self.TEMPLATE_CACHE_SIZE:
+                self._templates.clear()
+            self._templates[key] = (snapshot, template)
+        return template.copy()
+
+    def renew_snapshot(self, stale):
+        """
+        Replace an expired token with a new one. Only one thread renews the token, the others
+        finding the same token expired wait for it and use the new token.
+
+        Arguments:
+            stale (TokenSnapshot): the token found expired
+
+        Returns:
+            TokenSnapshot: the new token
+        """
+        with self._refresh_lock:
+            if self._snapshot is stale:
+                log.debug("Attempting to fetch a new token for %s", self.app)
+                new_token = renew_token(self.app, stale.access_token)
+                self.token = new_token.to_client_dict()
+            return self._snapshot
 
 
 def get_client(app_name):
@@ -133,10 +727,13 @@ def get_client(app_name):
     Returns HTTP(S) client for authenticated communication with Resource Owner specified by the
     `app_name` parameter. Identification is by means of OAuth token.
 
-    The access token is loaded from the database, if there is a valid one.
+    The access token is loaded from the database, if there is a valid one (see `oauth2_client.storage`).
     Otherwise - new token is fetched from the auth provider by HTTP(S) and stored in the database.
     The new token is then used for communication. Tokens are automatically refreshed by repeating
-    the authorization flow.
+    the authorization flow. With `OAUTH2_CLIENT_LOCAL_TOKEN_CACHE` enabled, a valid token cached
+    in this process is used without querying the database (see `oauth2_client.cache`). With
+    `OAUTH2_CLIENT_BROKER_SOCKET` set, tokens are obtained from the token broker instead
+    (see `oauth2_client.broker`).
 
     Arguments:
         app_name (str): name of the OAuth client application to make requests to e.g. license.
@@ -144,35 +741,146 @@ def get_client(app_name):
     Returns:
         client (oauth2_client.OAuth2Client): OAuth2 client for authenticated HTTP(S) communication
     """
-    token = AccessToken.objects.filter(application__name=app_name).order_by('-created').first()
+    use_cache = is_local_cache_enabled()
+    cached = token_cache.get(app_name) if use_cache else None
+    if cached:
+        app, token = cached
+    else:
+        app, token = load_or_fetch_token(app_name)
+        if use_cache:
+            token_cache.set(app, token)
+    return OAuth2Client(token, app)
+
+
+def is_local_cache_enabled():
+    """
+    Tokens received from the broker are always kept in the local token cache, the broker
+    is not asked again while the token is valid.
+
+    Returns:
+        bool: True if tokens are kept in the local token cache
+    """
+    return bool(get_setting('LOCAL_TOKEN_CACHE') or get_setting('BROKER_SOCKET'))
+
+
+def load_or_fetch_token(app_name):
+    """
+    Get a valid token of an Application from the broker, if configured and available.
+    Otherwise load it from the database, or fetch a new one if there is no valid token stored.
+
+    Arguments:
+        app_name (str): name of the Application
+
+    Returns:
+        tuple: the Application and its oauth2_client.tokens.TokenValue
+    """
+    broker = broker_client()
+    if broker:
+        app = load_application(app_name)
+        try:
+            return app, broker.get_token(app)
+        except BrokerUnavailable as e:
+            log.warning('%s. Falling back to fetching the token directly.', e)
+
+    token = load_token(app_name)
     if not token or token.is_expired():
-        app = token.application if token else Application.objects.get(name=app_name)
+        app = token.application if token else load_application(app_name)
         token = fetch_and_store_token(app)
-    return OAuth2Client(token)
+    return token.application, TokenValue.from_token(token)
 
 
-@retry(wait_fixed=2000, stop_max_attempt_number=2)
+def renew_token(app, stale_token):
+    """
+    Get a new token after the current one was found expired. The broker is asked for it,
+    if configured and available. Otherwise it is fetched from the auth provider.
+
+    Arguments:
+        app (oauth2_client.models.Application): oauth application instance
+        stale_token (str): the expired access token
+
+    Returns:
+        oauth2_client.tokens.TokenValue: access token
+    """
+    broker = broker_client()
+    if broker:
+        try:
+            token = broker.get_token(app, stale_token=stale_token)
+            token_cache.set(app, token)
+            return token
+        except BrokerUnavailable as e:
+            log.warning('%s. Falling back to fetching the token directly.', e)
+    return TokenValue.from_token(fetch_and_store_token(app))
+
+
+# seconds between the attempts to fetch a token
+FETCH_RETRY_WAIT = 2
+
+
+def stop_fetching(attempt_number, delay_since_first_attempt_ms):  # pylint: disable=unused-argument
+    """
+    Stop after the 2nd attempt to fetch a token, or once the current deadline leaves no time for another.
+    """
+    deadline = current_deadline()
+    return attempt_number >= 2 or (deadline is not None and deadline.remaining() <= FETCH_RETRY_WAIT)
+
+
+@retry(wait_fixed=FETCH_RETRY_WAIT * 1000, stop_func=stop_fetching)
 def fetch_and_store_token(app):
     """
-    Obtain a new token from auth provider and store in database. If unable to
-    parse received data as an AccessToken - wait 2s and try to fetch again. If
-    still unable - raise KeyError.
+    Obtain a new token from auth provider and store in database, according to the
+    token storage mode (see `oauth2_client.storage`). If unable to parse received
+    data as an AccessToken - wait 2s and try to fetch again. If still unable - raise
+    KeyError. There is no second attempt when the current deadline (see `oauth2_client.deadline`)
+    leaves no time for it. The new token replaces the one in the local token cache, and other
+    processes are notified about it (see `oauth2_client.notify`).
 
     Arguments:
         app (oauth2_client.models.Application): oauth application instance
 
     Returns:
-        oauth2_client.models.AccessToken: access token
+        oauth2_client.models.AccessToken or oauth2_client.models.CurrentAccessToken: access token
 
     Raises:
         KeyError:
     """
-    token = fetch_token(app)
-    token.save()
+    token = store_token(fetch_token(app))
+    if is_local_cache_enabled():
+        token_cache.set(app, TokenValue.from_token(token))
+    publish(EVENT_TOKEN, app.name)
     log.debug('Fetched and stored %s', token)
     return token
 
 
+def warm_tokens(app_names=None):
+    """
+    Put valid tokens in the local token cache, fetching the expired ones. Meant to be
+    called in the master process of a preloaded app, so the forked workers start with
+    valid tokens. `OAUTH2_CLIENT_LOCAL_TOKEN_CACHE` has to be enabled for the workers to
+    use them. Database connections are closed afterwards, so they are not inherited by
+    the workers.
+
+    Arguments:
+        app_names (list): names of the Applications, all the Applications when not given
+    """
+    if app_names is None:
+        app_names = list(Application.objects.values_list('name', flat=True))
+    for app_name in app_names:
+        token_cache.set(*load_or_fetch_token(app_name))
+    connections.close_all()
+
+
+@after_fork_in_child
+def reset_after_fork():
+    """
+    Re-create state inherited from the parent process: connection pools and token refresh
+    locks of the clients, and the lock of the circuit breaker.
+    """
+    request_breaker._lock = threading.RLock()  # pylint: disable=protected-access
+    for client in list(_clients):
+        client.reset_connection_pools()
+        client.reset_refresh_lock()
+
+
 def is_invalid_jwt_grant(resp):
     """
     Detect invalid OAuth 2.0 JWT token response returned from Salesforce (e.g. expired token)
@@ -182,6 +890,6 @@ def is_invalid_jwt_grant(resp):
     """
     if resp.status_code == 400 \
             and resp.headers.get('content-type') == 'application/json' \
-            and resp.json().get('error') == 'invalid_grant':
+            and json_codec().loads(resp.content).get('error') == 'invalid_grant':
         return True
     return False
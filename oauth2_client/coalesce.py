@@ -0,0 +1,141 @@
+"""
+Coalescing of identical in-flight requests: while a GET is in flight, the same GET
+made by other threads of the process, by any OAuth2Client of the same Application,
+waits for it instead of making its own upstream call. Every caller gets its own copy
+of the response, or the exception of the call.
+
+Enabled with `coalesce=True` of the client or the `OAUTH2_CLIENT_COALESCE_REQUESTS`
+setting. Requests are identical when they have the same Application, URL, query,
+headers (session headers included) and response type. Only the requests the response
+cache would serve are coalesced: GETs without body, streaming, cookies, auth, hooks or
+disabled redirects. The timeout of the first request applies to the others, the requests
+joining a call wait for it until their own deadline (see `oauth2_client.deadline`).
+
+Counters of the calls made and of the requests which joined one: `coalescer.stats()`.
+"""
+import threading
+
+import requests
+
+from oauth2_client.deadline import DeadlineExceeded, current_deadline
+from oauth2_client.transport import LightResponse
+from oauth2_client.utils.fork import after_fork_in_child
+
+
+class Call(object):
+    """
+    An upstream call, with its outcome once done.
+    """
+    __slots__ = ('done', 'response', 'error')
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.response = None
+        self.error = None
+
+
+class Coalescer(object):
+    """
+    Thread-safe registry of the in-flight calls.
+    """
+
+    def __init__(self):
+        self._calls = {}
+        self._lock = threading.Lock()
+        self._counters = {'calls': 0, 'coalesced': 0}
+
+    def call(self, key, func, *args, **kwargs):
+        """
+        Call `func`, unless a call of the same key is in flight: wait for it then.
+
+        Args:
+            key: hashable identity of the request
+            func (callable): makes the request, returns a response
+
+        Returns:
+            the response of `func` for the caller making the call, a copy of it for the others
+
+        Raises:
+            DeadlineExceeded: the call wasn't done before the deadline of the caller joining it
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = Call()
+            self._counters['calls' if leader else 'coalesced'] += 1
+        if not leader:
+            deadline = current_deadline()
+            if deadline is None:
+                call.done.wait()
+            elif not call.done.wait(max(0.0, deadline.remaining())):
+                raise DeadlineExceeded(deadline.budget)
+            if call.error is not None:
+                raise call.error
+            return copy_response(call.response)
+        try:
+            call.response = func(*args, **kwargs)
+            return call.response
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+    def stats(self):
+        """
+        Returns:
+            dict: upstream calls made, and requests which joined a call in flight
+        """
+        with self._lock:
+            return dict(self._counters)
+
+    def reset_counters(self):
+        with self._lock:
+            self._counters = dict.fromkeys(self._counters, 0)
+
+    def reset_after_fork(self):
+        """
+        Forget the calls of the parent process, their threads don't exist in the child.
+        """
+        self._calls = {}
+        self._lock = threading.Lock()
+
+
+def copy_response(response):
+    """
+    Args:
+        response: `requests.Response` or `LightResponse`, with its body read
+
+    Returns:
+        an independent copy of the response, sharing only the immutable body
+    """
+    if isinstance(response, LightResponse):
+        return LightResponse(
+            response.status_code, response.reason, response.headers.copy(), response.content, response.url
+        )
+    copied = requests.Response()
+    copied.__setstate__(response.__getstate__())
+    copied.headers = response.headers.copy()
+    copied.cookies = response.cookies.copy()
+    copied.history = list(response.history)
+    return copied
+
+
+def request_key(app_name, url, headers, light):
+    """
+    Args:
+        url (str): absolute URL, query included
+        headers: request headers, session headers included
+        light (bool): the response is a `LightResponse`
+
+    Returns:
+        tuple: identity of a request
+    """
+    return app_name, url, tuple(sorted((name.lower(), value) for name, value in headers.items())), light
+
+
+coalescer = Coalescer()
+after_fork_in_child(coalescer.reset_after_fork)
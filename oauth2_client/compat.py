@@ -3,11 +3,26 @@ Support for python 2.7 and 3.x and for multiple versions of Django.
 """
 try:
     # python 3.x
-    from urllib.parse import urljoin, urlsplit
+    from urllib.parse import urlencode, urljoin, urlsplit
 except ImportError:
     # python 2.7
+    from urllib import urlencode  # noqa
     from urlparse import urljoin, urlsplit
 
+try:
+    # python 3.x
+    import socketserver
+except ImportError:
+    # python 2.7
+    import SocketServer as socketserver  # noqa
+
+try:
+    # python 3.x
+    from time import monotonic
+except ImportError:
+    # python 2.7, not monotonic but the best available
+    from time import time as monotonic  # noqa
+
 
 """
 `HelpTextFormatter` is a best-effort approach to provide readable formatting in
@@ -0,0 +1,204 @@
+"""
+Adaptive concurrency limiting of the OAuth2Client requests, per service host, enabled
+with the `OAUTH2_CLIENT_ADAPTIVE_CONCURRENCY` setting.
+
+The requests in flight to a host are limited, the limit adapts with AIMD, as the AIMD
+limit of Netflix's concurrency-limits:
+    - every request completing normally while at least half of the limit is used raises
+      the limit by one, up to `OAUTH2_CLIENT_CONCURRENCY_MAX_LIMIT`
+    - every dropped request lowers the limit by 10%, down to `OAUTH2_CLIENT_CONCURRENCY_MIN_LIMIT`.
+      Dropped requests are those failing (connection errors, timeouts, also when the failure
+      opens the circuit), answered 429, 503 or 504, or taking more than twice the usual latency
+      of the host, a moving average of the latencies of its requests. Requests which don't
+      reach the host (rejected by the open circuit, other limits, exceeded deadline) leave the
+      limit alone.
+
+Requests over the limit wait for a free slot up to `OAUTH2_CLIENT_CONCURRENCY_MAX_WAIT`
+seconds, 0 rejects them at once, then raise `ConcurrencyLimitExceeded`. The limiters are
+shared by all the clients and threads of the process: `concurrency_limiter(host).stats()`.
+"""
+import threading
+
+from oauth2_client.compat import monotonic, urlsplit
+from oauth2_client.conf import get_setting
+from oauth2_client.deadline import bounded_wait
+from oauth2_client.utils.fork import after_fork_in_child
+
+# responses of an overloaded service
+DROPPED_STATUS_CODES = (429, 503, 504)
+
+
+class ConcurrencyLimitExceeded(Exception):
+    """
+    The concurrency limit of a service host doesn't allow another request in flight.
+    """
+
+    def __init__(self, host, limit):
+        super(ConcurrencyLimitExceeded, self).__init__(
+            'Concurrency limit of {} reached: {} requests in flight'.format(host, limit)
+        )
+        self.host = host
+        self.limit = limit
+
+
+class AIMDLimit(object):
+    """
+    Additive increase, multiplicative decrease of a concurrency limit, with latency
+    rising above the usual counted as a drop. Not thread-safe, used under the lock of
+    the limiter.
+    """
+    BACKOFF_RATIO = 0.9
+    # a request slower than that many times the usual latency counts as dropped
+    LATENCY_TOLERANCE = 2.0
+    # weight of a latency sample in the moving average, and samples before latency is judged
+    LATENCY_SMOOTHING = 0.05
+    WARMUP_SAMPLES = 10
+
+    def __init__(self, initial, minimum, maximum):
+        self.limit = float(initial)
+        self.minimum = minimum
+        self.maximum = maximum
+        self.latency = None  # moving average of the latencies, seconds
+        self.samples = 0
+
+    def update(self, latency, in_flight, dropped):
+        """
+        Args:
+            latency (float): seconds the request took
+            in_flight (int): requests in flight when the request started, itself included
+            dropped (bool): the request failed or the service is overloaded
+        """
+        if not dropped and latency is not None:
+            dropped = self.is_slow(latency)
+            self.samples += 1
+            self.latency = latency if self.latency is None else (
+                self.latency + self.LATENCY_SMOOTHING * (latency - self.latency)
+            )
+        if dropped:
+            self.limit = max(self.minimum, self.limit * self.BACKOFF_RATIO)
+        elif in_flight * 2 >= self.limit:
+            # grow only while the limit is actually used
+            self.limit = min(self.maximum, self.limit + 1)
+
+    def is_slow(self, latency):
+        return self.samples >= self.WARMUP_SAMPLES and latency > self.latency * self.LATENCY_TOLERANCE
+
+
+class ConcurrencyLimiter(object):
+    """
+    Thread-safe adaptive limit of the requests in flight to a service host.
+    """
+
+    def __init__(self, host, initial, minimum, maximum, max_wait):
+        self.host = host
+        self.max_wait = max_wait
+        self.algorithm = AIMDLimit(initial, minimum, maximum)
+        self.in_flight = 0
+        self.rejected = 0
+        self._condition = threading.Condition(threading.Lock())
+
+    @property
+    def limit(self):
+        return int(self.algorithm.limit)
+
+    def acquire(self):
+        """
+        Take a slot, waiting up to `max_wait` seconds for one, and not past the current deadline.
+
+        Returns:
+            tuple: (start time, requests in flight), to be given to `release`
+
+        Raises:
+            ConcurrencyLimitExceeded: no slot got free in time
+        """
+        max_wait = bounded_wait(self.max_wait)
+        with self._condition:
+            if self.in_flight >= self.limit and max_wait > 0:
+                deadline = monotonic() + max_wait
+                remaining = max_wait
+                while self.in_flight >= self.limit and remaining > 0:
+                    self._condition.wait(remaining)
+                    remaining = deadline - monotonic()
+            if self.in_flight >= self.limit:
+                self.rejected += 1
+                raise ConcurrencyLimitExceeded(self.host, self.limit)
+            self.in_flight += 1
+            return monotonic(), self.in_flight
+
+    def release(self, slot, dropped=False):
+        """
+        Free a slot, and adapt the limit.
+
+        Args:
+            slot (tuple): as returned by `acquire`
+            dropped (bool): the request failed or the service is overloaded
+        """
+        started, in_flight = slot
+        with self._condition:
+            self.in_flight -= 1
+            self.algorithm.update(monotonic() - started, in_flight, dropped)
+            # the limit may have grown by one, or a slot got free
+            self._condition.notify(2)
+
+    def cancel(self, slot):  # pylint: disable=unused-argument
+        """
+        Free a slot whose request didn't reach the service host, without adapting the limit.
+
+        Args:
+            slot (tuple): as returned by `acquire`
+        """
+        with self._condition:
+            self.in_flight -= 1
+            self._condition.notify()
+
+    def stats(self):
+        """
+        Returns:
+            dict: current limit, requests in flight, requests rejected, usual latency in seconds
+        """
+        with self._condition:
+            return {
+                'limit': self.limit, 'in_flight': self.in_flight, 'rejected': self.rejected,
+                'latency': self.algorithm.latency,
+            }
+
+
+def service_key(service_host):
+    """
+    Returns:
+        str: scheme and network location of a service host, the requests to which share a limit
+    """
+    parts = urlsplit(service_host)
+    return '{}://{}'.format(parts.scheme, parts.netloc.lower())
+
+
+_limiters = {}
+_lock = threading.Lock()
+
+
+def concurrency_limiter(service_host):
+    """
+    Args:
+        service_host (str): service host of an Application
+
+    Returns:
+        ConcurrencyLimiter: the limiter of the host shared by the process, None if adaptive concurrency is disabled
+    """
+    if not get_setting('ADAPTIVE_CONCURRENCY'):
+        return None
+    key = service_key(service_host)
+    with _lock:
+        limiter = _limiters.get(key)
+        if limiter is None:
+            limiter = _limiters[key] = ConcurrencyLimiter(
+                key, get_setting('CONCURRENCY_INITIAL_LIMIT'), get_setting('CONCURRENCY_MIN_LIMIT'),
+                get_setting('CONCURRENCY_MAX_LIMIT'), get_setting('CONCURRENCY_MAX_WAIT'),
+            )
+        return limiter
+
+
+@after_fork_in_child
+def reset_after_fork():
+    global _lock  # pylint: disable=global-statement
+    _lock = threading.Lock()
+    _limiters.clear()
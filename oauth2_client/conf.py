@@ -0,0 +1,137 @@
+"""
+Settings of the `oauth2_client` application.
+
+Defaults live here and can be overridden in the Django settings of the project,
+by a setting of the same name prefixed with `OAUTH2_CLIENT_`, e.g.:
+
+    OAUTH2_CLIENT_TOKEN_STORAGE = 'current'
+
+Settings are looked up on every access, so `override_settings` works in tests.
+"""
+from django.conf import settings
+
+PREFIX = 'OAUTH2_CLIENT_'
+
+# Every fetched token is inserted as a new AccessToken row, the newest one is used.
+TOKEN_STORAGE_HISTORY = 'history'
+# One CurrentAccessToken row per Application, updated in place on every refresh.
+TOKEN_STORAGE_CURRENT = 'current'
+
+# OAuth2Client requests are made by `requests`.
+TRANSPORT_REQUESTS = 'requests'
+# OAuth2Client requests are made by urllib3 directly, see `oauth2_client.transport`.
+TRANSPORT_URLLIB3 = 'urllib3'
+
+# Responses of the OAuth2Client are cached in a process-local LRU cache, see `oauth2_client.http_cache`.
+RESPONSE_CACHE_MEMORY = 'memory'
+# Responses of the OAuth2Client are cached in a Django cache, shared by the processes.
+RESPONSE_CACHE_DJANGO = 'django'
+
+DEFAULTS = {
+    'TOKEN_STORAGE': TOKEN_STORAGE_HISTORY,
+    # In `current` storage mode, also append every fetched token to the AccessToken table, for auditing.
+    'TOKEN_HISTORY': False,
+    # Fraction of fetched tokens whose raw provider payload is stored in the RawToken table.
+    # 0.0 disables storing, 1.0 stores all of them.
+    'RAW_TOKEN_SAMPLE_RATE': 0.0,
+    # Create the token tables as UNLOGGED in PostgreSQL. Read when the `0006_unlogged_token_tables`
+    # migration is applied, and by the `oauth2client_token_tables` command switching the tables
+    # after the setting is toggled. Tokens skip the WAL and replication, but are lost on a crash.
+    'UNLOGGED_TOKEN_TABLES': False,
+    # Database aliases used by `oauth2_client.routers.TokenRouter`. With READ_DATABASE = None
+    # the router has no opinion on reads.
+    'READ_DATABASE': None,
+    'WRITE_DATABASE': 'default',
+    # Keep tokens in a process-local cache, see `oauth2_client.cache`.
+    'LOCAL_TOKEN_CACHE': False,
+    # PostgreSQL NOTIFY channel used to invalidate local caches across processes, see `oauth2_client.notify`.
+    # None disables publishing.
+    'NOTIFY_CHANNEL': None,
+    # Unix socket of the token broker (see `oauth2_client.broker`). None makes the processes fetch
+    # their tokens themselves.
+    'BROKER_SOCKET': None,
+    # Seconds to wait for the broker before falling back to fetching the token directly.
+    'BROKER_TIMEOUT': 1.0,
+    # Seconds before expiry the broker refreshes a token in the background, serving the current one meanwhile.
+    'BROKER_LEAD_TIME': 120.0,
+    # Seconds, connect and read timeouts of the OAuth2Client requests and of the requests to the token endpoints,
+    # unless set per Application. None for no timeout. See `oauth2_client.timeouts`.
+    'REQUEST_CONNECT_TIMEOUT': 5.0,
+    'REQUEST_READ_TIMEOUT': 30.0,
+    'TOKEN_CONNECT_TIMEOUT': 5.0,
+    'TOKEN_READ_TIMEOUT': 15.0,
+    # Defaults of the `oauth2client_refresher` command, see `oauth2_client.refresher`.
+    # Seconds before expiry a token is refreshed, random spread added to that, maximum of parallel
+    # refreshes, and seconds between checks for Application changes.
+    'REFRESHER_LEAD_TIME': 120.0,
+    'REFRESHER_JITTER': 30.0,
+    'REFRESHER_CONCURRENCY': 4,
+    'REFRESHER_RELOAD_INTERVAL': 30.0,
+    # Add Bearer tokens to the requests with an `Authorization` header built once per token, instead of
+    # going through oauthlib's `add_token` on every request. Other token types always use oauthlib.
+    'FAST_AUTH_HEADER': True,
+    # Default of the OAuth2Client lean mode: no environment settings merging, no cookies, cached prepared
+    # request templates. See `oauth2_client.client.OAuth2Client`.
+    'LEAN_REQUESTS': False,
+    # Default transport of the OAuth2Client.
+    'TRANSPORT': TRANSPORT_REQUESTS,
+    # JSON codec of token responses and JSON helpers of the OAuth2Client, see `oauth2_client.utils.json_codec`.
+    'JSON_CODEC': 'auto',
+    # Bytes, request bodies smaller than that are sent uncompressed by the Applications with request compression
+    # enabled, unless set per Application, see `oauth2_client.compression`.
+    'REQUEST_COMPRESSION_MIN_SIZE': 1024,
+    # Default of the OAuth2Client coalescing of identical in-flight GETs, see `oauth2_client.coalesce`.
+    'COALESCE_REQUESTS': False,
+    # Seconds a request waits for the rate limit of its Application before raising RateLimited, unless set per
+    # Application, see `oauth2_client.ratelimit`.
+    'RATE_LIMIT_MAX_WAIT': 30.0,
+    # Limit the requests in flight per service host, adapting the limit to the latency and errors, see
+    # `oauth2_client.concurrency`. Initial, lowest and highest limit, and seconds a request over the limit
+    # waits for a free slot, 0 to reject it at once.
+    'ADAPTIVE_CONCURRENCY': False,
+    'CONCURRENCY_INITIAL_LIMIT': 20,
+    'CONCURRENCY_MIN_LIMIT': 1,
+    'CONCURRENCY_MAX_LIMIT': 200,
+    'CONCURRENCY_MAX_WAIT': 0.05,
+    # Default cap of the requests in flight per Application, None for no cap, and seconds a request over the cap
+    # waits for a free slot. Set per Application in `extra_settings`, see `oauth2_client.bulkhead`.
+    'BULKHEAD_MAX_IN_FLIGHT': None,
+    'BULKHEAD_MAX_WAIT': 0.5,
+    # Hedges allowed per request, for the Applications with hedging enabled, unless set per Application.
+    # See `oauth2_client.hedge`.
+    'HEDGE_BUDGET': 0.05,
+    # Retries of the idempotent OAuth2Client requests failing with a connection error or answered with one of the
+    # status codes, unless set per Application, 0 disables retries (default). 503 is left to the rate limiter.
+    # Seconds of the backoff before the first retry and at most, and retries allowed per request by the retry
+    # budget of the process. See `oauth2_client.retry`.
+    'RETRIES': 0,
+    'RETRY_STATUS_CODES': (502, 504),
+    'RETRY_BACKOFF': 0.05,
+    'RETRY_MAX_BACKOFF': 1.0,
+    'RETRY_BUDGET': 0.1,
+    # Storage of the OAuth2Client response cache, `memory` or `django`, None disables the cache.
+    # See `oauth2_client.http_cache`.
+    'RESPONSE_CACHE': None,
+    # Limits of the `memory` storage: number of entries and their total size in bytes.
+    'RESPONSE_CACHE_MAX_ENTRIES': 1024,
+    'RESPONSE_CACHE_MAX_BYTES': 32 * 1024 * 1024,
+    # Bytes, larger responses are not cached.
+    'RESPONSE_CACHE_MAX_ENTRY_BYTES': 1024 * 1024,
+    # Seconds a stale response is served when the request fails, unless set by its `stale-if-error` directive.
+    'RESPONSE_CACHE_STALE_IF_ERROR': 0,
+    # Django cache of the `django` storage.
+    'RESPONSE_CACHE_ALIAS': 'default',
+}
+
+
+def get_setting(name):
+    """
+    Get the value of an `oauth2_client` setting.
+
+    Args:
+        name (str): setting name without the prefix, e.g. `TOKEN_STORAGE`
+
+    Returns:
+        value from the Django settings if defined there, the default otherwise
+    """
+    return getattr(settings, PREFIX + name, DEFAULTS[name])
@@ -0,0 +1,140 @@
+"""
+Deadlines bounding the time of a whole OAuth2Client call: waiting for the limits, the
+request, the token renewal (broker or token endpoint, with its retry) and the repeated
+request. Given per request with the `timeout_budget` argument, in seconds:
+
+    client.get('/api/hello', timeout_budget=2.0)
+
+or for all the calls of a block of code, made by the current thread:
+
+    with Deadline(2.0):
+        client.get('/api/hello')
+        client.get('/api/world')
+
+Nested deadlines never extend the enclosing one. Every step gets the remaining budget
+as its connect/read timeout, or its own timeout if shorter, and waits for no longer
+than the remaining budget. Once the budget has run out the call fails with
+`DeadlineExceeded`, a `requests.Timeout` which doesn't open the circuit breaker.
+The read timeout bounds every read of a response, a response trickling in may still
+take longer than the budget.
+"""
+import threading
+
+import requests
+
+from oauth2_client.compat import monotonic
+
+_local = threading.local()
+
+
+class DeadlineExceeded(requests.Timeout):
+    """
+    The time budget of a call has run out.
+    """
+
+    def __init__(self, budget):
+        super(DeadlineExceeded, self).__init__('Time budget of {:.3f}s exceeded'.format(budget))
+        self.budget = budget
+
+
+class Deadline(object):
+    """
+    Point in time a call has to be done by, context manager making it the deadline of the
+    calls of the current thread.
+    """
+
+    def __init__(self, budget):
+        """
+        Args:
+            budget (float): seconds from now
+        """
+        self.budget = budget
+        self.expires_at = monotonic() + budget
+
+    def remaining(self):
+        """
+        Returns:
+            float: seconds left, negative once expired
+        """
+        return self.expires_at - monotonic()
+
+    def check(self):
+        """
+        Returns:
+            float: seconds left
+
+        Raises:
+            DeadlineExceeded: no time left
+        """
+        remaining = self.remaining()
+        if remaining <= 0:
+            raise DeadlineExceeded(self.budget)
+        return remaining
+
+    def timeout(self, timeout=None):
+        """
+        Args:
+            timeout: seconds, or a (connect, read) tuple, as accepted by `requests`, None for no timeout
+
+        Returns:
+            the timeout bounded by the time left, in the same form
+
+        Raises:
+            DeadlineExceeded: no time left
+        """
+        remaining = self.check()
+        if isinstance(timeout, tuple):
+            return tuple(remaining if value is None else min(value, remaining) for value in timeout)
+        return remaining if timeout is None else min(timeout, remaining)
+
+    def __enter__(self):
+        stack = _stack()
+        # an enclosing deadline expiring earlier stays in force
+        stack.append(self if not stack or self.expires_at < stack[-1].expires_at else stack[-1])
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        _stack().pop()
+
+
+def _stack():
+    stack = getattr(_local, 'stack', None)
+    if stack is None:
+        stack = _local.stack = []
+    return stack
+
+
+def current_deadline():
+    """
+    Returns:
+        Deadline: the deadline of the calls of the current thread, None if there is none
+    """
+    stack = getattr(_local, 'stack', None)
+    return stack[-1] if stack else None
+
+
+def timeout_for(timeout=None):
+    """
+    Args:
+        timeout: seconds, or a (connect, read) tuple, as accepted by `requests`, None for no timeout
+
+    Returns:
+        the timeout bounded by the current deadline, if any
+
+    Raises:
+        DeadlineExceeded: the current deadline has expired
+    """
+    deadline = current_deadline()
+    return timeout if deadline is None else deadline.timeout(timeout)
+
+
+def bounded_wait(seconds):
+    """
+    Args:
+        seconds (float): longest wait wanted
+
+    Returns:
+        float: the wait bounded by the time left before the current deadline, if any, never negative
+    """
+    deadline = current_deadline()
+    return seconds if deadline is None else max(0.0, min(seconds, deadline.remaining()))
@@ -0,0 +1,200 @@
+"""
+Multiple token endpoints per Application, e.g. replicas of an auth provider, listed in
+its `extra_settings` after `token_uri`:
+
+    {
+        "token_uris": ["https://auth-2.example.com/o/token/", "https://auth-3.example.com/o/token/"]
+    }
+
+The latency of the successful requests and the errors of every endpoint are tracked with
+exponentially weighted moving averages, shared by the process. Tokens are requested from
+the fastest healthy endpoint first, and from the next ones when it fails: connection
+errors, timeouts and 5xx responses. An endpoint failing most of its recent requests is
+unhealthy for `COOLDOWN` seconds, and only tried after the healthy ones. Endpoints never
+requested yet are tried first, in the order listed, those which never succeeded after
+the ones which did. Errors which would be the same on any
+endpoint, e.g. rejected credentials, don't fail over. The audience of the JWT Bearer flow
+stays derived from `token_uri`.
+
+Latencies and error rates: `endpoint_stats()`.
+"""
+import logging
+import threading
+
+import requests
+
+from oauth2_client.compat import monotonic
+from oauth2_client.deadline import DeadlineExceeded
+from oauth2_client.utils.fork import after_fork_in_child
+
+log = logging.getLogger(__name__)
+
+# weight of a new observation in the moving averages
+SMOOTHING = 0.3
+# error rate making an endpoint unhealthy, and seconds it stays unhealthy after its last failure
+UNHEALTHY_ERROR_RATE = 0.5
+COOLDOWN = 30.0
+
+
+class TokenEndpointError(Exception):
+    """
+    A token endpoint answered with a server error.
+    """
+
+    def __init__(self, token_uri, status_code):
+        super(TokenEndpointError, self).__init__(
+            'Token endpoint {} answered {}'.format(token_uri, status_code)
+        )
+        self.token_uri = token_uri
+        self.status_code = status_code
+
+
+def raise_for_server_error(token_uri, response):
+    """
+    Returns:
+        requests.Response: the response of a token endpoint
+
+    Raises:
+        TokenEndpointError: for 5xx responses
+    """
+    if response.status_code >= 500:
+        raise TokenEndpointError(token_uri, response.status_code)
+    return response
+
+
+# failures of an endpoint, other endpoints may succeed
+FAILOVER_ERRORS = (requests.ConnectionError, requests.Timeout, TokenEndpointError)
+
+
+class EndpointStats(object):
+    """
+    Moving averages of the latency and the errors of an endpoint. Not thread-safe, used under the registry lock.
+    """
+    __slots__ = ('latency', 'error_rate', 'failed_at')
+
+    def __init__(self):
+        self.latency = None  # seconds, None until a request succeeded
+        self.error_rate = 0.0
+        self.failed_at = None
+
+    def observe(self, latency, failed):
+        """
+        Args:
+            latency (float): seconds the request took
+            failed (bool): the request failed, its latency is ignored: failing fast doesn't make an endpoint fast
+        """
+        self.error_rate += SMOOTHING * ((1.0 if failed else 0.0) - self.error_rate)
+        if failed:
+            self.failed_at = monotonic()
+        elif self.latency is None:
+            self.latency = latency
+        else:
+            self.latency += SMOOTHING * (latency - self.latency)
+
+    def is_healthy(self, now):
+        return self.error_rate < UNHEALTHY_ERROR_RATE or self.failed_at is None or now - self.failed_at >= COOLDOWN
+
+
+_stats = {}
+_lock = threading.Lock()
+
+
+def token_uris(app):
+    """
+    Args:
+        app (oauth2_client.models.Application): app whose `extra_settings` may list more token endpoints
+
+    Returns:
+        list: token endpoints of the app, `token_uri` first
+    """
+    uris = [app.token_uri]
+    for uri in (app.extra_settings or {}).get('token_uris') or ():
+        if uri not in uris:
+            uris.append(uri)
+    return uris
+
+
+def ordered(uris):
+    """
+    Returns:
+        list: the endpoints, healthy ones first, the never requested ones then the fastest first
+    """
+    now = monotonic()
+    with _lock:
+        stats = [_stats.get(uri) for uri in uris]
+        keys = [
+            (False, 0.0) if stat is None else (
+                not stat.is_healthy(now), float('inf') if stat.latency is None else stat.latency
+            )
+            for stat in stats
+        ]
+    return [uri for _, _, uri in sorted(zip(keys, range(len(uris)), uris))]
+
+
+def observe(uri, latency, failed):
+    with _lock:
+        stats = _stats.get(uri)
+        if stats is None:
+            stats = _stats[uri] = EndpointStats()
+        stats.observe(latency, failed)
+
+
+def call_token_endpoints(app, func):
+    """
+    Call `func` with the token endpoints of an Application, from the preferred one, until one succeeds.
+
+    Args:
+        app (oauth2_client.models.Application): the app
+        func (callable): requests a token from the endpoint it gets
+
+    Returns:
+        the result of `func`
+
+    Raises:
+        the error of the last endpoint, or an error no other endpoint is tried on
+    """
+    uris = token_uris(app)
+    if len(uris) == 1:
+        return func(uris[0])
+    error = None
+    for uri in ordered(uris):
+        started = monotonic()
+        try:
+            result = func(uri)
+        except DeadlineExceeded:
+            raise
+        except FAILOVER_ERRORS as e:
+            observe(uri, monotonic() - started, failed=True)
+            log.warning('Token endpoint %s of %s failed, trying the next one: %r', uri, app, e)
+            error = e
+            continue
+        observe(uri, monotonic() - started, failed=False)
+        return result
+    raise error
+
+
+def endpoint_stats():
+    """
+    Returns:
+        dict: token endpoint -> latency in seconds, error rate, and if healthy
+    """
+    now = monotonic()
+    with _lock:
+        return {
+            uri: {'latency': stats.latency, 'error_rate': stats.error_rate, 'healthy': stats.is_healthy(now)}
+            for uri, stats in _stats.items()
+        }
+
+
+def reset():
+    """
+    Forget the observations of the endpoints.
+    """
+    with _lock:
+        _stats.clear()
+
+
+@after_fork_in_child
+def reset_after_fork():
+    global _lock  # pylint: disable=global-statement
+    _lock = threading.Lock()
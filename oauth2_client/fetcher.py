@@ -7,14 +7,18 @@ Supported grant types:
 - Client Credentials (e.g. service-to-service communication)
 - JWT Bearer token (e.g. Salesforce)
 
+Requests to the token endpoint have the token timeouts of the Application (see
+`oauth2_client.timeouts`), bounded by the current deadline, if any (see `oauth2_client.deadline`).
+Applications listing several token endpoints fail over between them, see `oauth2_client.endpoints`.
+
 NOTE: by `Application` or `App` we mean an OAuth application and its
     representation in the database, NOT a Django application.
     See here: https://django-oauth-toolkit.readthedocs.io/en/latest/glossary.html#application
 """
-import json
 import logging
 from base64 import urlsafe_b64encode
 from datetime import timedelta
+from functools import partial
 
 import pytz
 import requests
@@ -23,9 +27,13 @@ from oauthlib.oauth2 import BackendApplicationClient
 from requests_oauthlib import OAuth2Session
 
 from oauth2_client.compat import urlsplit
+from oauth2_client.deadline import timeout_for
+from oauth2_client.endpoints import call_token_endpoints, raise_for_server_error
+from oauth2_client.timeouts import token_timeout
 from oauth2_client.models import AccessToken, Application
 from oauth2_client.utils.crypto import sign_rs256
 from oauth2_client.utils.date_time import datetime_to_float, float_to_datetime
+from oauth2_client.utils.json_codec import json_codec
 
 log = logging.getLogger(__name__)
 
@@ -100,11 +108,10 @@ class Fetcher:
                 This probably means authentication issues on our side, e.g. bad auth request.
         """
         try:
-            return AccessToken(
+            token = AccessToken(
                 application=self.app,
                 token=raw_token['access_token'],
                 scope=self.received_scope(raw_token),
-                raw_token=raw_token,
                 token_type=raw_token['token_type'],
                 expires=expiry_date(raw_token),
             )
@@ -116,6 +123,9 @@ class Fetcher:
                 raw_token
             )
             raise
+        # not a model field, may be stored in the RawToken table, see `oauth2_client.storage`
+        token.raw_token = raw_token
+        return token
 
     def requested_scope(self):
         """
@@ -182,13 +192,21 @@ class JWTFetcher(Fetcher):
             ValidationError: if the Application object we are fetching token
                 for doesn't provide all required input data
             RequestException: from `requests` library
-            JSONDecodeError: unparseable data received
+            TokenEndpointError: server error of the token endpoint
+            ValueError: unparseable data received
         """
         self.app.validate_jwt_grant_data()
         payload = self.auth_payload()
-        response = requests.post(self.app.token_uri, data=payload)
-        data = json.loads(response.text)
-        return data
+        return call_token_endpoints(self.app, partial(self.post_payload, payload=payload))
+
+    def post_payload(self, token_uri, payload):
+        """
+        Returns:
+            dict: raw token from the token endpoint
+        """
+        response = requests.post(token_uri, data=payload, timeout=timeout_for(token_timeout(self.app)))
+        raise_for_server_error(token_uri, response)
+        return json_codec().loads(response.content)
 
     def auth_payload(self):
         """
@@ -260,14 +278,26 @@ class ClientCredentialsFetcher(Fetcher):
 
         Returns:
             dict: raw token from provider
+
+        Raises:
+            TokenEndpointError: server error of the token endpoint
+        """
+        return call_token_endpoints(self.app, self.request_token)
+
+    def request_token(self, token_uri):
+        """
+        Returns:
+            dict: raw token from the token endpoint
         """
         client = BackendApplicationClient(client_id=self.app.client_id)
         oauth = OAuth2Session(client=client)
+        oauth.register_compliance_hook('access_token_response', partial(raise_for_server_error, token_uri))
         return oauth.fetch_token(
-            token_url=self.app.token_uri,
+            token_url=token_uri,
             client_id=self.app.client_id,
             client_secret=self.app.client_secret,
-            scope=self.requested_scope()
+            scope=self.requested_scope(),
+            timeout=timeout_for(token_timeout(self.app)),
         )
 
 
@@ -0,0 +1,333 @@
+"""
+Hedged requests: when an idempotent request of the OAuth2Client gets no response within
+a delay, the same request is sent again, the first response is used and the other one
+discarded. Cuts the tail latency caused by occasional slow instances of a service.
+Configured per Application in its `extra_settings`:
+
+    {
+        "hedge": true,
+        "hedge_delay": 0.05,     # seconds, the `hedge_percentile` of the observed latencies when not given
+        "hedge_percentile": 95,  # used without `hedge_delay`
+        "hedge_budget": 0.05     # hedges per request, OAUTH2_CLIENT_HEDGE_BUDGET when not given
+    }
+
+Only requests with idempotent methods (GET, HEAD, OPTIONS, TRACE, PUT, DELETE), and a
+body which can be sent twice, are hedged. The attempts of a hedged request run in their own threads, each one within the
+limits of the Application and the service host. A discarded request can't be cancelled,
+it runs to its end and its response is closed. Without `hedge_delay`, requests are not
+hedged until `MIN_SAMPLES` latencies have been observed. While the budget can't pay for a
+hedge, requests run in the calling thread.
+
+An attempt losing to another one doesn't count on the circuit breaker: its failure is
+excluded when another attempt of the request already got a response or is still being sent,
+see `sending_attempt`. The failure of the last attempt left counts.
+
+The budget caps the extra load: the hedges of an Application are at most `hedge_budget`
+of its requests, plus `MAX_BUDGET_BALANCE` at once. Counters per Application:
+`hedger(app).stats()`.
+"""
+import threading
+from collections import deque
+from contextlib import contextmanager
+
+from oauth2_client.compat import monotonic
+from oauth2_client.conf import get_setting
+from oauth2_client.deadline import current_deadline
+from oauth2_client.http_cache import SAFE_METHODS
+from oauth2_client.utils.budget import Budget
+from oauth2_client.utils.fork import after_fork_in_child
+
+# methods whose requests can be sent twice
+IDEMPOTENT_METHODS = SAFE_METHODS + ('PUT', 'DELETE')
+
+# latencies the percentile is computed from, how many are needed before hedging, and how
+# many new ones trigger computing it again
+LATENCY_WINDOW = 1000
+MIN_SAMPLES = 20
+RECOMPUTE_EVERY = 50
+
+# hedges allowed at once
+MAX_BUDGET_BALANCE = 10
+
+# hedged call of the attempt running in the thread, and the error of a lost attempt
+_local = threading.local()
+
+
+class LatencyWindow(object):
+    """
+    Thread-safe window of the latest latencies, with a percentile of them computed from time to time.
+    """
+
+    def __init__(self, percentile, size=LATENCY_WINDOW):
+        self.percentile = percentile
+        self.value = None  # the percentile, None until MIN_SAMPLES latencies observed
+        self._latencies = deque(maxlen=size)
+        self._pending = 0  # latencies added since the percentile was computed
+        self._lock = threading.Lock()
+
+    def add(self, latency):
+        with self._lock:
+            self._latencies.append(latency)
+            self._pending += 1
+            if len(self._latencies) >= MIN_SAMPLES and (self.value is None or self._pending >= RECOMPUTE_EVERY):
+                ordered = sorted(self._latencies)
+                self.value = ordered[min(len(ordered) - 1, int(len(ordered) * self.percentile / 100.0))]
+                self._pending = 0
+
+
+class HedgedCall(object):
+    """
+    Attempts of one request, each one in its own thread. The first response wins.
+    """
+
+    def __init__(self):
+        self.response = None
+        self.winner = None  # number of the attempt whose response won
+        self.errors = []
+        self.started = 0
+        self.finished = 0
+        self.sending = 0  # attempts being sent, within the circuit breaker
+        self.succeeded = False  # an attempt got a response through the circuit breaker
+        self._condition = threading.Condition(threading.Lock())
+
+    @property
+    def done(self):
+        return self.winner is not None or self.finished == self.started
+
+    def start(self, func, *args, **kwargs):
+        """
+        Start an attempt in a new thread, within the deadline of the calling thread.
+        """
+        with self._condition:
+            self.started += 1
+            attempt = self.started
+        thread = threading.Thread(target=self._run, args=(attempt, current_deadline(), func, args, kwargs))
+        thread.daemon = True
+        thread.start()
+
+    def wait(self, timeout=None):
+        """
+        Wait for a response, or for all the attempts to fail.
+
+        Returns:
+            bool: True if done
+        """
+        with self._condition:
+            if timeout is None:
+                while not self.done:
+                    self._condition.wait()
+                return True
+            end = monotonic() + timeout
+            remaining = timeout
+            while not self.done and remaining > 0:
+                self._condition.wait(remaining)
+                remaining = end - monotonic()
+            return self.done
+
+    def result(self):
+        """
+        Returns:
+            the winning response
+
+        Raises:
+            the error of the first attempt, if all of them failed
+        """
+        if self.winner is None:
+            raise self.errors[0]
+        return self.response
+
+    def enter_sending(self):
+        with self._condition:
+            self.sending += 1
+
+    def exit_sending(self, failed):
+        """
+        Returns:
+            bool: True if the attempt failed and lost: another one got a response or is still being sent
+        """
+        with self._condition:
+            self.sending -= 1
+            if not failed:
+                self.succeeded = True
+            return failed and (self.succeeded or self.sending > 0)
+
+    def _run(self, attempt, deadline, func, args, kwargs):
+        _local.call = self
+        if deadline is not None:
+            with deadline:
+                self._attempt(attempt, func, args, kwargs)
+        else:
+            self._attempt(attempt, func, args, kwargs)
+
+    def _attempt(self, attempt, func, args, kwargs):
+        response = error = None
+        try:
+            response = func(*args, **kwargs)
+        except Exception as e:  # pylint: disable=broad-except
+            error = e
+        with self._condition:
+            self.finished += 1
+            won = response is not None and self.winner is None
+            if won:
+                self.winner = attempt
+                self.response = response
+            elif error is not None:
+                self.errors.append(error)
+            self._condition.notify_all()
+        if response is not None and not won:
+            response.close()
+
+
+class Hedger(object):
+    """
+    Hedging of the requests of an Application.
+    """
+
+    def __init__(self, app_name, delay, percentile, budget):
+        self.app_name = app_name
+        self.config = (delay, percentile, budget)
+        self.fixed_delay = delay
+        self.latencies = LatencyWindow(percentile)
+        self.budget = Budget(budget, MAX_BUDGET_BALANCE)
+        self._counters = {'requests': 0, 'hedged': 0, 'hedge_won': 0, 'over_budget': 0}
+        self._lock = threading.Lock()
+
+    @property
+    def delay(self):
+        """
+        Returns:
+            float: seconds to wait for a response before hedging, None while latencies are still collected
+        """
+        return self.fixed_delay if self.fixed_delay is not None else self.latencies.value
+
+    def call(self, func, *args, **kwargs):
+        """
+        Call `func` making the request, and again in parallel if it takes longer than the delay.
+
+        Returns:
+            the first response
+
+        Raises:
+            the error of the first attempt, if all of them failed
+        """
+        self.budget.deposit()
+        self.count('requests')
+        delay = self.delay
+        if delay is None:
+            return self.timed(func, *args, **kwargs)
+        if self.budget.balance < 1:
+            started = monotonic()
+            try:
+                return self.timed(func, *args, **kwargs)
+            finally:
+                if monotonic() - started > delay:
+                    self.count('over_budget')
+        call = HedgedCall()
+        call.start(self.timed, func, *args, **kwargs)
+        if not call.wait(delay):
+            if self.budget.withdraw():
+                self.count('hedged')
+                call.start(self.timed, func, *args, **kwargs)
+            else:
+                self.count('over_budget')
+        call.wait()
+        if call.winner == 2:
+            self.count('hedge_won')
+        return call.result()
+
+    def timed(self, func, *args, **kwargs):
+        started = monotonic()
+        response = func(*args, **kwargs)
+        self.latencies.add(monotonic() - started)
+        return response
+
+    def count(self, name):
+        with self._lock:
+            self._counters[name] += 1
+
+    def stats(self):
+        """
+        Returns:
+            dict: requests, hedges sent, hedges whose response won, hedges not sent for lack of budget,
+                and the current delay
+        """
+        with self._lock:
+            return dict(self._counters, delay=self.delay)
+
+
+@contextmanager
+def sending_attempt():
+    """
+    Context of the request sent by an attempt of a hedged request, if the current thread runs
+    one, within the circuit breaker. The error of an attempt which lost is recorded for
+    `is_lost_attempt_error`.
+    """
+    call = getattr(_local, 'call', None)
+    if call is None:
+        yield
+        return
+    call.enter_sending()
+    try:
+        yield
+    except BaseException as e:
+        if call.exit_sending(failed=True):
+            _local.lost_error = e
+        raise
+    call.exit_sending(failed=False)
+
+
+def is_lost_attempt_error(error):
+    """
+    Exclusion of the circuit breaker.
+
+    Returns:
+        bool: True if `error` is the failure of a hedged attempt which lost, see `sending_attempt`
+    """
+    return error is getattr(_local, 'lost_error', None)
+
+
+def is_repeatable_request(method, data, kwargs):
+    """
+    Used for hedges and retries.
+
+    Returns:
+        bool: True if the request can be sent again: idempotent, with a body which can be sent twice,
+            not a file or a generator read by the first attempt
+    """
+    if method.upper() not in IDEMPOTENT_METHODS or kwargs.get('stream') or kwargs.get('files') is not None:
+        return False
+    return data is None or isinstance(data, (bytes, type(u''), dict, list, tuple))
+
+
+_hedgers = {}
+_lock = threading.Lock()
+
+
+def hedger(app):
+    """
+    Args:
+        app (oauth2_client.models.Application): app whose `extra_settings` configure hedging
+
+    Returns:
+        Hedger: the hedger of the app shared by the process, None if hedging isn't enabled for the app
+    """
+    extra_settings = app.extra_settings or {}
+    if not extra_settings.get('hedge'):
+        return None
+    config = (
+        extra_settings.get('hedge_delay'),
+        extra_settings.get('hedge_percentile', 95),
+        extra_settings.get('hedge_budget', get_setting('HEDGE_BUDGET')),
+    )
+    with _lock:
+        existing = _hedgers.get(app.name)
+        if existing is None or existing.config != config:
+            existing = _hedgers[app.name] = Hedger(app.name, *config)
+        return existing
+
+
+@after_fork_in_child
+def reset_after_fork():
+    global _lock  # pylint: disable=global-statement
+    _lock = threading.Lock()
+    _hedgers.clear()
@@ -0,0 +1,455 @@
+"""
+Cache of the responses to the GET requests of the OAuth2Client, a private HTTP cache
+as of RFC 7234. Enabled with the `OAUTH2_CLIENT_RESPONSE_CACHE` setting: `memory` for a
+process-local LRU cache, `django` for a Django cache (`OAUTH2_CLIENT_RESPONSE_CACHE_ALIAS`),
+shared by the processes. Applications with `"response_cache": false` in their
+`extra_settings` are not cached.
+
+Entries are keyed by the Application and the URL, query included, and hold one variant:
+the values of the request headers named by the `Vary` response header. The Authorization
+header is not part of it, the requests of an Application share its credentials.
+
+Only 200 responses are stored, with a freshness lifetime (`Cache-Control: max-age`, or
+`Expires`), a validator (`ETag`, `Last-Modified`) or a `stale-if-error` time. Responses
+with `no-store`, `Vary: *` or a body over `OAUTH2_CLIENT_RESPONSE_CACHE_MAX_ENTRY_BYTES`
+are not. Fresh entries are served without a request. Stale ones are revalidated with `If-None-Match` and
+`If-Modified-Since`, a 304 refreshes the entry and the cached body is served. When the
+request fails (connection error, timeout, open circuit, rate, concurrency or bulkhead limit, 5xx)
+a stale entry is served for `stale-if-error` seconds of `Cache-Control`, or
+`OAUTH2_CLIENT_RESPONSE_CACHE_STALE_IF_ERROR`.
+Successful unsafe requests (POST, PUT, ...) invalidate the entry of their URL.
+
+Counters of hits, misses, revalidations and stale responses served: `response_cache().stats()`.
+"""
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from email.utils import mktime_tz, parsedate_tz
+
+import requests
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_encoding_from_headers
+
+from oauth2_client.compat import urlencode, urlsplit
+from oauth2_client.conf import RESPONSE_CACHE_DJANGO, RESPONSE_CACHE_MEMORY, get_setting
+from oauth2_client.transport import LightResponse
+from oauth2_client.utils.fork import after_fork_in_child
+
+# methods not invalidating the cached responses
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS', 'TRACE')
+
+# request headers making the caller handle the caching itself
+CONDITIONAL_HEADERS = ('If-None-Match', 'If-Modified-Since', 'If-Match', 'If-Unmodified-Since', 'If-Range')
+
+
+class CachedResponse(object):
+    """
+    A stored response, with its freshness information. Never modified once created.
+    """
+    __slots__ = (
+        'status_code', 'reason', 'headers', 'content', 'url', 'vary', 'stored_at', 'max_age', 'stale_if_error',
+    )
+
+    def __init__(self, status_code, reason, headers, content, url, vary, stored_at, max_age, stale_if_error):
+        """
+        Args:
+            headers (dict): response headers
+            vary (tuple): (lowercase name, value) pairs of the request headers named by `Vary`
+            stored_at (float): timestamp the response was received at, less its `Age`
+            max_age (float): seconds the response is fresh for
+            stale_if_error (float): seconds after `max_age` the response can be served on errors
+        """
+        self.status_code = status_code
+        self.reason = reason
+        self.headers = headers
+        self.content = content
+        self.url = url
+        self.vary = vary
+        self.stored_at = stored_at
+        self.max_age = max_age
+        self.stale_if_error = stale_if_error
+
+    @classmethod
+    def from_response(cls, response, request_headers, now=None):
+        """
+        Args:
+            response: `requests.Response` or `LightResponse`
+            request_headers (CaseInsensitiveDict): headers of the request, session headers included
+
+        Returns:
+            CachedResponse: None if the response can't be stored
+        """
+        if response.status_code != 200:
+            return None
+        headers = CaseInsensitiveDict(response.headers)
+        directives = cache_control(headers)
+        vary_names = [name.strip().lower() for name in headers.get('Vary', '').split(',') if name.strip()]
+        if 'no-store' in directives or '*' in vary_names:
+            return None
+        max_age = freshness_lifetime(headers, directives)
+        usable_stale = stale_if_error(directives)
+        if not (max_age or usable_stale or 'ETag' in headers or 'Last-Modified' in headers):
+            return None
+        if len(response.content) > get_setting('RESPONSE_CACHE_MAX_ENTRY_BYTES'):
+            return None
+        now = time.time() if now is None else now
+        return cls(
+            response.status_code, response.reason, dict(headers), response.content, response.url,
+            vary_values(vary_names, request_headers), now - age(headers), max_age, usable_stale,
+        )
+
+    @property
+    def size(self):
+        """
+        Returns:
+            int: approximate bytes held by the entry
+        """
+        return len(self.content) + sum(len(name) + len(value) for name, value in self.headers.items())
+
+    def matches(self, request_headers):
+        """
+        Returns:
+            bool: True if the request headers select this variant
+        """
+        return self.vary == vary_values([name for name, _ in self.vary], request_headers)
+
+    def is_fresh(self, now=None):
+        return (time.time() if now is None else now) < self.stored_at + self.max_age
+
+    def is_usable_on_error(self, now=None):
+        return (time.time() if now is None else now) < self.stored_at + self.max_age + self.stale_if_error
+
+    def validators(self):
+        """
+        Returns:
+            dict: conditional request headers revalidating the entry
+        """
+        stored = CaseInsensitiveDict(self.headers)
+        headers = {}
+        if 'ETag' in stored:
+            headers['If-None-Match'] = stored['ETag']
+        if 'Last-Modified' in stored:
+            headers['If-Modified-Since'] = stored['Last-Modified']
+        return headers
+
+    def revalidated(self, not_modified, now=None):
+        """
+        Args:
+            not_modified: the 304 response revalidating the entry
+
+        Returns:
+            CachedResponse: the entry updated with the headers of the 304 response
+        """
+        headers = CaseInsensitiveDict(self.headers)
+        content_length = headers.get('Content-Length', str(len(self.content)))
+        headers.update(not_modified.headers)
+        # a 304 has no body, the stored one is served
+        headers['Content-Length'] = content_length
+        directives = cache_control(headers)
+        now = time.time() if now is None else now
+        return CachedResponse(
+            self.status_code, self.reason, dict(headers), self.content, self.url, self.vary,
+            now - age(headers), freshness_lifetime(headers, directives), stale_if_error(directives),
+        )
+
+    def to_response(self, light=False):
+        """
+        Args:
+            light (bool): make a `LightResponse`, for the urllib3 transport
+
+        Returns:
+            `requests.Response` or `LightResponse`: a new response object
+        """
+        headers = CaseInsensitiveDict(self.headers)
+        if light:
+            return LightResponse(self.status_code, self.reason, headers, self.content, self.url)
+        response = requests.Response()
+        response.status_code = self.status_code
+        response.reason = self.reason
+        response.headers = headers
+        response.url = self.url
+        response.encoding = get_encoding_from_headers(headers)
+        response._content = self.content  # pylint: disable=protected-access
+        return response
+
+
+def cache_control(headers):
+    """
+    Returns:
+        dict: directives of the `Cache-Control` header, lowercase names, None for those without value
+    """
+    directives = {}
+    for directive in headers.get('Cache-Control', '').split(','):
+        name, _, value = directive.strip().partition('=')
+        if name:
+            directives[name.lower()] = value.strip('"') or None
+    return directives
+
+
+def seconds(value):
+    try:
+        return max(0, int(value))
+    except (TypeError, ValueError):
+        return None
+
+
+def http_date(value):
+    """
+    Returns:
+        float: timestamp of an HTTP date, None if not parseable
+    """
+    parsed = parsedate_tz(value) if value else None
+    return mktime_tz(parsed) if parsed else None
+
+
+def freshness_lifetime(headers, directives):
+    """
+    Returns:
+        int: seconds a response is fresh for, 0 if it has to be revalidated
+    """
+    if 'no-cache' in directives:
+        return 0
+    max_age = seconds(directives.get('max-age'))
+    if max_age is not None:
+        return max_age
+    expires = http_date(headers.get('Expires'))
+    if expires is not None:
+        date = http_date(headers.get('Date'))
+        return max(0, expires - (time.time() if date is None else date))
+    return 0
+
+
+def age(headers):
+    return seconds(headers.get('Age')) or 0
+
+
+def stale_if_error(directives):
+    value = seconds(directives.get('stale-if-error'))
+    return get_setting('RESPONSE_CACHE_STALE_IF_ERROR') if value is None else value
+
+
+def vary_values(names, request_headers):
+    return tuple((name, request_headers.get(name)) for name in names)
+
+
+def url_with_params(url, params):
+    """
+    Returns:
+        str: the URL with the query parameters of the request, the cache key of its responses
+    """
+    if not params:
+        return url
+    if not isinstance(params, (str, bytes)):
+        params = urlencode(params, doseq=True)
+    return '{}{}{}'.format(url, '&' if urlsplit(url).query else '?', params)
+
+
+def is_cacheable_request(method, data, headers, kwargs):
+    """
+    Returns:
+        bool: True if the response of the request can be served from the cache
+    """
+    if method != 'GET' or data is not None or kwargs.get('stream') or kwargs.get('allow_redirects') is False:
+        return False
+    if any(kwargs.get(name) is not None for name in ('json', 'files', 'auth', 'cookies', 'hooks')):
+        return False
+    return not (headers and any(name in CaseInsensitiveDict(headers) for name in CONDITIONAL_HEADERS))
+
+
+class MemoryStorage(object):
+    """
+    Process-local LRU storage, bounded by the number of entries and their total size.
+    """
+
+    def __init__(self, max_entries, max_bytes):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.bytes = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                # most recently used last
+                del self._entries[key]
+                self._entries[key] = entry
+            return entry
+
+    def set(self, key, entry):
+        with self._lock:
+            self._remove(key)
+            self._entries[key] = entry
+            self.bytes += entry.size
+            while self._entries and (len(self._entries) > self.max_entries or self.bytes > self.max_bytes):
+                self._remove(next(iter(self._entries)))
+
+    def delete(self, key):
+        with self._lock:
+            self._remove(key)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.bytes = 0
+
+    def _remove(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self.bytes -= entry.size
+
+    def stats(self):
+        return {'entries': len(self._entries), 'bytes': self.bytes}
+
+    def reset_lock(self):
+        """
+        Replace the lock, e.g. in a forked child process, where the lock could have been
+        inherited in the acquired state. Cached responses are kept.
+        """
+        self._lock = threading.Lock()
+
+
+class DjangoCacheStorage(object):
+    """
+    Storage in a Django cache, which bounds and evicts the entries itself.
+    """
+
+    def __init__(self, alias):
+        from django.core.cache import caches
+        self.cache = caches[alias]
+
+    @staticmethod
+    def cache_key(key):
+        # fits the key length limit of memcached
+        return 'oauth2_client.http_cache.{}'.format(hashlib.sha1(repr(key).encode('utf-8')).hexdigest())
+
+    def get(self, key):
+        return self.cache.get(self.cache_key(key))
+
+    def set(self, key, entry):
+        self.cache.set(self.cache_key(key), entry, self.timeout(entry))
+
+    def timeout(self, entry):
+        """
+        Returns:
+            float: seconds the entry is kept: while fresh or usable on errors, at least the default
+                timeout of the cache if it can be revalidated. None for no expiry
+        """
+        timeout = entry.stored_at + entry.max_age + entry.stale_if_error - time.time()
+        default = self.cache.default_timeout
+        if entry.validators() and (default is None or default > timeout):
+            return default
+        return timeout
+
+    def delete(self, key):
+        self.cache.delete(self.cache_key(key))
+
+    def clear(self):
+        """
+        Does nothing: the Django cache is shared with other apps, clearing it would drop their entries
+        too. The entries expire with their timeout.
+        """
+
+    def stats(self):
+        return {}
+
+    def reset_lock(self):
+        pass
+
+
+class ResponseCache(object):
+    """
+    Response cache of all the OAuth2Clients of the process, see the module docstring.
+    """
+    COUNTERS = ('hits', 'misses', 'revalidated', 'stale_if_error')
+
+    def __init__(self, storage):
+        self.storage = storage
+        self._counters = dict.fromkeys(self.COUNTERS, 0)
+        self._lock = threading.Lock()
+
+    def get(self, app_name, url, request_headers):
+        """
+        Returns:
+            CachedResponse: the entry of the URL matching the request headers, None if none
+        """
+        entry = self.storage.get((app_name, url))
+        return entry if entry is not None and entry.matches(request_headers) else None
+
+    def set(self, app_name, url, entry):
+        self.storage.set((app_name, url), entry)
+
+    def store(self, app_name, url, response, request_headers):
+        """
+        Store a response, if it can be.
+
+        Returns:
+            CachedResponse: the stored entry, None if the response isn't stored
+        """
+        entry = CachedResponse.from_response(response, request_headers)
+        if entry is not None:
+            self.set(app_name, url, entry)
+        return entry
+
+    def invalidate(self, app_name, url):
+        self.storage.delete((app_name, url))
+
+    def clear(self):
+        """
+        Drop all the entries, except from a Django cache, and reset the counters.
+        """
+        self.storage.clear()
+        with self._lock:
+            self._counters = dict.fromkeys(self.COUNTERS, 0)
+
+    def count(self, counter):
+        with self._lock:
+            self._counters[counter] += 1
+
+    def stats(self):
+        """
+        Returns:
+            dict: the counters, and the number and size of the entries for the memory storage
+        """
+        with self._lock:
+            stats = dict(self._counters)
+        stats.update(self.storage.stats())
+        return stats
+
+    def reset_locks(self):
+        self._lock = threading.Lock()
+        self.storage.reset_lock()
+
+
+_caches = {}
+
+
+def response_cache():
+    """
+    Returns:
+        ResponseCache: the response cache of the process, None if not enabled
+
+    Raises:
+        ValueError: unknown `OAUTH2_CLIENT_RESPONSE_CACHE` setting
+    """
+    backend = get_setting('RESPONSE_CACHE')
+    if not backend:
+        return None
+    cache = _caches.get(backend)
+    if cache is None:
+        if backend == RESPONSE_CACHE_MEMORY:
+            storage = MemoryStorage(get_setting('RESPONSE_CACHE_MAX_ENTRIES'), get_setting('RESPONSE_CACHE_MAX_BYTES'))
+        elif backend == RESPONSE_CACHE_DJANGO:
+            storage = DjangoCacheStorage(get_setting('RESPONSE_CACHE_ALIAS'))
+        else:
+            raise ValueError('Unknown response cache: {}'.format(backend))
+        cache = _caches.setdefault(backend, ResponseCache(storage))
+    return cache
+
+
+@after_fork_in_child
+def reset_after_fork():
+    for cache in list(_caches.values()):
+        cache.reset_locks()
@@ -0,0 +1,74 @@
+"""
+Run the token broker, serving tokens to the worker processes of this host over a Unix socket.
+"""
+import os
+import signal
+import threading
+
+from django.core.management import CommandError
+
+from oauth2_client.broker import BrokerServer
+from oauth2_client.conf import get_setting
+from oauth2_client.notify import start_listener, stop_listener
+from oauth2_client.utils.django.base_cmd import LoggingBaseCommand
+
+
+class Command(LoggingBaseCommand):
+    """
+    Run the token broker: a long-lived process owning acquisition and refresh of the
+    tokens of all the Applications. Workers get the tokens from the broker over a
+    Unix socket, see `oauth2_client.broker`. Run one broker per host, and point the
+    workers at its socket with the `OAUTH2_CLIENT_BROKER_SOCKET` setting.
+
+    With the `OAUTH2_CLIENT_NOTIFY_CHANNEL` setting, the broker listens to the Application
+    edits made by other processes and drops the tokens of the edited Applications.
+
+    The broker stops on SIGTERM or SIGINT.
+
+    Usage examples:
+    python ./manage.py oauth2client_broker -h  # this help message
+
+    python ./manage.py oauth2client_broker  # listen on OAUTH2_CLIENT_BROKER_SOCKET
+
+    python ./manage.py oauth2client_broker \\
+        --socket /run/oauth2client/broker.sock \\
+        --verbosity 2
+    """
+    help = __doc__
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--socket',
+            type=str,
+            default=get_setting('BROKER_SOCKET'),
+            help='Path of the Unix socket to listen on. Default: OAUTH2_CLIENT_BROKER_SOCKET setting'
+        )
+
+    def handle(self, *args, **options):
+        socket_path = options['socket']
+        if not socket_path:
+            raise CommandError('No socket given, use --socket or the OAUTH2_CLIENT_BROKER_SOCKET setting')
+        if os.path.exists(socket_path):
+            # left behind by a previous broker
+            os.unlink(socket_path)
+
+        server = BrokerServer(socket_path)
+        os.chmod(socket_path, 0o660)
+
+        def shutdown(signum, frame):  # pylint: disable=unused-argument
+            self.logger.info('Signal %s received, stopping the token broker', signum)
+            # `shutdown` blocks until `serve_forever` returns, so it can't run in its thread
+            threading.Thread(target=server.shutdown).start()
+
+        signal.signal(signal.SIGTERM, shutdown)
+        signal.signal(signal.SIGINT, shutdown)
+
+        self.logger.info('Token broker listening on %s', socket_path)
+        start_listener()
+        try:
+            server.serve_forever()
+        finally:
+            stop_listener()
+            server.server_close()
+            os.unlink(socket_path)
+        self.logger.info('Token broker stopped')
@@ -0,0 +1,78 @@
+"""
+Run the token refresher, refreshing tokens of all the Applications ahead of their expiry.
+"""
+import signal
+
+from oauth2_client.conf import get_setting
+from oauth2_client.refresher import TokenRefresher
+from oauth2_client.utils.django.base_cmd import LoggingBaseCommand
+
+
+class Command(LoggingBaseCommand):
+    """
+    Run the token refresher: a long-lived service refreshing the tokens of all the
+    Applications shortly before they expire, see `oauth2_client.refresher`. Run one
+    refresher per deployment, request-serving processes then find valid tokens in the
+    database and don't have to fetch them.
+
+    The refresher stops on SIGTERM or SIGINT, after the running refreshes finish.
+    Timing of every refresh is logged on the INFO level (--verbosity 2).
+
+    Usage examples:
+    python ./manage.py oauth2client_refresher -h  # this help message
+
+    python ./manage.py oauth2client_refresher --verbosity 2
+
+    python ./manage.py oauth2client_refresher \\
+        --lead-time 300 \\
+        --jitter 60 \\
+        --concurrency 8 \\
+        --reload-interval 10
+    """
+    help = __doc__
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--lead-time',
+            type=float,
+            default=get_setting('REFRESHER_LEAD_TIME'),
+            help='Seconds before expiry a token is refreshed. Default: OAUTH2_CLIENT_REFRESHER_LEAD_TIME setting'
+        )
+        parser.add_argument(
+            '--jitter',
+            type=float,
+            default=get_setting('REFRESHER_JITTER'),
+            help='Up to this many seconds are randomly added to the lead time. '
+                 'Default: OAUTH2_CLIENT_REFRESHER_JITTER setting'
+        )
+        parser.add_argument(
+            '--concurrency',
+            type=int,
+            default=get_setting('REFRESHER_CONCURRENCY'),
+            help='Maximum of refreshes running in parallel. Default: OAUTH2_CLIENT_REFRESHER_CONCURRENCY setting'
+        )
+        parser.add_argument(
+            '--reload-interval',
+            type=float,
+            default=get_setting('REFRESHER_RELOAD_INTERVAL'),
+            help='Seconds between checks for Application changes. '
+                 'Default: OAUTH2_CLIENT_REFRESHER_RELOAD_INTERVAL setting'
+        )
+
+    def handle(self, *args, **options):
+        refresher = TokenRefresher(
+            lead_time=options['lead_time'],
+            jitter=options['jitter'],
+            concurrency=options['concurrency'],
+            reload_interval=options['reload_interval'],
+        )
+
+        def shutdown(signum, frame):  # pylint: disable=unused-argument
+            self.logger.info('Signal %s received, stopping the token refresher', signum)
+            refresher.stop()
+
+        signal.signal(signal.SIGTERM, shutdown)
+        signal.signal(signal.SIGINT, shutdown)
+
+        self.logger.info('Token refresher started')
+        refresher.run()
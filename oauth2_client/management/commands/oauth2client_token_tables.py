@@ -0,0 +1,48 @@
+"""
+Switch the token tables to UNLOGGED, or back to LOGGED, as set by `OAUTH2_CLIENT_UNLOGGED_TOKEN_TABLES`.
+"""
+from django.apps import apps
+from django.core.management import CommandError
+from django.db import connections
+
+from oauth2_client.conf import get_setting
+from oauth2_client.routers import APP_LABEL, TOKEN_MODELS
+from oauth2_client.utils.django.base_cmd import LoggingBaseCommand
+
+
+class Command(LoggingBaseCommand):
+    """
+    Apply the `OAUTH2_CLIENT_UNLOGGED_TOKEN_TABLES` setting to the token tables: run
+    `ALTER TABLE ... SET UNLOGGED` when it is enabled, `SET LOGGED` otherwise (PostgreSQL >= 9.5).
+    The `0006_unlogged_token_tables` migration applies the setting only when it is first
+    migrated, run this command after toggling the setting. Running it again is harmless.
+
+    Switching rewrites the tables and locks them meanwhile, the token tables are small.
+
+    Usage examples:
+    python ./manage.py oauth2client_token_tables -h  # this help message
+
+    python ./manage.py oauth2client_token_tables --verbosity 2
+
+    python ./manage.py oauth2client_token_tables --database primary
+    """
+    help = __doc__
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--database',
+            type=str,
+            default=get_setting('WRITE_DATABASE'),
+            help='Database alias of the token tables. Default: OAUTH2_CLIENT_WRITE_DATABASE setting'
+        )
+
+    def handle(self, *args, **options):
+        connection = connections[options['database']]
+        if connection.vendor != 'postgresql':
+            raise CommandError('UNLOGGED tables are PostgreSQL only, database: {}'.format(connection.vendor))
+        persistence = 'UNLOGGED' if get_setting('UNLOGGED_TOKEN_TABLES') else 'LOGGED'
+        with connection.schema_editor() as schema_editor:
+            for model_name in TOKEN_MODELS:
+                table = apps.get_model(APP_LABEL, model_name)._meta.db_table
+                schema_editor.execute('ALTER TABLE {} SET {}'.format(schema_editor.quote_name(table), persistence))
+                self.logger.info('Table %s set %s', table, persistence)
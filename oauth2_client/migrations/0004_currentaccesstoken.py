@@ -0,0 +1,28 @@
+# Generated by Django 2.2.7 on 2026-10-19 05:50
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('oauth2_client', '0003_auto_20200102_0529'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CurrentAccessToken',
+            fields=[
+                ('token_type', models.TextField(help_text='Token type, most likely Bearer')),
+                ('expires', models.DateTimeField(blank=True, null=True)),
+                ('scope', models.TextField(blank=True, default='', help_text='Scope granted by provider, as a series of space delimited strings, e.g. `read write`', max_length=100)),
+                ('updated', models.DateTimeField(auto_now=True)),
+                ('application', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, serialize=False, to='oauth2_client.Application')),
+                ('token', models.CharField(help_text='The access_token as str', max_length=255)),
+            ],
+            options={
+                'abstract': False,
+            },
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 2.2.7 on 2026-10-19 06:10
+
+import django.contrib.postgres.fields.jsonb
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('oauth2_client', '0004_currentaccesstoken'),
+    ]
+
+    #
+    # Raw provider payloads are debugging data, they are not copied over
+    # to the new table.
+    #
+    operations = [
+        migrations.CreateModel(
+            name='RawToken',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('raw_token', django.contrib.postgres.fields.jsonb.JSONField(blank=True, default=dict, help_text='Token JSON object returned from provider. This is for debugging purposes.')),
+                ('created', models.DateTimeField(auto_now_add=True, db_index=True)),
+                ('application', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='oauth2_client.Application')),
+            ],
+        ),
+        migrations.RemoveField(
+            model_name='accesstoken',
+            name='raw_token',
+        ),
+    ]
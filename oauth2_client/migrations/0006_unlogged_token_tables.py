@@ -0,0 +1,46 @@
+# Generated by Django 2.2.7 on 2026-10-19 06:30
+
+from django.db import migrations
+
+from oauth2_client.conf import get_setting
+
+#
+# Opt-in, see `OAUTH2_CLIENT_UNLOGGED_TOKEN_TABLES`. Tokens are disposable,
+# losing them after a crash costs one refetch. UNLOGGED tables skip the WAL,
+# so token refreshes don't pay for it and don't get replicated. No table
+# references the token tables, so they can be switched independently.
+#
+# The setting is read when this migration is applied only. After toggling it,
+# run `python manage.py oauth2client_token_tables` to switch the tables.
+#
+TOKEN_TABLES = ('accesstoken', 'currentaccesstoken', 'rawtoken')
+
+
+def set_token_tables_persistence(apps, schema_editor, persistence):
+    """
+    Run `ALTER TABLE ... SET LOGGED/UNLOGGED` on the token tables (PostgreSQL >= 9.5).
+    """
+    if schema_editor.connection.vendor != 'postgresql' or not get_setting('UNLOGGED_TOKEN_TABLES'):
+        return
+    for model_name in TOKEN_TABLES:
+        table = apps.get_model('oauth2_client', model_name)._meta.db_table
+        schema_editor.execute('ALTER TABLE {} SET {}'.format(schema_editor.quote_name(table), persistence))
+
+
+def set_unlogged(apps, schema_editor):
+    set_token_tables_persistence(apps, schema_editor, 'UNLOGGED')
+
+
+def set_logged(apps, schema_editor):
+    set_token_tables_persistence(apps, schema_editor, 'LOGGED')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('oauth2_client', '0005_rawtoken'),
+    ]
+
+    operations = [
+        migrations.RunPython(set_unlogged, set_logged),
+    ]
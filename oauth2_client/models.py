@@ -81,31 +81,26 @@ class Application(models.Model):
         self.validate_jwt_grant_data()
 
 
-class AccessToken(models.Model):
+class BaseAccessToken(models.Model):
     """
-    Access token to talk to the resource owner
+    Fields and behaviour shared by all the token models.
     """
 
     # Used to prevent the token expiration when the request is processed on the resource owner side.
     # This value is simply subtracted from token's `expiry` when checking validity.
     TIMEOUT_SECONDS = 60.0
 
-    token = models.CharField(max_length=255, unique=True, help_text="The access_token as str")
-    raw_token = JSONField(
-        default=dict, blank=True,
-        help_text="Token JSON object returned from provider. This is for debugging purposes and "
-                  "can be removed in the future."
-    )
     token_type = models.TextField(help_text="Token type, most likely Bearer")
-    application = models.ForeignKey(Application, on_delete=models.CASCADE)
     expires = models.DateTimeField(blank=True, null=True)
     scope = models.TextField(
         blank=True, default="", max_length=100,
         help_text="Scope granted by provider, as a series of space delimited strings, e.g. `read write`"
     )
-    created = models.DateTimeField(auto_now_add=True, db_index=True)
     updated = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        abstract = True
+
     def is_expired(self):
         """
         The token is expired when 1) expiration info available AND 2) expiration datetime is in the past.
@@ -140,5 +135,45 @@ class AccessToken(models.Model):
         """
         return "Access token for {}".format(self.application)
 
+
+class AccessToken(BaseAccessToken):
+    """
+    Access token to talk to the resource owner. Every fetched token is stored as a new row,
+    so the table keeps the history of tokens.
+    """
+    token = models.CharField(max_length=255, unique=True, help_text="The access_token as str")
+    application = models.ForeignKey(Application, on_delete=models.CASCADE)
+    created = models.DateTimeField(auto_now_add=True, db_index=True)
+
     def __str__(self):
         return "<AccessToken, pk:{}, for: {}>".format(self.pk, self.application)
+
+
+class CurrentAccessToken(BaseAccessToken):
+    """
+    The one current access token of an Application, used in the `current` token storage
+    mode (see `oauth2_client.conf`). The row is updated in place on every refresh, so the
+    table size is bounded by the number of Applications and a lookup is a primary key fetch.
+    """
+    application = models.OneToOneField(Application, on_delete=models.CASCADE, primary_key=True)
+    token = models.CharField(max_length=255, help_text="The access_token as str")
+
+    def __str__(self):
+        return "<CurrentAccessToken, for: {}>".format(self.application)
+
+
+class RawToken(models.Model):
+    """
+    Token JSON object as returned from provider. Kept apart from the token tables, so
+    the bulky payload is never loaded when a token is used. Only a sample of fetched
+    tokens is stored, see the `OAUTH2_CLIENT_RAW_TOKEN_SAMPLE_RATE` setting.
+    """
+    application = models.ForeignKey(Application, on_delete=models.CASCADE)
+    raw_token = JSONField(
+        default=dict, blank=True,
+        help_text="Token JSON object returned from provider. This is for debugging purposes."
+    )
+    created = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    def __str__(self):
+        return "<RawToken, pk:{}, for: {}>".format(self.pk, self.application)
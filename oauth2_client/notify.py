@@ -0,0 +1,197 @@
+"""
+Cross-process invalidation of the local token cache with PostgreSQL LISTEN/NOTIFY.
+
+Enabled with the `OAUTH2_CLIENT_NOTIFY_CHANNEL` setting. Every process that
+refreshes a token or saves an Application publishes a notification on the
+channel. Processes that run the listener drop the affected Application from
+their local token cache (see `oauth2_client.cache`) as soon as the notification
+arrives, so they never serve a stale token or configuration and don't have to poll.
+Application edits also drop the tokens of the token brokers of the process, see
+`oauth2_client.broker`.
+
+Start the listener once per process, e.g. from your wsgi module:
+
+    from oauth2_client.notify import start_listener
+    start_listener()
+"""
+import json
+import logging
+import select
+import threading
+from uuid import uuid4
+
+from django.db import connections, router
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from oauth2_client.broker import invalidate_brokers
+from oauth2_client.cache import token_cache
+from oauth2_client.conf import get_setting
+from oauth2_client.models import Application
+from oauth2_client.utils.fork import after_fork_in_child
+
+log = logging.getLogger(__name__)
+
+EVENT_TOKEN = 'token'
+EVENT_APPLICATION = 'application'
+
+# identifies the notifications published by this process, unlike the pid unique across hosts and containers
+_process_id = uuid4().hex
+
+
+def publish(event, app_name):
+    """
+    Notify all the listening processes about a change of an Application or its token.
+    Does nothing when no channel is configured. Notifications sent within a transaction
+    are delivered by PostgreSQL on commit.
+
+    Args:
+        event (str): EVENT_TOKEN or EVENT_APPLICATION
+        app_name (str): name of the Application
+    """
+    channel = get_setting('NOTIFY_CHANNEL')
+    if not channel:
+        return
+    payload = json.dumps({'event': event, 'app': app_name, 'sender': _process_id})
+    with connections[router.db_for_write(Application)].cursor() as cursor:
+        cursor.execute('SELECT pg_notify(%s, %s)', [channel, payload])
+
+
+@receiver(post_save, sender=Application)
+@receiver(post_delete, sender=Application)
+def publish_application_change(sender, instance, **kwargs):  # pylint: disable=unused-argument
+    """
+    Publish Application edits, processes then reload the Application with its token.
+    """
+    token_cache.invalidate()
+    publish(EVENT_APPLICATION, instance.name)
+
+
+class TokenChangeListener(threading.Thread):
+    """
+    Daemon thread listening to the notification channel on a dedicated database
+    connection. Reconnects when the connection is lost.
+    """
+    POLL_TIMEOUT_S = 5.0
+    RECONNECT_WAIT_S = 5.0
+
+    def __init__(self, channel, using):
+        """
+        Args:
+            channel (str): notification channel to listen to
+            using (str): alias of the database the notifications are published to
+        """
+        super(TokenChangeListener, self).__init__(name='oauth2-client-token-listener')
+        self.daemon = True
+        self.channel = channel
+        self.using = using
+        self._stopped = threading.Event()
+
+    def stop(self):
+        self._stopped.set()
+
+    def run(self):
+        while not self._stopped.is_set():
+            try:
+                self.listen()
+            except Exception:  # pylint: disable=broad-except
+                log.exception('Token change listener lost the connection, reconnecting')
+                # notifications may have been missed in the meantime
+                token_cache.invalidate()
+                invalidate_brokers()
+                self._stopped.wait(self.RECONNECT_WAIT_S)
+
+    def listen(self):
+        """
+        Listen on a new connection until stopped.
+        """
+        wrapper = connections[self.using]
+        conn = wrapper.get_new_connection(wrapper.get_connection_params())
+        try:
+            conn.autocommit = True
+            with conn.cursor() as cursor:
+                cursor.execute('LISTEN {}'.format(wrapper.ops.quote_name(self.channel)))
+            log.debug('Listening to token changes on channel %s', self.channel)
+            while not self._stopped.is_set():
+                if select.select([conn], [], [], self.POLL_TIMEOUT_S) == ([], [], []):
+                    continue
+                conn.poll()
+                while conn.notifies:
+                    self.handle(conn.notifies.pop(0).payload)
+        finally:
+            conn.close()
+
+    def handle(self, payload):
+        """
+        Invalidate the cached token of the Application the notification is about. Application
+        edits invalidate the whole cache, as the Application could have been renamed.
+        Token notifications published by this process are ignored, its cache is up to date.
+
+        Args:
+            payload (str): notification payload, as sent by `publish`
+        """
+        try:
+            message = json.loads(payload)
+        except ValueError:
+            log.warning('Ignoring malformed token change notification: %s', payload)
+            return
+        if message.get('sender') == _process_id and message.get('event') == EVENT_TOKEN:
+            return
+        log.debug('Token change notification received: %s', message)
+        if message.get('event') == EVENT_APPLICATION:
+            token_cache.invalidate()
+            invalidate_brokers()
+        else:
+            token_cache.invalidate(message.get('app'))
+
+
+_listener = None
+_listener_lock = threading.Lock()
+
+
+def start_listener():
+    """
+    Start the listener of this process, unless already running or no channel configured.
+
+    Returns:
+        TokenChangeListener: the running listener, None when no channel configured
+    """
+    global _listener  # pylint: disable=global-statement
+    channel = get_setting('NOTIFY_CHANNEL')
+    if not channel:
+        return None
+    with _listener_lock:
+        if _listener is None or not _listener.is_alive():
+            _listener = TokenChangeListener(channel, router.db_for_write(Application))
+            _listener.start()
+        return _listener
+
+
+def stop_listener():
+    """
+    Stop the listener of this process, if running.
+    """
+    global _listener  # pylint: disable=global-statement
+    with _listener_lock:
+        if _listener is not None:
+            _listener.stop()
+            _listener = None
+
+
+@after_fork_in_child
+def reset_listener():
+    """
+    Threads don't survive a fork, a forked child process has to start its own listener.
+    """
+    global _listener, _listener_lock  # pylint: disable=global-statement
+    _listener = None
+    _listener_lock = threading.Lock()
+
+
+@after_fork_in_child
+def reset_process_id():
+    """
+    A forked child process would otherwise ignore the token notifications of its parent.
+    """
+    global _process_id  # pylint: disable=global-statement
+    _process_id = uuid4().hex
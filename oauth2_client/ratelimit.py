@@ -0,0 +1,228 @@
+"""
+Client-side rate limiting of the OAuth2Client requests, per Application, configured
+in its `extra_settings`:
+
+    {
+        "rate_limit": 20,             # requests per second, no limit when not given
+        "rate_limit_burst": 40,       # requests made at once after an idle time, `rate_limit` when not given
+        "rate_limit_policy": "block", # `block`: wait for the limit, `fail`: raise RateLimited at once
+        "rate_limit_max_wait": 10     # seconds, OAUTH2_CLIENT_RATE_LIMIT_MAX_WAIT when not given
+    }
+
+The limit is a token bucket shared by all the clients and threads of the process.
+Requests waiting longer than `rate_limit_max_wait` raise `RateLimited`. The policy can
+be chosen per call: `client.get(url, rate_limit='fail')`.
+
+429 and 503 responses slow the requests down: the rate is halved, down to a tenth of
+`rate_limit`, and no request is made before their `Retry-After`. Every other response
+brings the rate back up by a tenth of `rate_limit`.
+"""
+import threading
+import time
+
+from oauth2_client.compat import monotonic
+from oauth2_client.conf import get_setting
+from oauth2_client.deadline import bounded_wait
+from oauth2_client.http_cache import http_date
+from oauth2_client.utils.fork import after_fork_in_child
+
+POLICY_BLOCK = 'block'
+POLICY_FAIL = 'fail'
+
+# responses asking the client to slow down
+THROTTLING_STATUS_CODES = (429, 503)
+
+# lowest rate after throttling, and increase after every other response, as fractions of the limit
+MIN_RATE_FRACTION = 0.1
+RECOVERY_FRACTION = 0.1
+
+
+class RateLimited(Exception):
+    """
+    The rate limit of an Application doesn't allow the request now.
+    """
+
+    def __init__(self, app_name, wait):
+        super(RateLimited, self).__init__(
+            'Rate limit of {} exceeded, next request allowed in {:.3f}s'.format(app_name, wait)
+        )
+        self.app_name = app_name
+        self.wait = wait
+
+
+class TokenBucket(object):
+    """
+    Thread-safe token bucket, with a rate lowered while the service is throttling.
+    """
+
+    def __init__(self, rate, burst):
+        """
+        Args:
+            rate (float): tokens added per second
+            burst (float): capacity of the bucket
+        """
+        self.rate = float(rate)
+        self.burst = float(burst)
+        self.current_rate = self.rate
+        self.tokens = self.burst
+        self.updated = monotonic()
+        self.paused_until = 0.0
+        self._lock = threading.Lock()
+
+    def reserve(self, max_wait):
+        """
+        Take a token, possibly one still to come.
+
+        Args:
+            max_wait (float): seconds the caller accepts to wait for the token
+
+        Returns:
+            float: seconds to wait before using the token, None if longer than `max_wait` and no token taken
+        """
+        with self._lock:
+            now = monotonic()
+            self._refill(now)
+            start = max(now, self.paused_until)
+            ready_at = start if self.tokens >= 1 else start + (1 - self.tokens) / self.current_rate
+            wait = ready_at - now
+            if wait > max_wait:
+                return None
+            # negative while requests wait for their tokens, they are served in order
+            self.tokens -= 1
+            return wait
+
+    def wait_time(self):
+        """
+        Returns:
+            float: seconds until a token is available
+        """
+        with self._lock:
+            now = monotonic()
+            self._refill(now)
+            start = max(now, self.paused_until)
+            return start - now + (0 if self.tokens >= 1 else (1 - self.tokens) / self.current_rate)
+
+    def throttled(self, retry_after=None):
+        """
+        The service asked to slow down: halve the rate, and pause for `retry_after` seconds if given.
+        """
+        with self._lock:
+            now = monotonic()
+            self._refill(now)
+            self.current_rate = max(self.rate * MIN_RATE_FRACTION, self.current_rate / 2)
+            self.tokens = min(self.tokens, 0.0)
+            if retry_after:
+                self.paused_until = max(self.paused_until, now + retry_after)
+
+    def succeeded(self):
+        """
+        The service answered normally: bring the rate back up.
+        """
+        if self.current_rate < self.rate:
+            with self._lock:
+                self.current_rate = min(self.rate, self.current_rate + self.rate * RECOVERY_FRACTION)
+
+    def _refill(self, now):
+        # no tokens are added while paused
+        since = max(self.updated, self.paused_until)
+        if now > since:
+            self.tokens = min(self.burst, self.tokens + (now - since) * self.current_rate)
+        self.updated = now
+
+
+class RateLimiter(object):
+    """
+    Rate limit of an Application.
+    """
+
+    def __init__(self, app_name, rate, burst, policy, max_wait):
+        if policy not in (POLICY_BLOCK, POLICY_FAIL):
+            raise ValueError(
+                'Unknown rate limit policy: {}, use `{}` or `{}`'.format(policy, POLICY_BLOCK, POLICY_FAIL)
+            )
+        self.app_name = app_name
+        self.config = (rate, burst, policy, max_wait)
+        self.policy = policy
+        self.max_wait = max_wait
+        self.bucket = TokenBucket(rate, burst)
+
+    def acquire(self, policy=None):
+        """
+        Wait until a request is allowed, or fail.
+
+        Args:
+            policy (str): `block` or `fail`, the policy of the Application when not given
+
+        Raises:
+            RateLimited: the request isn't allowed within the maximum wait, or before the current deadline,
+                at once with the `fail` policy
+        """
+        max_wait = self.max_wait if (policy or self.policy) == POLICY_BLOCK else 0
+        wait = self.bucket.reserve(bounded_wait(max_wait))
+        if wait is None:
+            raise RateLimited(self.app_name, self.bucket.wait_time())
+        if wait > 0:
+            time.sleep(wait)
+
+    def observe(self, response):
+        """
+        Adapt the rate to a response.
+        """
+        if response.status_code in THROTTLING_STATUS_CODES:
+            self.bucket.throttled(retry_after(response.headers))
+        else:
+            self.bucket.succeeded()
+
+
+def retry_after(headers):
+    """
+    Returns:
+        float: seconds of the `Retry-After` header, delay or HTTP date, None if not given or invalid
+    """
+    value = headers.get('Retry-After')
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        date = http_date(value)
+        return max(0.0, date - time.time()) if date is not None else None
+
+
+_limiters = {}
+_lock = threading.Lock()
+
+
+def rate_limiter(app):
+    """
+    Args:
+        app (oauth2_client.models.Application): app whose `extra_settings` configure the limit
+
+    Returns:
+        RateLimiter: the limiter of the app shared by the process, None if the app has no limit
+
+    Raises:
+        ValueError: unknown policy configured
+    """
+    extra_settings = app.extra_settings or {}
+    rate = extra_settings.get('rate_limit')
+    if not rate:
+        return None
+    config = (
+        rate,
+        extra_settings.get('rate_limit_burst') or max(1, rate),
+        extra_settings.get('rate_limit_policy') or POLICY_BLOCK,
+        extra_settings.get('rate_limit_max_wait', get_setting('RATE_LIMIT_MAX_WAIT')),
+    )
+    with _lock:
+        limiter = _limiters.get(app.name)
+        if limiter is None or limiter.config != config:
+            limiter = _limiters[app.name] = RateLimiter(app.name, *config)
+        return limiter
+
+
+@after_fork_in_child
+def reset_after_fork():
+    global _lock  # pylint: disable=global-statement
+    _lock = threading.Lock()
+    _limiters.clear()
@@ -0,0 +1,220 @@
+"""
+Token refresher: a long-lived service refreshing the tokens of all the Applications
+shortly before they expire, so request-serving processes only ever read valid tokens
+from the database. Run it with the `oauth2client_refresher` management command.
+
+Refreshes are kept in a priority queue ordered by the time they are due: token expiry
+minus a lead time, minus a random jitter, so tokens issued together aren't refreshed
+all at once. Applications without any token are refreshed right away (within the
+jitter). Tokens without expiry info (e.g. JWT bearer grant) are not refreshed, they are
+only refetched by the clients on failure. A global limit applies to parallel refreshes.
+
+The schedule is rebuilt from the database whenever an Application is updated. A refresh
+finishing is rescheduled only if its Application is still loaded, with its latest settings.
+Failures to load the Applications are logged and retried at the next reload interval.
+"""
+import heapq
+import logging
+import random
+import threading
+import time
+
+from django.db import close_old_connections, connections
+from django.db.models import Count, Max
+
+from oauth2_client.models import Application
+from oauth2_client.storage import applications_with_token_expiry
+from oauth2_client.utils.date_time import datetime_to_float
+
+log = logging.getLogger(__name__)
+
+
+class TokenRefresher(object):
+    """
+    Refresh tokens of all the Applications ahead of their expiry.
+    """
+    # Seconds to wait before retrying a failed refresh
+    RETRY_INTERVAL_S = 10.0
+
+    def __init__(self, lead_time, jitter, concurrency, reload_interval):
+        """
+        Args:
+            lead_time (float): seconds before expiry a token is refreshed
+            jitter (float): up to this many seconds are randomly added to the lead time
+            concurrency (int): maximum of refreshes running in parallel
+            reload_interval (float): seconds between checks for Application changes
+        """
+        self.lead_time = lead_time
+        self.jitter = jitter
+        self.concurrency = concurrency
+        self.reload_interval = reload_interval
+        self._queue = []  # heap of (due timestamp, app name)
+        self._due = {}  # app name -> (due timestamp, Application); queue entries not matching are outdated
+        self._apps = {}  # app name -> Application, as last loaded
+        self._in_flight = {}  # app name -> thread of the running refresh
+        self._condition = threading.Condition()
+        self._stopped = False
+        self._apps_version = None  # (count, last update) of the Applications loaded
+
+    def stop(self):
+        """
+        Stop scheduling refreshes. `run` returns once the running refreshes finish.
+        """
+        with self._condition:
+            self._stopped = True
+            self._condition.notify_all()
+
+    def run(self):
+        """
+        Refresh the tokens until stopped.
+        """
+        self._reload(self.reload)
+        next_reload = time.time() + self.reload_interval
+        with self._condition:
+            while not self._stopped:
+                now = time.time()
+                if now >= next_reload:
+                    self._condition.release()
+                    try:
+                        self._reload(self.reload_if_changed)
+                    finally:
+                        self._condition.acquire()
+                    next_reload = now + self.reload_interval
+                elif len(self._in_flight) >= self.concurrency:
+                    # notified when a refresh finishes
+                    self._condition.wait(next_reload - now)
+                else:
+                    app = self._pop_due(now)
+                    if app is not None:
+                        self._start_refresh(app)
+                    else:
+                        self._condition.wait(self._wait_time(now, next_reload))
+            in_flight = list(self._in_flight.values())
+        for thread in in_flight:
+            thread.join()
+        log.info('Token refresher stopped')
+
+    def reload(self):
+        """
+        Rebuild the schedule from the database.
+        """
+        apps = list(applications_with_token_expiry())
+        self._apps_version = (len(apps), max([app.updated for app in apps]) if apps else None)
+        with self._condition:
+            self._queue = []
+            self._due = {}
+            self._apps = {app.name: app for app in apps}
+            for app in apps:
+                if app.name in self._in_flight:
+                    # rescheduled when the refresh finishes
+                    continue
+                if app.has_token:
+                    self.schedule_expiry(app, app.token_expires)
+                else:
+                    self.schedule(app, time.time() + random.uniform(0, self.jitter))
+        log.info('Token refresh scheduled for %s Applications', len(self._due))
+
+    def reload_if_changed(self):
+        """
+        Rebuild the schedule if any Application was added, updated or deleted since the last load.
+        """
+        apps = Application.objects.aggregate(count=Count('pk'), updated=Max('updated'))
+        if (apps['count'], apps['updated']) != self._apps_version:
+            log.info('Applications changed, reloading')
+            self.reload()
+
+    def schedule(self, app, due):
+        """
+        Schedule the refresh of an Application's token.
+
+        Args:
+            app (oauth2_client.models.Application): the Application
+            due (float): timestamp of the refresh
+        """
+        with self._condition:
+            self._push(due, app)
+            self._condition.notify_all()
+
+    def schedule_expiry(self, app, expires):
+        """
+        Schedule the refresh of an Application's token ahead of its expiry.
+
+        Args:
+            app (oauth2_client.models.Application): the Application
+            expires (datetime): token expiry, None when the token doesn't expire
+        """
+        if expires is not None:
+            self.schedule(app, self._expiry_due(expires))
+
+    def refresh(self, app):
+        """
+        Refresh the token of an Application and schedule the next refresh, if the Application
+        is still loaded. An Application updated during the refresh is refreshed again right away.
+
+        Args:
+            app (oauth2_client.models.Application): the Application
+        """
+        # NOTE: imported here, the client module isn't needed until the first refresh
+        from oauth2_client.client import fetch_and_store_token
+
+        start = time.time()
+        due = None
+        try:
+            token = fetch_and_store_token(app)
+        except Exception:  # pylint: disable=broad-except
+            log.exception('Failed to refresh token for %s in %.3fs', app, time.time() - start)
+            due = time.time() + self.RETRY_INTERVAL_S
+        else:
+            log.info('Refreshed token for %s in %.3fs', app, time.time() - start)
+            if token.expires is not None:
+                due = self._expiry_due(token.expires)
+        finally:
+            # every refresh runs in a new thread, with its own database connection
+            connections.close_all()
+            with self._condition:
+                self._in_flight.pop(app.name, None)
+                loaded = self._apps.get(app.name)
+                if loaded is not None and loaded.updated != app.updated:
+                    due = time.time() + random.uniform(0, self.jitter)
+                if loaded is not None and due is not None:
+                    self._push(due, loaded)
+                self._condition.notify_all()
+
+    def _reload(self, load):
+        """
+        Load the Applications with `load`, a failure is retried at the next reload interval.
+        """
+        try:
+            load()
+        except Exception:  # pylint: disable=broad-except
+            log.exception('Failed to load the Applications, retrying in %ss', self.reload_interval)
+            close_old_connections()
+
+    def _expiry_due(self, expires):
+        return datetime_to_float(expires) - self.lead_time - random.uniform(0, self.jitter)
+
+    def _push(self, due, app):
+        self._due[app.name] = (due, app)
+        heapq.heappush(self._queue, (due, app.name))
+
+    def _pop_due(self, now):
+        """
+        Returns:
+            Application: the Application whose refresh is due, None if none
+        """
+        while self._queue and self._queue[0][0] <= now:
+            due, app_name = heapq.heappop(self._queue)
+            scheduled = self._due.get(app_name)
+            if scheduled and scheduled[0] == due:
+                del self._due[app_name]
+                return scheduled[1]
+        return None
+
+    def _start_refresh(self, app):
+        thread = threading.Thread(target=self.refresh, args=(app,), name='oauth2-client-refresh')
+        self._in_flight[app.name] = thread
+        thread.start()
+
+    def _wait_time(self, now, next_reload):
+        next_due = self._queue[0][0] if self._queue else next_reload
+        return max(0.0, min(next_due, next_reload) - now)
@@ -0,0 +1,196 @@
+"""
+Retries of the idempotent OAuth2Client requests failing with a connection error (refused,
+reset, e.g. a stale keep-alive connection closed by the server) or answered with a 5xx
+status code configured for retries. Retries happen within the circuit breaker, only the
+outcome of the last attempt counts as a failure.
+
+Configured with the settings, and per Application in its `extra_settings`:
+
+    {
+        "retries": 2,                    # OAUTH2_CLIENT_RETRIES when not given, 0 disables retries
+        "retry_status_codes": [502, 504] # OAUTH2_CLIENT_RETRY_STATUS_CODES when not given
+    }
+
+Responses with a `Retry-After` header, e.g. 429 or 503, are never retried: they are left to
+the rate limiter of the Application (see `oauth2_client.ratelimit`), retries happen within
+it and would ignore the delay asked for.
+
+Attempts are separated by an exponential backoff with full jitter: a random delay up to
+`OAUTH2_CLIENT_RETRY_BACKOFF` seconds doubled on every retry, capped by
+`OAUTH2_CLIENT_RETRY_MAX_BACKOFF`. No retry is made when the current deadline (see
+`oauth2_client.deadline`) leaves no time for it.
+
+A retry budget shared by the process prevents retry storms: retries are at most
+`OAUTH2_CLIENT_RETRY_BUDGET` of the requests, e.g. 0.1 for 10%, plus `MAX_BUDGET_BALANCE`
+at once. Counters: `retry_stats()`.
+"""
+import logging
+import random
+import threading
+import time
+
+import requests
+
+from oauth2_client.conf import get_setting
+from oauth2_client.deadline import current_deadline
+from oauth2_client.utils.budget import Budget
+from oauth2_client.utils.fork import after_fork_in_child
+
+log = logging.getLogger(__name__)
+
+# retries allowed at once
+MAX_BUDGET_BALANCE = 10
+
+
+class RetryPolicy(object):
+    """
+    Retries of the requests of an Application.
+    """
+
+    def __init__(self, retries, status_codes, backoff, max_backoff):
+        """
+        Args:
+            retries (int): retries of a request at most
+            status_codes (iterable): status codes of the responses retried
+            backoff (float): seconds, highest delay before the first retry
+            max_backoff (float): seconds, highest delay before a retry
+        """
+        self.retries = retries
+        self.status_codes = frozenset(status_codes)
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+
+    def call(self, func, *args, **kwargs):
+        """
+        Call `func` making a request, again while it fails and retries are allowed.
+
+        Returns:
+            the response of the last attempt
+
+        Raises:
+            the error of the last attempt
+        """
+        budget = retry_budget()
+        budget.deposit()
+        attempt = 0
+        while True:
+            try:
+                response = func(*args, **kwargs)
+            except requests.ConnectionError as e:
+                if not is_retried_error(e) or not self.allows_retry(attempt, budget):
+                    raise
+                log.info('Retrying %s after %r', args[:2], e)
+            else:
+                if response.status_code not in self.status_codes or 'Retry-After' in response.headers:
+                    return response
+                if not self.allows_retry(attempt, budget):
+                    return response
+                log.info('Retrying %s after a %s response', args[:2], response.status_code)
+                response.close()
+            attempt += 1
+            time.sleep(self.delay(attempt))
+
+    def allows_retry(self, attempt, budget):
+        """
+        Args:
+            attempt (int): retries made so far
+            budget (Budget): retry budget, a retry is taken from it when allowed
+
+        Returns:
+            bool: True if another attempt is made
+        """
+        if attempt >= self.retries:
+            return False
+        deadline = current_deadline()
+        if deadline is not None and deadline.remaining() <= self.delay_cap(attempt + 1):
+            return False
+        if not budget.withdraw():
+            _count('over_budget')
+            return False
+        _count('retries')
+        return True
+
+    def delay_cap(self, attempt):
+        return min(self.max_backoff, self.backoff * 2 ** (attempt - 1))
+
+    def delay(self, attempt):
+        """
+        Returns:
+            float: seconds to wait before the retry number `attempt`, from 1
+        """
+        return random.uniform(0, self.delay_cap(attempt))
+
+
+def is_retried_error(error):
+    """
+    Returns:
+        bool: True for the connection errors worth retrying, not for SSL errors
+    """
+    return isinstance(error, requests.ConnectionError) and not isinstance(error, requests.exceptions.SSLError)
+
+
+def retry_policy(app):
+    """
+    Args:
+        app (oauth2_client.models.Application): app whose `extra_settings` may override the settings
+
+    Returns:
+        RetryPolicy: retries of the requests of the app, None if disabled
+    """
+    extra_settings = app.extra_settings or {}
+    retries = extra_settings.get('retries', get_setting('RETRIES'))
+    if not retries:
+        return None
+    return RetryPolicy(
+        retries, extra_settings.get('retry_status_codes', get_setting('RETRY_STATUS_CODES')),
+        get_setting('RETRY_BACKOFF'), get_setting('RETRY_MAX_BACKOFF'),
+    )
+
+
+_budgets = {}
+_counters = {'retries': 0, 'over_budget': 0}
+_lock = threading.Lock()
+
+
+def retry_budget():
+    """
+    Returns:
+        Budget: the retry budget of the process
+    """
+    ratio = get_setting('RETRY_BUDGET')
+    budget = _budgets.get(ratio)
+    if budget is None:
+        with _lock:
+            budget = _budgets.setdefault(ratio, Budget(ratio, MAX_BUDGET_BALANCE))
+    return budget
+
+
+def _count(name):
+    with _lock:
+        _counters[name] += 1
+
+
+def retry_stats():
+    """
+    Returns:
+        dict: retries made, and retries not made for lack of budget, by the process
+    """
+    with _lock:
+        return dict(_counters)
+
+
+def reset():
+    """
+    Refill the retry budget and zero the counters.
+    """
+    with _lock:
+        _budgets.clear()
+        for name in _counters:
+            _counters[name] = 0
+
+
+@after_fork_in_child
+def reset_after_fork():
+    global _lock  # pylint: disable=global-statement
+    _lock = threading.Lock()
+    _budgets.clear()
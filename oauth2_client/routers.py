@@ -0,0 +1,50 @@
+"""
+Database router for the `oauth2_client` models. Sends reads of Applications and
+tokens to a read replica (or any dedicated alias) and writes to the primary.
+Enable in the Django settings of your project:
+
+    DATABASE_ROUTERS = ['oauth2_client.routers.TokenRouter']
+    OAUTH2_CLIENT_READ_DATABASE = 'replica'
+    OAUTH2_CLIENT_WRITE_DATABASE = 'default'
+
+Replication lag is handled by `oauth2_client.storage`: a token missing or
+expired on the replica is looked up on the primary before a new token is
+fetched from the auth provider.
+
+With `OAUTH2_CLIENT_UNLOGGED_TOKEN_TABLES`, the token tables are not replicated
+and can't be read on a hot standby, reads of tokens are routed to the primary.
+"""
+from oauth2_client.conf import get_setting
+
+APP_LABEL = 'oauth2_client'
+# models kept in the tables made UNLOGGED by `OAUTH2_CLIENT_UNLOGGED_TOKEN_TABLES`
+TOKEN_MODELS = ('accesstoken', 'currentaccesstoken', 'rawtoken')
+
+
+class TokenRouter(object):
+    """
+    Route `oauth2_client` reads to `OAUTH2_CLIENT_READ_DATABASE` and writes to
+    `OAUTH2_CLIENT_WRITE_DATABASE`. Other apps are left to other routers.
+    """
+
+    def db_for_read(self, model, **hints):
+        if model._meta.app_label == APP_LABEL:
+            if model._meta.model_name in TOKEN_MODELS and get_setting('UNLOGGED_TOKEN_TABLES'):
+                return get_setting('WRITE_DATABASE')
+            return get_setting('READ_DATABASE')
+        return None
+
+    def db_for_write(self, model, **hints):
+        # NOTE: explicit, otherwise Django would write a token to the database
+        # its Application was read from, i.e. the replica
+        if model._meta.app_label == APP_LABEL:
+            return get_setting('WRITE_DATABASE')
+        return None
+
+    def allow_relation(self, obj1, obj2, **hints):
+        """
+        Objects read from the replica can be related to objects written to the primary.
+        """
+        if obj1._meta.app_label == APP_LABEL and obj2._meta.app_label == APP_LABEL:
+            return True
+        return None
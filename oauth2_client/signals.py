@@ -0,0 +1,15 @@
+"""
+Signals sent by the `oauth2_client`, e.g. to feed your metrics:
+
+    from django.dispatch import receiver
+    from oauth2_client.signals import bulkhead_rejected
+
+    @receiver(bulkhead_rejected)
+    def count_rejection(sender, app_name, in_flight, **kwargs):
+        statsd.incr('oauth2_client.bulkhead_rejected.{}'.format(app_name))
+"""
+from django.dispatch import Signal
+
+# A request was rejected by the bulkhead of its Application, see `oauth2_client.bulkhead`.
+# Sent by the Bulkhead, with the arguments: app_name, in_flight (requests in flight when rejected).
+bulkhead_rejected = Signal()
@@ -0,0 +1,203 @@
+"""
+Persistence of access tokens. Two storage modes are supported, selected with
+the `OAUTH2_CLIENT_TOKEN_STORAGE` setting:
+
+- `history` (default): every fetched token is inserted as a new `AccessToken`
+  row. Readers pick the newest row of an Application.
+- `current`: there is exactly one `CurrentAccessToken` row per Application,
+  updated in place on every refresh. Table size is bounded by the number of
+  Applications. With `OAUTH2_CLIENT_TOKEN_HISTORY = True` every fetched token
+  is additionally appended to the `AccessToken` table, for auditing.
+
+Independently of the mode, the raw provider payload of a sample of fetched
+tokens is stored in the `RawToken` table, see `OAUTH2_CLIENT_RAW_TOKEN_SAMPLE_RATE`.
+
+Reads are routed by the database routers of the project (see `oauth2_client.routers`).
+When reads go to a replica, a token missing or expired there is looked up again on the
+primary, so replication lag doesn't cause an unnecessary fetch from the auth provider.
+"""
+import random
+
+from django.db import IntegrityError, router, transaction
+from django.db.models import Exists, OuterRef, Q, Subquery
+from django.utils import timezone
+
+from oauth2_client.conf import TOKEN_STORAGE_CURRENT, get_setting
+from oauth2_client.models import AccessToken, Application, CurrentAccessToken, RawToken
+
+
+def is_current_storage():
+    """
+    Returns:
+        bool: True if tokens are kept in the `current` storage mode
+    """
+    return get_setting('TOKEN_STORAGE') == TOKEN_STORAGE_CURRENT
+
+
+def token_model():
+    """
+    Returns:
+        type: model the tokens are kept in, in the configured storage mode
+    """
+    return CurrentAccessToken if is_current_storage() else AccessToken
+
+
+def is_read_from_replica(model):
+    """
+    Returns:
+        bool: True if reads of the model are routed to another database than writes
+    """
+    return router.db_for_read(model) != router.db_for_write(model)
+
+
+def load_token(app_name):
+    """
+    Load the most recent stored token of an Application. Fall back to the primary
+    database when the token read from a replica is missing or expired.
+
+    Args:
+        app_name (str): name of the Application
+
+    Returns:
+        AccessToken or CurrentAccessToken: the token, None if there is no token stored
+    """
+    token = query_token(app_name)
+    model = token_model()
+    if (not token or token.is_expired()) and is_read_from_replica(model):
+        token = query_token(app_name, using=router.db_for_write(model)) or token
+    return token
+
+
+def query_token(app_name, using=None):
+    """
+    Query the most recent stored token of an Application.
+
+    Args:
+        app_name (str): name of the Application
+        using (str): database alias, None to let the routers decide
+
+    Returns:
+        AccessToken or CurrentAccessToken: the token, None if there is no token stored
+    """
+    if is_current_storage():
+        return CurrentAccessToken.objects.db_manager(using).select_related('application') \
+            .filter(application__name=app_name).first()
+    return AccessToken.objects.db_manager(using).select_related('application') \
+        .filter(application__name=app_name).order_by('-created').first()
+
+
+def load_application(app_name):
+    """
+    Load an Application. Fall back to the primary database when it is not
+    (yet) available on a replica.
+
+    Args:
+        app_name (str): name of the Application
+
+    Returns:
+        oauth2_client.models.Application:
+
+    Raises:
+        Application.DoesNotExist:
+    """
+    try:
+        return Application.objects.get(name=app_name)
+    except Application.DoesNotExist:
+        if not is_read_from_replica(Application):
+            raise
+        return Application.objects.db_manager(router.db_for_write(Application)).get(name=app_name)
+
+
+def applications_with_token_expiry():
+    """
+    Load all the Applications together with the expiry info of their newest tokens, in one query.
+    Every Application is annotated with:
+        - `has_token` (bool): is there any token stored
+        - `token_expires` (datetime): expiry of the newest token, None if not known
+
+    Returns:
+        QuerySet: annotated Applications
+    """
+    model = token_model()
+    tokens = model.objects.filter(application=OuterRef('pk'))
+    newest_tokens = tokens.order_by('-updated' if model is CurrentAccessToken else '-created')
+    # NOTE: read where the tokens are read from, Applications may be on a replica the tokens aren't
+    return Application.objects.db_manager(router.db_for_read(model)).annotate(
+        has_token=Exists(tokens),
+        token_expires=Subquery(newest_tokens.values('expires')[:1]),
+    )
+
+
+def store_token(token):
+    """
+    Store a freshly fetched token according to the storage mode.
+
+    Args:
+        token (oauth2_client.models.AccessToken): unsaved token, as returned by a Fetcher
+
+    Returns:
+        AccessToken or CurrentAccessToken: the stored token
+    """
+    store_raw_token(token)
+    if not is_current_storage():
+        token.save()
+        return token
+
+    current = upsert_current_token(token)
+    if get_setting('TOKEN_HISTORY'):
+        token.save()
+    return current
+
+
+def upsert_current_token(token):
+    """
+    Replace the current token of an Application, unless the stored one expires later. The
+    row is updated with a single conditional UPDATE, so a refresh finishing after a newer
+    one never overwrites its token. The INSERT happens only the first time a token is
+    stored for the Application. If another process inserts the row concurrently, we lose
+    the race on the primary key and update the row they created.
+
+    Args:
+        token (oauth2_client.models.AccessToken): token to become the current one
+
+    Returns:
+        CurrentAccessToken: the current token of the Application
+    """
+    fields = {
+        'token': token.token,
+        'token_type': token.token_type,
+        'expires': token.expires,
+        'scope': token.scope,
+        'updated': timezone.now(),
+    }
+    current_tokens = CurrentAccessToken.objects.filter(application_id=token.application_id)
+    older_tokens = current_tokens
+    if token.expires is not None:
+        older_tokens = current_tokens.filter(Q(expires__lt=token.expires) | Q(expires__isnull=True))
+    if older_tokens.update(**fields):
+        return CurrentAccessToken(application=token.application, **fields)
+    try:
+        with transaction.atomic():
+            return CurrentAccessToken.objects.create(application=token.application, **fields)
+    except IntegrityError:
+        if older_tokens.update(**fields):
+            return CurrentAccessToken(application=token.application, **fields)
+    # a newer token was stored meanwhile
+    return current_tokens.select_related('application').get()
+
+
+def store_raw_token(token):
+    """
+    Store the raw provider payload of a fetched token, if the token is sampled.
+
+    Args:
+        token (oauth2_client.models.AccessToken): token as returned by a Fetcher
+
+    Returns:
+        RawToken: the stored payload, None if the token was not sampled
+    """
+    raw_token = getattr(token, 'raw_token', None)
+    sample_rate = get_setting('RAW_TOKEN_SAMPLE_RATE')
+    if raw_token is None or sample_rate <= 0 or random.random() >= sample_rate:
+        return None
+    return RawToken.objects.create(application=token.application, raw_token=raw_token)
@@ -0,0 +1,51 @@
+"""
+Default timeouts of the requests the `oauth2_client` makes, so a hung connection can't
+block a thread forever. Connect and read timeouts, in seconds, of the requests of the
+OAuth2Client and of the requests to the token endpoint, set by the settings:
+
+    OAUTH2_CLIENT_REQUEST_CONNECT_TIMEOUT, OAUTH2_CLIENT_REQUEST_READ_TIMEOUT
+    OAUTH2_CLIENT_TOKEN_CONNECT_TIMEOUT, OAUTH2_CLIENT_TOKEN_READ_TIMEOUT
+
+and per Application in its `extra_settings`:
+
+    {
+        "connect_timeout": 3,
+        "read_timeout": 60,
+        "token_connect_timeout": 3,
+        "token_read_timeout": 10
+    }
+
+None means no timeout. The `timeout` argument of an OAuth2Client request replaces the
+default, `timeout=None` makes a request without timeout. All of them are bounded by the
+current deadline, if any, see `oauth2_client.deadline`.
+"""
+from oauth2_client.conf import get_setting
+
+
+def request_timeout(app):
+    """
+    Args:
+        app (oauth2_client.models.Application): app whose `extra_settings` may override the settings
+
+    Returns:
+        tuple: (connect, read) timeouts of the OAuth2Client requests to the app, None for no timeout
+    """
+    return _timeout(app, '', 'REQUEST_')
+
+
+def token_timeout(app):
+    """
+    Args:
+        app (oauth2_client.models.Application): app whose `extra_settings` may override the settings
+
+    Returns:
+        tuple: (connect, read) timeouts of the requests to the token endpoint of the app, None for no timeout
+    """
+    return _timeout(app, 'token_', 'TOKEN_')
+
+
+def _timeout(app, key_prefix, setting_prefix):
+    extra_settings = app.extra_settings or {}
+    connect = extra_settings.get(key_prefix + 'connect_timeout', get_setting(setting_prefix + 'CONNECT_TIMEOUT'))
+    read = extra_settings.get(key_prefix + 'read_timeout', get_setting(setting_prefix + 'READ_TIMEOUT'))
+    return None if connect is None and read is None else (connect, read)
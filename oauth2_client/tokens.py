@@ -0,0 +1,87 @@
+"""
+Lightweight token values used on the request path. A `TokenValue` is produced once
+per fetched or loaded token, and is what the clients and the local token cache hold,
+instead of the token model instances.
+
+Expiry is kept as a deadline on the monotonic clock, checking it doesn't need the
+current date and time, and isn't affected by changes of the system clock.
+"""
+from django.utils import timezone
+
+from oauth2_client.compat import monotonic
+from oauth2_client.models import BaseAccessToken
+
+
+def deadline_in(seconds):
+    """
+    Args:
+        seconds (float): seconds from now, None when not known
+
+    Returns:
+        float: the deadline on the monotonic clock, None when not known
+    """
+    return monotonic() + seconds if seconds is not None else None
+
+
+class TokenValue(object):
+    """
+    Immutable access token of an Application.
+    """
+    __slots__ = ('access_token', 'token_type', 'scope', 'deadline', 'app_key')
+
+    def __init__(self, access_token, token_type, scope, deadline, app_key):
+        """
+        Args:
+            access_token (str): the access token
+            token_type (str): token type, most likely Bearer
+            scope (str): scope granted by the provider
+            deadline (float): expiry on the monotonic clock, None when the token doesn't expire
+            app_key (str): name of the Application the token belongs to
+        """
+        for name, value in zip(self.__slots__, (access_token, token_type, scope, deadline, app_key)):
+            object.__setattr__(self, name, value)
+
+    def __setattr__(self, name, value):
+        raise AttributeError('TokenValue is immutable')
+
+    @classmethod
+    def from_token(cls, token):
+        """
+        Args:
+            token (AccessToken or CurrentAccessToken): the token
+
+        Returns:
+            TokenValue: value of the token
+        """
+        expires_in = (token.expires - timezone.now()).total_seconds() if token.expires else None
+        return cls(token.token, token.token_type, token.scope, deadline_in(expires_in), token.application.name)
+
+    def expires_in(self):
+        """
+        Returns:
+            float: seconds until the token expires, None when not known
+        """
+        return self.deadline - monotonic() if self.deadline is not None else None
+
+    def is_expired(self):
+        """
+        Same semantics as `is_expired` of the token models, including the
+        `TIMEOUT_SECONDS` margin.
+
+        Returns:
+            bool: is token expired
+        """
+        return self.deadline is not None and monotonic() >= self.deadline - BaseAccessToken.TIMEOUT_SECONDS
+
+    def to_client_dict(self):
+        """
+        Returns:
+            dict: the token as expected by `OAuth2Session` class
+        """
+        as_dict = {'access_token': self.access_token, 'token_type': self.token_type, 'scope': self.scope}
+        if self.deadline is not None:
+            as_dict['expires_in'] = self.expires_in()
+        return as_dict
+
+    def __repr__(self):
+        return '<TokenValue, for: {}>'.format(self.app_key)
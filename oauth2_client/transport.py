@@ -0,0 +1,228 @@
+"""
+Lightweight HTTP transport for the hot paths: talks to urllib3 connection pools
+directly, skipping the `requests` session, adapter and response layers. Used by
+`OAuth2Client` when made with `transport='urllib3'` or the
+`OAUTH2_CLIENT_TRANSPORT` setting.
+
+Meant for small JSON calls: the whole response body is read, and requests
+with files, streaming, cookies or custom auth are not supported. Network
+errors are raised as the matching `requests` exceptions, so the callers
+handle both transports the same way. Needs urllib3 >= 1.26, installed with the
+`urllib3_transport` extra.
+"""
+import json as jsonlib
+from email.message import Message
+
+import certifi
+import requests
+import urllib3
+from requests.models import DEFAULT_REDIRECT_LIMIT
+from urllib3.exceptions import (
+    ConnectTimeoutError, MaxRetryError, NewConnectionError, ProtocolError, ReadTimeoutError, SSLError
+)
+from urllib3.util.retry import Retry
+
+from oauth2_client.compat import urlencode, urljoin, urlsplit
+from oauth2_client.utils.json_codec import json_codec
+
+
+class LightResponse(object):
+    """
+    Response of `Urllib3Transport`, with the subset of the `requests.Response` interface
+    used for JSON APIs.
+    """
+    __slots__ = ('status_code', 'reason', 'headers', 'content', 'url')
+
+    def __init__(self, status_code, reason, headers, content, url):
+        """
+        Args:
+            status_code (int): HTTP status code
+            reason (str): HTTP reason phrase
+            headers (urllib3.HTTPHeaderDict): response headers, case-insensitive
+            content (bytes): response body
+            url (str): URL of the final request, after redirects
+        """
+        self.status_code = status_code
+        self.reason = reason
+        self.headers = headers
+        self.content = content
+        self.url = url
+
+    @property
+    def encoding(self):
+        """
+        Returns:
+            str: charset of the `Content-Type` header, None if not given
+        """
+        message = Message()
+        message['content-type'] = self.headers.get('content-type', '')
+        return message.get_param('charset')
+
+    @property
+    def text(self):
+        return self.content.decode(self.encoding or 'utf-8', 'replace')
+
+    @property
+    def ok(self):
+        return self.status_code < 400
+
+    def json(self, **kwargs):
+        if kwargs:
+            return jsonlib.loads(self.text, **kwargs)
+        return json_codec().loads(self.content)
+
+    def raise_for_status(self):
+        """
+        Raises:
+            requests.HTTPError: for 4xx and 5xx responses, as `requests.Response` does
+        """
+        if 400 <= self.status_code < 600:
+            kind = 'Client' if self.status_code < 500 else 'Server'
+            raise requests.HTTPError(
+                '{} {} Error: {} for url: {}'.format(self.status_code, kind, self.reason, self.url), response=self
+            )
+
+    def close(self):
+        """
+        Nothing to release, the body is read and the connection back in its pool.
+        """
+
+    def __repr__(self):
+        return '<LightResponse [{}]>'.format(self.status_code)
+
+
+class Urllib3Transport(object):
+    """
+    Makes requests through a urllib3 pool manager, one connection pool per host.
+    """
+
+    def __init__(self, maxsize=10, compressor=None):
+        """
+        Args:
+            maxsize (int): connections kept per host, as `pool_maxsize` of requests
+            compressor (oauth2_client.compression.RequestCompressor): compresses the request bodies, optional
+        """
+        self.maxsize = maxsize
+        self.compressor = compressor
+        self.pool_manager = self.new_pool_manager()
+        # no retries, only redirects are followed, and the last redirect response is returned when
+        # there are too many of them. Retry objects are immutable, so they are shared by the requests.
+        # NOTE: `other` needs urllib3 >= 1.26, the `urllib3_transport` extra
+        self.retries = Retry(
+            total=None, connect=0, read=0, status=0, other=0, redirect=DEFAULT_REDIRECT_LIMIT, raise_on_redirect=False
+        )
+        self.no_redirect_retries = self.retries.new(redirect=0)
+
+    def new_pool_manager(self):
+        # CA bundle of requests, so both transports trust the same certificates
+        return urllib3.PoolManager(maxsize=self.maxsize, cert_reqs='CERT_REQUIRED', ca_certs=certifi.where())
+
+    def reset(self):
+        """
+        Replace the connection pools with empty ones, e.g. in a forked child process.
+        """
+        self.pool_manager = self.new_pool_manager()
+
+    def request(self, method, url, headers, data=None, params=None, json=None, timeout=None, allow_redirects=True):
+        """
+        Make a request, arguments as of `requests.Session.request`.
+
+        Args:
+            headers (requests.structures.CaseInsensitiveDict): request headers, updated in place
+
+        Returns:
+            LightResponse:
+
+        Raises:
+            requests.ConnectionError:
+            requests.Timeout:
+        """
+        if params:
+            url = '{}{}{}'.format(url, '&' if urlsplit(url).query else '?', urlencode(params, doseq=True))
+        body = encode_body(headers, data, json)
+        if body and self.compressor is not None:
+            body = self.compressor.compress_body(headers, body)
+        if body is None and method not in ('GET', 'HEAD'):
+            # as `requests` does
+            headers.setdefault('Content-Length', '0')
+        try:
+            response = self.pool_manager.request(
+                method, url, body=body, headers=headers, timeout=to_urllib3_timeout(timeout),
+                retries=self.retries if allow_redirects else self.no_redirect_retries,
+                redirect=allow_redirects, preload_content=True,
+            )
+        except MaxRetryError as e:
+            raise to_requests_error(e.reason, e)
+        except (ConnectTimeoutError, ReadTimeoutError, NewConnectionError, SSLError, ProtocolError) as e:
+            raise to_requests_error(e, e)
+        return LightResponse(
+            response.status, response.reason, response.headers, response.data, final_url(url, response)
+        )
+
+
+def final_url(url, response):
+    """
+    Args:
+        url (str): URL of the request
+        response (urllib3.HTTPResponse): the response, after following the redirects
+
+    Returns:
+        str: absolute URL of the final request
+    """
+    history = response.retries.history if response.retries else ()
+    for redirect in history:
+        if redirect.redirect_location:
+            url = urljoin(url, redirect.redirect_location)
+    return url
+
+
+def encode_body(headers, data, json):
+    """
+    Encode the request body as `requests` does for the common cases: raw data, form
+    fields and JSON. Sets the `Content-Type` header, if not given.
+
+    Args:
+        headers (requests.structures.CaseInsensitiveDict): request headers, updated in place
+
+    Returns:
+        bytes or str: the body, None if none
+    """
+    if data is None and json is not None:
+        headers.setdefault('Content-Type', 'application/json')
+        return json_codec().dumps(json)
+    if isinstance(data, (dict, list, tuple)):
+        headers.setdefault('Content-Type', 'application/x-www-form-urlencoded')
+        return urlencode(data, doseq=True)
+    return data or None
+
+
+def to_urllib3_timeout(timeout):
+    """
+    Args:
+        timeout: seconds, or a (connect, read) tuple, as accepted by `requests`
+
+    Returns:
+        urllib3.Timeout:
+    """
+    if isinstance(timeout, tuple):
+        return urllib3.Timeout(connect=timeout[0], read=timeout[1])
+    return urllib3.Timeout(connect=timeout, read=timeout) if timeout is not None else urllib3.Timeout()
+
+
+def to_requests_error(reason, error):
+    """
+    Args:
+        reason (Exception): urllib3 exception behind the failure
+        error (Exception): urllib3 exception raised
+
+    Returns:
+        requests.RequestException: the exception `requests` raises in the same case
+    """
+    # NOTE: NewConnectionError is a ConnectTimeoutError too
+    if isinstance(reason, ConnectTimeoutError) and not isinstance(reason, NewConnectionError):
+        return requests.ConnectTimeout(error)
+    if isinstance(reason, ReadTimeoutError):
+        return requests.ReadTimeout(error)
+    if isinstance(reason, SSLError):
+        return requests.exceptions.SSLError(error)
+    return requests.ConnectionError(error)
@@ -0,0 +1,56 @@
+"""
+Circuit breaker utilities.
+"""
+from datetime import datetime, timedelta
+
+import pybreaker
+
+
+class CircuitOpenError(pybreaker.CircuitBreakerError):
+    """
+    The call was rejected by the open circuit, it was never made. The failure opening the
+    circuit is raised as a plain `pybreaker.CircuitBreakerError`.
+    """
+
+
+class ConcurrentCircuitBreaker(pybreaker.CircuitBreaker):
+    """
+    `pybreaker.CircuitBreaker` holds its lock for the whole duration of the protected
+    call, so all the calls protected by one breaker run one at a time, even from
+    different threads. This breaker holds the lock only to check and update its state,
+    the protected calls run concurrently.
+
+    Behaviour differs in the half-open state only: all the calls started before the
+    trial call finishes are let through, not just the trial call.
+
+    NOTE: relies on the state internals of pybreaker 0.6 (`opened_at` stored as naive UTC,
+    `_handle_error`, `_handle_success`), the dependency is pinned to `<0.7` in setup.py
+    """
+
+    def call(self, func, *args, **kwargs):
+        """
+        Calls `func` with the given `args` and `kwargs` according to the current state
+        of the breaker, and updates the state according to the result.
+        """
+        with self._lock:
+            state = self.state
+            if state.name == pybreaker.STATE_OPEN:
+                opened_at = self._state_storage.opened_at
+                if opened_at and datetime.utcnow() < opened_at + timedelta(seconds=self.reset_timeout):
+                    raise CircuitOpenError('Timeout not elapsed yet, circuit breaker still open')
+                self.half_open()
+                state = self.state
+            state.before_call(func, *args, **kwargs)
+            for listener in self.listeners:
+                listener.before_call(self, func, *args, **kwargs)
+
+        # pylint: disable=protected-access
+        try:
+            ret = func(*args, **kwargs)
+        except BaseException as e:  # pylint: disable=broad-except
+            with self._lock:
+                state._handle_error(e)
+        else:
+            with self._lock:
+                state._handle_success()
+        return ret
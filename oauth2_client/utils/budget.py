@@ -0,0 +1,41 @@
+"""
+Budgets of extra requests, e.g. hedges or retries, as a fraction of the requests made.
+"""
+import threading
+
+
+class Budget(object):
+    """
+    Thread-safe budget: every request made adds `ratio` to the balance, every extra
+    request takes one from it. The balance is capped, so a quiet period doesn't allow a
+    storm of extra requests afterwards, and starts full.
+    """
+
+    def __init__(self, ratio, max_balance):
+        """
+        Args:
+            ratio (float): extra requests allowed per request made, e.g. 0.1 for 10%
+            max_balance (float): extra requests allowed at once
+        """
+        self.ratio = ratio
+        self.max_balance = float(max_balance)
+        self.balance = self.max_balance
+        self._lock = threading.Lock()
+
+    def deposit(self):
+        """
+        A request was made.
+        """
+        with self._lock:
+            self.balance = min(self.max_balance, self.balance + self.ratio)
+
+    def withdraw(self):
+        """
+        Returns:
+            bool: True if an extra request is allowed, it is taken from the balance then
+        """
+        with self._lock:
+            if self.balance < 1:
+                return False
+            self.balance -= 1
+            return True
@@ -0,0 +1,33 @@
+"""
+Fork safety utilities, for apps preloaded in a master process before forking
+workers (e.g. `gunicorn --preload`, uwsgi without `lazy-apps`). State shared
+across a fork, like sockets and locks, has to be re-created in the children.
+"""
+import os
+
+_after_fork_in_child = []
+
+
+def after_fork_in_child(func):
+    """
+    Register a function to be called in the child process after `os.fork()`.
+    Can be used as a decorator. Not supported before python 3.7, functions are
+    never called there.
+
+    Args:
+        func (callable): function without arguments
+
+    Returns:
+        callable: the function
+    """
+    _after_fork_in_child.append(func)
+    return func
+
+
+def _run_after_fork_in_child():
+    for func in _after_fork_in_child:
+        func()
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_run_after_fork_in_child)
@@ -0,0 +1,99 @@
+"""
+JSON codecs. The codec is chosen with the `OAUTH2_CLIENT_JSON_CODEC` setting:
+`auto` (default) picks the fastest one installed - orjson, then ujson, then the
+standard library - or one of them by name: `orjson`, `ujson`, `json`.
+
+All the codecs decode straight from bytes, and encode to UTF-8 bytes. Decoding
+errors are raised as `ValueError`.
+"""
+import json
+
+from oauth2_client.conf import get_setting
+
+CODEC_AUTO = 'auto'
+
+
+class StdlibCodec(object):
+    """
+    The standard library `json` module.
+    """
+    name = 'json'
+
+    @staticmethod
+    def loads(data):
+        if isinstance(data, bytes):
+            data = data.decode('utf-8')
+        return json.loads(data)
+
+    @staticmethod
+    def dumps(obj):
+        # NaN isn't valid JSON, `requests` refuses it too
+        return json.dumps(obj, allow_nan=False).encode('utf-8')
+
+
+class OrjsonCodec(object):
+    """
+    orjson, returns bytes natively.
+    """
+    name = 'orjson'
+
+    def __init__(self):
+        import orjson  # pylint: disable=import-error
+        self.loads = orjson.loads
+        self.dumps = orjson.dumps
+
+
+class UjsonCodec(object):
+    """
+    ujson.
+    """
+    name = 'ujson'
+
+    def __init__(self):
+        import ujson  # pylint: disable=import-error
+        self.loads = ujson.loads
+        self._dumps = ujson.dumps
+
+    def dumps(self, obj):
+        return self._dumps(obj).encode('utf-8')
+
+
+CODECS = {codec.name: codec for codec in (OrjsonCodec, UjsonCodec, StdlibCodec)}
+
+_codecs = {}
+
+
+def json_codec():
+    """
+    Returns:
+        the configured codec, with `loads(bytes or str)` and `dumps(obj) -> bytes`
+
+    Raises:
+        ValueError: unknown codec configured
+        ImportError: the configured codec is not installed
+    """
+    name = get_setting('JSON_CODEC')
+    codec = _codecs.get(name)
+    if codec is None:
+        codec = _codecs[name] = load_auto_codec() if name == CODEC_AUTO else load_codec(name)
+    return codec
+
+
+def load_codec(name):
+    """
+    Raises:
+        ValueError: unknown codec
+        ImportError: the codec is not installed
+    """
+    if name not in CODECS:
+        raise ValueError('Unknown JSON codec: {}, use one of: {}'.format(name, ', '.join([CODEC_AUTO] + list(CODECS))))
+    return CODECS[name]()
+
+
+def load_auto_codec():
+    for codec in (OrjsonCodec, UjsonCodec):
+        try:
+            return codec()
+        except ImportError:
+            continue
+    return StdlibCodec()
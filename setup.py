@@ -36,7 +36,7 @@ setup(
         'django>=1.11.17,<1.12;python_version=="2.7"',
         'django>=2.2;python_version>="3.7"',
         'psycopg2 >= 2.7.3',
-        'pybreaker>=0.6.0',
+        'pybreaker>=0.6.0,<0.7',
         'requests_oauthlib>=1.3.0',
         'retrying>=1.3.3',
     ],
@@ -48,5 +48,16 @@ setup(
         "JWT_grant": [
             'cryptography>=2.8',
         ],
+        "compression": [
+            'zstandard>=0.15',
+            'brotli>=1.0',
+        ],
+        "urllib3_transport": [
+            'urllib3>=1.26',
+        ],
+        "fast_json": [
+            'ujson>=1.35;python_version=="2.7"',
+            'orjson>=2.0;python_version>="3.7"',
+        ],
     }
 )
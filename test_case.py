@@ -41,3 +41,66 @@ class StandaloneAppTestCase(TestCase):
     def setUpClass(cls):
         setup_django()
         super(StandaloneAppTestCase, cls).setUpClass()
+
+
+class ClientTestCase(StandaloneAppTestCase):
+    """
+    Parent test case class for the OAuth2Client requests. Every test starts with the
+    circuit breaker closed and the process-wide limiters, bulkheads, hedgers, retry
+    budget, token endpoint stats and response caches empty.
+    """
+    SERVICE_HOST = 'https://some-api.com'
+    # set for the test servers speaking plain HTTP
+    insecure_transport = False
+
+    def setUp(self):
+        super(ClientTestCase, self).setUp()
+        from oauth2_client import bulkhead, concurrency, endpoints, hedge, http_cache, ratelimit, retry
+        from oauth2_client.client import request_breaker
+        from tests.test_compat import patch
+
+        request_breaker.close()
+        # pylint: disable=protected-access
+        for registry in (bulkhead._bulkheads, concurrency._limiters, hedge._hedgers, ratelimit._limiters):
+            registry.clear()
+        for cache in list(http_cache._caches.values()):
+            cache.clear()
+        retry.reset()
+        endpoints.reset()
+        if self.insecure_transport:
+            env_patcher = patch.dict(os.environ, {'OAUTHLIB_INSECURE_TRANSPORT': '1'})
+            env_patcher.start()
+            self.addCleanup(env_patcher.stop)
+
+    def make_app(self, name='app', service_host=None, **fields):
+        """
+        Args:
+            name (str): name of the Application, unique within a test
+            service_host (str): base URL of the service, SERVICE_HOST when not given
+            fields: other fields of the Application
+        """
+        from tests.ide_test_compat import ApplicationFactory
+
+        return ApplicationFactory(name=name, service_host=service_host or self.SERVICE_HOST, **fields)
+
+    def client_for(self, app, token='token', **kwargs):
+        """
+        Client of an Application, with a valid token.
+
+        Args:
+            token (str): the access token, unique within a test
+            kwargs: arguments of the OAuth2Client, e.g. `transport`
+        """
+        from tests.ide_test_compat import AccessTokenFactory, OAuth2Client
+
+        return OAuth2Client(AccessTokenFactory(application=app, token=token), **kwargs)
+
+    def make_client(self, name='app', token='token', service_host=None, transport=None, lean=None, **extra_settings):
+        """
+        Client of a new Application with a valid token, see `make_app` and `client_for`.
+
+        Args:
+            extra_settings: `extra_settings` of the Application
+        """
+        app = self.make_app(name, service_host, extra_settings=extra_settings)
+        return self.client_for(app, token, transport=transport, lean=lean)
@@ -0,0 +1,106 @@
+"""
+Local HTTP server answering the requests of the transport tests.
+"""
+import gzip
+import io
+import json
+import threading
+import time
+
+from oauth2_client.compat import socketserver
+from .test_compat import BaseHTTPRequestHandler, HTTPServer
+
+
+class TestRequestHandler(BaseHTTPRequestHandler):
+    """
+    Endpoints:
+        /echo: the request as JSON: method, path, headers (lowercase names) and body, gunzipped
+        /status/<code>: the status code
+        /redirect: redirect to /echo
+        /cookie: sets a cookie
+        /gzip: gzip-encoded JSON
+        /jwt-invalid: Salesforce invalid JWT grant response, for the token `expired-token` only
+        /slow: answers after half a second
+        /etag: JSON to be revalidated with the ETag `"v1"`, 304 when the request has it
+    """
+    protocol_version = 'HTTP/1.1'
+    # whole responses are sent in one write, small writes are delayed over keep-alive connections
+    wbufsize = -1
+    disable_nagle_algorithm = True
+
+    def log_message(self, *args):  # pylint: disable=arguments-differ
+        pass
+
+    def do_GET(self):  # pylint: disable=invalid-name
+        path = self.path.split('?')[0]
+        if path == '/echo':
+            self.send_json(200, {
+                'method': self.command,
+                'path': self.path,
+                'headers': {name.lower(): value for name, value in self.headers.items()},
+                'body': self.read_body().decode('utf-8'),
+            })
+        elif path.startswith('/status/'):
+            self.send_json(int(path.split('/')[-1]), {'status': path.split('/')[-1]})
+        elif path == '/redirect':
+            self.send_body(302, b'', {'Location': '/echo'})
+        elif path == '/cookie':
+            self.send_json(200, {}, {'Set-Cookie': 'session=abc; Path=/'})
+        elif path == '/gzip':
+            buf = io.BytesIO()
+            with gzip.GzipFile(fileobj=buf, mode='wb') as gz:
+                gz.write(json.dumps({'compressed': True}).encode('utf-8'))
+            self.send_body(200, buf.getvalue(), {'Content-Type': 'application/json', 'Content-Encoding': 'gzip'})
+        elif path == '/jwt-invalid' and self.headers.get('Authorization') == 'Bearer expired-token':
+            self.send_json(400, {'error': 'invalid_grant', 'error_description': 'expired'})
+        elif path == '/jwt-invalid':
+            self.send_json(200, {})
+        elif path == '/etag' and self.headers.get('If-None-Match') == '"v1"':
+            self.send_body(304, b'', {'ETag': '"v1"', 'Cache-Control': 'no-cache'})
+        elif path == '/etag':
+            self.send_json(200, {'version': 1}, {'ETag': '"v1"', 'Cache-Control': 'no-cache'})
+        elif path == '/slow':
+            time.sleep(0.5)
+            self.send_json(200, {})
+        else:
+            self.send_json(404, {})
+
+    do_POST = do_PUT = do_PATCH = do_DELETE = do_GET
+
+    def read_body(self):
+        body = self.rfile.read(int(self.headers.get('Content-Length') or 0))
+        if self.headers.get('Content-Encoding') == 'gzip':
+            body = gzip.GzipFile(fileobj=io.BytesIO(body)).read()
+        return body
+
+    def send_json(self, status, obj, headers=None):
+        headers = dict(headers or {}, **{'Content-Type': 'application/json'})
+        self.send_body(status, json.dumps(obj, sort_keys=True).encode('utf-8'), headers)
+
+    def send_body(self, status, body, headers):
+        self.send_response(status)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class TestServer(socketserver.ThreadingMixIn, HTTPServer):
+    """
+    Serves on a free port of localhost, in a daemon thread.
+    """
+    daemon_threads = True
+
+    def __init__(self):
+        HTTPServer.__init__(self, ('127.0.0.1', 0), TestRequestHandler)
+        self.url = 'http://127.0.0.1:{}'.format(self.server_address[1])
+
+    def start(self):
+        thread = threading.Thread(target=self.serve_forever)
+        thread.daemon = True
+        thread.start()
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
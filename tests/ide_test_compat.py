@@ -9,7 +9,7 @@ from oauth2_provider.models import Application as ProviderApplication
 from oauth2_client.client import get_client, OAuth2Client
 from oauth2_client.fetcher import Fetcher, JWTFetcher
 from oauth2_client.management.commands.oauth2_app_maker import Command as AbstractAppMaker
-from oauth2_client.models import AccessToken, Application
+from oauth2_client.models import AccessToken, Application, CurrentAccessToken, RawToken
 from tests.factories import (
     ApplicationFactory, AccessTokenFactory, fake_client_secret, fake_token, fake_app_name, fake_client_id
 )
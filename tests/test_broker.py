@@ -0,0 +1,162 @@
+"""
+Token broker tests.
+"""
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+from datetime import timedelta
+
+from django.test import override_settings
+from django.utils import timezone
+from testfixtures import LogCapture
+
+from oauth2_client.broker import BrokerClient, BrokerServer, BrokerUnavailable, TokenBroker
+from test_case import StandaloneAppTestCase
+from .test_compat import patch
+
+
+def valid_token(app, token='valid_token', expires_in=3600):
+    """
+    Unsaved, valid token.
+    """
+    from .ide_test_compat import AccessToken
+
+    return AccessToken(
+        application=app, token=token, token_type='Bearer', scope='read',
+        expires=timezone.now().replace(microsecond=0) + timedelta(seconds=expires_in)
+    )
+
+
+class BrokerProtocolTest(StandaloneAppTestCase):
+    """
+    Workers get tokens from a running broker over the socket.
+    """
+
+    def setUp(self):
+        super(BrokerProtocolTest, self).setUp()
+        self.tmp_dir = tempfile.mkdtemp()
+        self.socket_path = os.path.join(self.tmp_dir, 'broker.sock')
+        self.server = BrokerServer(self.socket_path)
+        threading.Thread(target=self.server.serve_forever).start()
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+        shutil.rmtree(self.tmp_dir)
+        super(BrokerProtocolTest, self).tearDown()
+
+    def test_token_served(self):
+        """
+        Ensure the token is transferred intact, and the stale token is passed to the broker.
+        """
+        from .ide_test_compat import ApplicationFactory
+
+        app = ApplicationFactory()
+        expected = valid_token(app)
+        with patch.object(TokenBroker, 'token', return_value=expected) as mock_token:
+            actual = BrokerClient(self.socket_path, timeout=1).get_token(app, stale_token='stale')
+
+        mock_token.assert_called_once_with(app.name, 'stale')
+        self.assertEqual(actual.app_key, app.name)
+        self.assertEqual(actual.access_token, expected.token)
+        self.assertEqual(actual.token_type, expected.token_type)
+        self.assertEqual(actual.scope, expected.scope)
+        self.assertAlmostEqual(actual.expires_in(), 3600, delta=5)
+
+    def test_broker_error(self):
+        """
+        Ensure failures on the broker side are reported to the worker.
+        """
+        from .ide_test_compat import ApplicationFactory
+
+        with patch.object(TokenBroker, 'token', side_effect=KeyError('access_token')), LogCapture() as logs:
+            with self.assertRaises(BrokerUnavailable):
+                BrokerClient(self.socket_path, timeout=1).get_token(ApplicationFactory())
+        self.assertIn('Token broker failed to handle request', str(logs))
+
+
+class TokenBrokerTest(StandaloneAppTestCase):
+    """
+    Token acquisition on the broker side.
+    """
+
+    @patch('oauth2_client.client.fetch_and_store_token')
+    def test_token_reused(self, mock_fetch):
+        from .ide_test_compat import ApplicationFactory
+
+        app = ApplicationFactory()
+        mock_fetch.return_value = valid_token(app)
+        broker = TokenBroker()
+        self.assertEqual(broker.token(app.name).token, 'valid_token')
+        self.assertEqual(broker.token(app.name, stale_token='older_token').token, 'valid_token')
+        mock_fetch.assert_called_once_with(app)
+
+    @patch('oauth2_client.client.fetch_and_store_token')
+    def test_stale_token_refetched(self, mock_fetch):
+        from .ide_test_compat import ApplicationFactory
+
+        app = ApplicationFactory()
+        mock_fetch.side_effect = [valid_token(app, 'first_token'), valid_token(app, 'second_token')]
+        broker = TokenBroker()
+        self.assertEqual(broker.token(app.name).token, 'first_token')
+        self.assertEqual(broker.token(app.name, stale_token='first_token').token, 'second_token')
+
+    @patch('oauth2_client.client.fetch_and_store_token')
+    def test_refreshed_ahead(self, mock_fetch):
+        """
+        Ensure a token expiring within the lead time is served, and refreshed in the background.
+        """
+        from .ide_test_compat import ApplicationFactory
+
+        app = ApplicationFactory()
+        mock_fetch.side_effect = [valid_token(app, 'expiring_token', expires_in=150), valid_token(app, 'next_token')]
+        broker = TokenBroker(lead_time=300)
+        self.assertEqual(broker.token(app.name).token, 'expiring_token')
+        self.assertEqual(broker.token(app.name).token, 'expiring_token')
+        for _ in range(50):
+            if broker.token(app.name).token == 'next_token':
+                break
+            time.sleep(0.01)
+        self.assertEqual(broker.token(app.name).token, 'next_token')
+        self.assertEqual(2, mock_fetch.call_count)
+
+    @patch('oauth2_client.client.fetch_and_store_token')
+    def test_application_edited(self, mock_fetch):
+        """
+        Ensure the tokens are dropped when an Application is saved here, or in another process.
+        """
+        from .ide_test_compat import ApplicationFactory
+        from oauth2_client.notify import EVENT_APPLICATION, TokenChangeListener
+
+        app = ApplicationFactory()
+        mock_fetch.side_effect = lambda app: valid_token(app)
+        broker = TokenBroker()
+        broker.token(app.name)
+        app.save()
+        self.assertEqual({}, broker._tokens)
+
+        broker.token(app.name)
+        listener = TokenChangeListener('channel', 'default')
+        listener.handle(json.dumps({'event': EVENT_APPLICATION, 'app': app.name, 'sender': 'other'}))
+        self.assertEqual({}, broker._tokens)
+
+
+class BrokerFallbackTest(StandaloneAppTestCase):
+    """
+    Workers fetch tokens themselves when the broker is unavailable.
+    """
+
+    @patch('oauth2_client.client.fetch_token')
+    def test_fallback_to_direct_fetch(self, fetch_token_mock):
+        from .ide_test_compat import ApplicationFactory, get_client
+        from oauth2_client.cache import token_cache
+
+        app = ApplicationFactory()
+        fetch_token_mock.return_value = valid_token(app)
+        with override_settings(OAUTH2_CLIENT_BROKER_SOCKET='/nonexistent/broker.sock'):
+            self.assertEqual(get_client(app.name).token['access_token'], 'valid_token')
+        fetch_token_mock.assert_called_once_with(app)
+        token_cache.invalidate()
@@ -0,0 +1,115 @@
+"""
+Bulkhead tests.
+"""
+import threading
+
+from django.test import override_settings
+
+from oauth2_client.bulkhead import Bulkhead, BulkheadFull, bulkhead
+from oauth2_client.signals import bulkhead_rejected
+from test_case import ClientTestCase, StandaloneAppTestCase
+from .test_compat import Mock, patch
+
+
+class BulkheadTest(StandaloneAppTestCase):
+    """
+    Slots of the requests in flight.
+    """
+
+    def test_reject(self):
+        rejections = []
+
+        def receiver(sender, **kwargs):  # pylint: disable=unused-argument
+            rejections.append(kwargs)
+
+        limit = Bulkhead('app', max_in_flight=2, max_wait=0)
+        limit.acquire()
+        limit.acquire()
+        bulkhead_rejected.connect(receiver)
+        try:
+            with self.assertRaises(BulkheadFull) as context:
+                limit.acquire()
+        finally:
+            bulkhead_rejected.disconnect(receiver)
+        self.assertEqual(('app', 2), (context.exception.app_name, context.exception.max_in_flight))
+        self.assertEqual([{'app_name': 'app', 'in_flight': 2, 'signal': bulkhead_rejected}], rejections)
+        limit.release()
+        limit.acquire()
+        self.assertEqual(
+            {'max_in_flight': 2, 'in_flight': 2, 'accepted': 3, 'queued': 0, 'rejected': 1}, limit.stats()
+        )
+
+    def test_wait(self):
+        limit = Bulkhead('app', max_in_flight=1, max_wait=5)
+        limit.acquire()
+        acquired = threading.Event()
+
+        def acquire():
+            limit.acquire()
+            acquired.set()
+
+        thread = threading.Thread(target=acquire)
+        thread.start()
+        self.assertFalse(acquired.wait(0.05))
+        limit.release()
+        self.assertTrue(acquired.wait(5))
+        thread.join()
+        self.assertEqual(1, limit.stats()['queued'])
+
+    def test_wait_timeout(self):
+        limit = Bulkhead('app', max_in_flight=1, max_wait=0.01)
+        limit.acquire()
+        with self.assertRaises(BulkheadFull):
+            limit.acquire()
+        self.assertEqual({'queued': 1, 'rejected': 1}, {
+            name: value for name, value in limit.stats().items() if name in ('queued', 'rejected')
+        })
+
+
+class ClientBulkheadTest(ClientTestCase):
+    """
+    Requests of the clients within the bulkhead of their Application.
+    """
+
+    def test_no_cap(self):
+        self.assertIsNone(self.make_client().bulkhead)
+
+    @override_settings(OAUTH2_CLIENT_BULKHEAD_MAX_IN_FLIGHT=5, OAUTH2_CLIENT_BULKHEAD_MAX_WAIT=0.1)
+    def test_configuration(self):
+        client = self.make_client()
+        self.assertEqual((5, 0.1), client.bulkhead.config)
+        other = self.make_client('other', 'other', max_in_flight=2, max_in_flight_wait=0)
+        self.assertEqual((2, 0), other.bulkhead.config)
+        self.assertIsNone(self.make_client('third', 'third', max_in_flight=None).bulkhead)
+
+    def test_shared_per_app(self):
+        client = self.make_client(max_in_flight=2)
+        self.assertIs(client.bulkhead, bulkhead(client.app))
+        self.assertIsNot(client.bulkhead, self.make_client('other', 'other', max_in_flight=2).bulkhead)
+        client.app.extra_settings = {'max_in_flight': 3}
+        self.assertEqual(3, bulkhead(client.app).max_in_flight)
+
+    def test_released(self):
+        client = self.make_client(max_in_flight=1, max_in_flight_wait=0)
+        with patch.object(client, 'protected_request', return_value=Mock(status_code=200)):
+            client.get('/api/hello')
+            client.get('/api/hello')
+        with patch.object(client, 'protected_request', side_effect=ValueError):
+            with self.assertRaises(ValueError):
+                client.get('/api/hello')
+        self.assertEqual(0, client.bulkhead.in_flight)
+        self.assertEqual(3, client.bulkhead.stats()['accepted'])
+
+    def test_rejected(self):
+        """
+        Ensure rejected requests don't reach the breaker.
+        """
+        from oauth2_client.client import request_breaker
+
+        client = self.make_client(max_in_flight=1, max_in_flight_wait=0)
+        client.bulkhead.acquire()
+        with patch.object(client, 'protected_request') as protected_request:
+            with self.assertRaises(BulkheadFull):
+                client.get('/api/hello')
+        protected_request.assert_not_called()
+        self.assertEqual('closed', request_breaker.current_state)
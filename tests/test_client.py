@@ -5,6 +5,7 @@ from datetime import timedelta
 
 import requests_mock
 import six
+from django.test import override_settings
 from django.utils import timezone
 from pybreaker import CircuitBreakerError
 
@@ -193,3 +194,36 @@ class ClientTest(StandaloneAppTestCase):
         with six.assertRaisesRegex(self, CircuitBreakerError, "Failures threshold reached"):
             tested_client.get(api_url)
         mock_fetch_token.assert_called_once_with(app)
+
+
+class TokenSnapshotTest(StandaloneAppTestCase):
+    """
+    Tokens are added to the requests the same way with and without the precomputed header.
+    """
+
+    def add_token(self, token, headers=None):
+        from oauth2_client.client import TokenSnapshot
+        return TokenSnapshot('client_id', token).add_token('GET', 'https://some-api.com/', None, headers)
+
+    def test_same_as_oauthlib(self):
+        tokens = [
+            {'access_token': 'token', 'token_type': 'Bearer', 'scope': 'read', 'expires_in': 3600},
+            {'access_token': 'token', 'token_type': 'bearer', 'scope': ''},
+        ]
+        for token in tokens:
+            for headers in (None, {'Accept': 'application/json'}):
+                with override_settings(OAUTH2_CLIENT_FAST_AUTH_HEADER=False):
+                    expected = self.add_token(token, headers and dict(headers))
+                with override_settings(OAUTH2_CLIENT_FAST_AUTH_HEADER=True):
+                    actual = self.add_token(token, headers)
+                self.assertEqual(expected, actual)
+        self.assertEqual(actual[1]['Authorization'], 'Bearer token')
+        self.assertEqual(headers, {'Accept': 'application/json'})  # not modified
+
+    def test_expired(self):
+        from oauthlib.oauth2 import TokenExpiredError
+
+        for fast in (True, False):
+            with override_settings(OAUTH2_CLIENT_FAST_AUTH_HEADER=fast):
+                with self.assertRaises(TokenExpiredError):
+                    self.add_token({'access_token': 'token', 'token_type': 'Bearer', 'expires_in': -1})
@@ -0,0 +1,88 @@
+"""
+Lean mode client tests.
+"""
+from datetime import timedelta
+
+import requests_mock
+from django.utils import timezone
+
+from test_case import ClientTestCase
+from .test_compat import patch
+
+API_URL = 'https://some-api.com/api/hello'
+
+
+class LeanClientTest(ClientTestCase):
+    """
+    Lean clients authorize the requests like the regular ones, without the environment and cookies.
+    """
+
+    def lean_client(self, **token_fields):
+        from .ide_test_compat import AccessTokenFactory, OAuth2Client
+
+        return OAuth2Client(AccessTokenFactory(application=self.make_app(), token='token', **token_fields), lean=True)
+
+    @requests_mock.Mocker()
+    def test_request(self, mock_response):
+        """
+        Ensure the token, session headers, params and body are sent, and the environment is ignored.
+        """
+        mock_response.post(API_URL, json={})
+        client = self.lean_client()
+        client.headers['X-Session'] = 'session'
+        with patch.object(client, 'merge_environment_settings') as mock_merge:
+            client.post('/api/hello', params={'a': 1}, json={'b': 2}, headers={'X-Request': 'request'})
+        mock_merge.assert_not_called()
+
+        sent = mock_response.last_request
+        self.assertEqual(sent.url, API_URL + '?a=1')
+        self.assertEqual(sent.json(), {'b': 2})
+        self.assertEqual(sent.headers['Authorization'], 'Bearer token')
+        self.assertEqual(sent.headers['X-Session'], 'session')
+        self.assertEqual(sent.headers['X-Request'], 'request')
+
+    @requests_mock.Mocker()
+    def test_cookies_ignored(self, mock_response):
+        mock_response.get(API_URL, json={}, headers={'Set-Cookie': 'session=abc; Path=/'})
+        client = self.lean_client()
+        client.get('/api/hello')
+        client.get('/api/hello')
+        self.assertNotIn('Cookie', mock_response.last_request.headers)
+        self.assertEqual(len(client.cookies), 0)
+
+    @requests_mock.Mocker()
+    def test_template_reused(self, mock_response):
+        """
+        Ensure repeated requests are copied from one template, rebuilt when the token changes.
+        """
+        from .ide_test_compat import AccessTokenFactory
+        from oauth2_client.tokens import TokenValue
+
+        mock_response.get(API_URL, json={})
+        client = self.lean_client()
+        with patch.object(client, 'prepare_lean', wraps=client.prepare_lean) as mock_prepare:
+            client.get('/api/hello')
+            client.get(API_URL)
+            self.assertEqual(mock_prepare.call_count, 1)
+
+            client.token = TokenValue.from_token(AccessTokenFactory(application=client.app)).to_client_dict()
+            client.get('/api/hello')
+            self.assertEqual(mock_prepare.call_count, 2)
+        self.assertEqual(mock_response.last_request.headers['Authorization'], 'Bearer ' + client.access_token)
+
+    @patch('oauth2_client.client.renew_token')
+    @requests_mock.Mocker()
+    def test_expired_template_token_renewed(self, renew_token_mock, mock_response):
+        from .ide_test_compat import AccessTokenFactory
+        from oauth2_client.tokens import TokenValue
+
+        mock_response.get(API_URL, json={})
+        client = self.lean_client(expires=timezone.now() + timedelta(hours=1))
+        renew_token_mock.return_value = TokenValue.from_token(
+            AccessTokenFactory(application=client.app, token='new_token')
+        )
+        client.get('/api/hello')
+        with patch('oauth2_client.client.monotonic', return_value=client._snapshot.expires_at + 1):
+            client.get('/api/hello')
+        renew_token_mock.assert_called_once_with(client.app, 'token')
+        self.assertEqual(mock_response.last_request.headers['Authorization'], 'Bearer new_token')
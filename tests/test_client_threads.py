@@ -0,0 +1,98 @@
+"""
+Tests of a client shared by multiple threads.
+"""
+import threading
+import time
+
+import requests_mock
+
+from oauth2_client.models import Application
+from test_case import ClientTestCase
+from .test_client import JWT_INVALID_RESP
+from .test_compat import Mock, patch
+
+THREADS = 8
+REQUESTS_PER_THREAD = 25
+
+
+class SharedClientTest(ClientTestCase):
+    """
+    One client shared by many threads refreshes its token once, and every request succeeds.
+    """
+
+    def run_threads(self, target):
+        errors = []
+
+        def run():
+            try:
+                target()
+            except Exception as e:  # pylint: disable=broad-except
+                errors.append(e)
+
+        threads = [threading.Thread(target=run) for _ in range(THREADS)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return errors
+
+    @patch('oauth2_client.client.renew_token')
+    @requests_mock.Mocker()
+    def test_concurrent_token_refresh(self, renew_token_mock, mock_response):
+        from .ide_test_compat import AccessTokenFactory, ApplicationFactory, OAuth2Client
+        from oauth2_client.tokens import TokenValue
+
+        api_url = 'https://some-api.com/api/hello'
+        app = ApplicationFactory(authorization_grant_type=Application.GRANT_JWT_BEARER)
+        old_token = AccessTokenFactory(application=app, token='old-token')
+        new_token = AccessTokenFactory(application=app, token='new-token')
+
+        def renew(*args):  # pylint: disable=unused-argument
+            # keep the other threads running into the expired token in the meantime
+            time.sleep(0.1)
+            return TokenValue.from_token(new_token)
+        renew_token_mock.side_effect = renew
+
+        def respond(request, context):
+            if request.headers['Authorization'] == 'Bearer old-token':
+                context.status_code = JWT_INVALID_RESP['status_code']
+                context.headers.update(JWT_INVALID_RESP['headers'])
+                return JWT_INVALID_RESP['json']
+            return {'hello': 'world'}
+        mock_response.get(api_url, json=respond)
+
+        client = OAuth2Client(old_token)
+        statuses = []
+
+        def make_requests():
+            for _ in range(REQUESTS_PER_THREAD):
+                statuses.append(client.get(api_url).status_code)
+
+        errors = self.run_threads(make_requests)
+        self.assertEqual([], errors)
+        self.assertEqual([200] * THREADS * REQUESTS_PER_THREAD, statuses)
+        renew_token_mock.assert_called_once_with(app, 'old-token')
+        self.assertEqual('new-token', client.token['access_token'])
+        self.assertEqual('new-token', client.access_token)
+
+    def test_requests_run_concurrently(self):
+        """
+        The circuit breaker doesn't serialize the requests: every request waits for all
+        the others to start.
+        """
+        started = []
+        all_started = threading.Event()
+
+        def make_request(*args, **kwargs):  # pylint: disable=unused-argument
+            started.append(args)
+            if len(started) == THREADS:
+                all_started.set()
+            self.assertTrue(all_started.wait(5), 'requests serialized')
+            return Mock(status_code=200)
+
+        client = self.make_client()
+        # NOTE: requests_mock serializes the requests itself, the transport is bypassed here
+        with patch.object(client, 'make_request', side_effect=make_request):
+            errors = self.run_threads(lambda: client.get('/api/hello'))
+        self.assertEqual([], errors)
+        self.assertEqual(THREADS, len(started))
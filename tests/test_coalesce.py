@@ -0,0 +1,151 @@
+"""
+Coalescing of identical in-flight requests tests.
+"""
+import threading
+import time
+
+import requests
+from django.test import override_settings
+from requests.structures import CaseInsensitiveDict
+
+from oauth2_client.coalesce import coalescer, copy_response, request_key
+from oauth2_client.transport import LightResponse
+from test_case import ClientTestCase, StandaloneAppTestCase
+from .test_compat import patch
+
+THREADS = 8
+
+
+def make_response(content=b'{"a": 1}'):
+    response = requests.Response()
+    response.status_code = 200
+    response.headers = CaseInsensitiveDict({'Content-Type': 'application/json'})
+    response._content = content  # pylint: disable=protected-access
+    response.url = 'https://some-api.com/api/config/'
+    return response
+
+
+def wait_for(condition, timeout=5):
+    deadline = time.time() + timeout
+    while not condition():
+        if time.time() > deadline:
+            raise AssertionError('timed out')
+        time.sleep(0.001)
+
+
+class CopyResponseTest(StandaloneAppTestCase):
+    """
+    Copies don't share anything mutable with the response.
+    """
+
+    def test_requests_response(self):
+        response = make_response()
+        copied = copy_response(response)
+        copied.headers['X-Copy'] = '1'
+        self.assertNotIn('X-Copy', response.headers)
+        self.assertEqual(copied.json(), {'a': 1})
+        self.assertEqual((copied.status_code, copied.url), (200, response.url))
+
+    def test_light_response(self):
+        response = LightResponse(200, 'OK', CaseInsensitiveDict(), b'{"a": 1}', 'https://some-api.com/')
+        copied = copy_response(response)
+        copied.headers['X-Copy'] = '1'
+        self.assertNotIn('X-Copy', response.headers)
+        self.assertEqual(copied.json(), {'a': 1})
+
+    def test_request_key(self):
+        url = 'https://some-api.com/api/config/'
+        key = request_key('app', url, CaseInsensitiveDict({'Accept': 'application/json'}), False)
+        self.assertEqual(key, request_key('app', url, {'accept': 'application/json'}, False))
+        self.assertNotEqual(key, request_key('app', url, {'accept': 'text/html'}, False))
+        self.assertNotEqual(key, request_key('other', url, {'accept': 'application/json'}, False))
+        self.assertNotEqual(key, request_key('app', url, {'accept': 'application/json'}, True))
+
+
+@override_settings(OAUTH2_CLIENT_COALESCE_REQUESTS=True)
+class ClientCoalesceTest(ClientTestCase):
+    """
+    Identical GETs of the threads, each with its own client, share one upstream call.
+    """
+
+    def setUp(self):
+        super(ClientCoalesceTest, self).setUp()
+        from .ide_test_compat import AccessTokenFactory
+        coalescer.reset_counters()
+        self.token = AccessTokenFactory(application=self.make_app())
+
+    def run_threads(self, target, threads=THREADS):
+        results, errors = [], []
+
+        def run():
+            try:
+                results.append(target())
+            except Exception as e:  # pylint: disable=broad-except
+                errors.append(e)
+
+        threads = [threading.Thread(target=run) for _ in range(threads)]
+        for thread in threads:
+            thread.start()
+        return threads, results, errors
+
+    def get_in_threads(self, outcome, url='/api/config/', **kwargs):
+        """
+        Make the same GET in all the threads, the upstream call ends once all the threads joined it.
+        """
+        from .ide_test_compat import OAuth2Client
+
+        release = threading.Event()
+
+        def protected_request(*args, **kw):  # pylint: disable=unused-argument
+            release.wait(5)
+            if isinstance(outcome, Exception):
+                raise outcome
+            return make_response()
+
+        with patch.object(OAuth2Client, 'protected_request', autospec=True, side_effect=protected_request) as mock:
+            threads, results, errors = self.run_threads(lambda: OAuth2Client(self.token, **kwargs).get(url))
+            wait_for(lambda: sum(coalescer.stats().values()) == THREADS)
+            release.set()
+            for thread in threads:
+                thread.join()
+        return mock, results, errors
+
+    def test_coalesced(self):
+        mock, results, errors = self.get_in_threads(None)
+        self.assertEqual([], errors)
+        self.assertEqual(1, mock.call_count)
+        self.assertEqual([{'a': 1}] * THREADS, [response.json() for response in results])
+        self.assertEqual(THREADS, len(set(id(response) for response in results)))
+        self.assertEqual(THREADS, len(set(id(response.headers) for response in results)))
+        self.assertEqual({'calls': 1, 'coalesced': THREADS - 1}, coalescer.stats())
+
+    def test_error(self):
+        error = requests.ConnectionError('down')
+        mock, results, errors = self.get_in_threads(error)
+        self.assertEqual(1, mock.call_count)
+        self.assertEqual([], results)
+        self.assertEqual([error] * THREADS, errors)
+
+    def test_call_done(self):
+        """
+        Ensure a call is forgotten once done, the next request makes its own call.
+        """
+        from .ide_test_compat import OAuth2Client
+
+        with patch.object(OAuth2Client, 'protected_request', autospec=True, return_value=make_response()) as mock:
+            client = OAuth2Client(self.token)
+            client.get('/api/config/')
+            client.get('/api/config/')
+        self.assertEqual(2, mock.call_count)
+
+    def test_not_coalesced(self):
+        """
+        Ensure requests with a body, and requests of clients without coalescing, are made as they are.
+        """
+        from .ide_test_compat import OAuth2Client
+
+        with patch.object(OAuth2Client, 'protected_request', autospec=True, return_value=make_response()) as mock:
+            OAuth2Client(self.token).post('/api/config/', json={})
+            OAuth2Client(self.token, coalesce=False).get('/api/config/')
+        self.assertEqual(2, mock.call_count)
+        self.assertEqual({'calls': 0, 'coalesced': 0}, coalescer.stats())
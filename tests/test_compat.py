@@ -7,3 +7,10 @@ try:
 except ImportError:
     # python 2.7
     from mock import Mock, patch
+
+try:
+    # python 3.x
+    from http.server import BaseHTTPRequestHandler, HTTPServer
+except ImportError:
+    # python 2.7
+    from BaseHTTPServer import BaseHTTPRequestHandler, HTTPServer  # noqa
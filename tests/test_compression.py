@@ -0,0 +1,144 @@
+"""
+Request and response compression tests.
+"""
+import gzip
+import io
+import json
+
+from ddt import data, ddt, unpack
+from django.test import override_settings
+
+from oauth2_client.compression import (
+    GzipCompressor, RequestCompressor, accepts_compressed_responses, load_auto_compressor, request_compressor
+)
+from test_case import ClientTestCase, StandaloneAppTestCase
+from .http_server import TestServer
+
+# (transport, lean) of the clients
+VARIANTS = [('requests', False), ('requests', True), ('urllib3', False)]
+
+BIG = {'items': ['item {}'.format(i) for i in range(200)]}
+
+
+def gunzip(data):
+    return gzip.GzipFile(fileobj=io.BytesIO(data)).read()
+
+
+class RequestCompressorTest(StandaloneAppTestCase):
+    """
+    Configuration from the `extra_settings` and compression of the bodies.
+    """
+
+    def make_app(self, **extra_settings):
+        from .ide_test_compat import ApplicationFactory
+
+        return ApplicationFactory(extra_settings=extra_settings)
+
+    def test_disabled(self):
+        app = self.make_app()
+        self.assertIsNone(request_compressor(app))
+        self.assertTrue(accepts_compressed_responses(app))
+
+    def test_configured(self):
+        compressor = request_compressor(self.make_app(
+            request_compression='gzip', request_compression_min_size=10, request_compression_level=1
+        ))
+        self.assertEqual(compressor.encoding, 'gzip')
+        self.assertEqual(compressor.min_size, 10)
+        self.assertEqual(compressor.compressor.level, 1)
+
+    @override_settings(OAUTH2_CLIENT_REQUEST_COMPRESSION_MIN_SIZE=99)
+    def test_default_min_size(self):
+        self.assertEqual(request_compressor(self.make_app(request_compression='gzip')).min_size, 99)
+
+    def test_auto(self):
+        compressor = request_compressor(self.make_app(request_compression='auto'))
+        self.assertEqual(compressor.encoding, load_auto_compressor().encoding)
+
+    def test_unknown(self):
+        with self.assertRaises(ValueError):
+            request_compressor(self.make_app(request_compression='lzma'))
+
+    def test_compress_body(self):
+        compressor = RequestCompressor(GzipCompressor(6), 10)
+        headers = {}
+        self.assertEqual(compressor.compress_body(headers, b'short'), b'short')
+        self.assertEqual(headers, {})
+
+        body = compressor.compress_body(headers, u'long enough body')
+        self.assertEqual(gunzip(body), b'long enough body')
+        self.assertEqual(headers, {'Content-Encoding': 'gzip', 'Content-Length': str(len(body))})
+
+    def test_not_compressed(self):
+        """
+        Ensure already encoded and file bodies are sent as they are.
+        """
+        compressor = RequestCompressor(GzipCompressor(6), 0)
+        headers = {'Content-Encoding': 'br'}
+        self.assertEqual(compressor.compress_body(headers, b'body'), b'body')
+        stream = io.BytesIO(b'body')
+        self.assertIs(compressor.compress_body({}, stream), stream)
+
+
+@ddt
+class ClientCompressionTest(ClientTestCase):
+    """
+    Requests of all the transports are compressed the same way.
+    """
+    insecure_transport = True
+
+    @classmethod
+    def setUpClass(cls):
+        super(ClientCompressionTest, cls).setUpClass()
+        cls.server = TestServer()
+        cls.server.start()
+        cls.SERVICE_HOST = cls.server.url
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.stop()
+        super(ClientCompressionTest, cls).tearDownClass()
+
+    @data(*VARIANTS)
+    @unpack
+    def test_json_compressed(self, transport, lean):
+        client = self.make_client(
+            transport=transport, lean=lean, request_compression='gzip', request_compression_min_size=100
+        )
+        echo = client.post('/echo', json=BIG).json()
+        self.assertEqual(echo['headers']['content-encoding'], 'gzip')
+        self.assertLess(int(echo['headers']['content-length']), len(json.dumps(BIG)))
+        self.assertEqual(json.loads(echo['body']), BIG)
+
+    @data(*VARIANTS)
+    @unpack
+    def test_small_not_compressed(self, transport, lean):
+        client = self.make_client(
+            transport=transport, lean=lean, request_compression='gzip', request_compression_min_size=100
+        )
+        echo = client.post('/echo', data={'a': 'b'}).json()
+        self.assertNotIn('content-encoding', echo['headers'])
+        self.assertEqual(echo['body'], 'a=b')
+
+    @data(*VARIANTS)
+    @unpack
+    def test_not_enabled(self, transport, lean):
+        echo = self.make_client(transport=transport, lean=lean).post('/echo', json=BIG).json()
+        self.assertNotIn('content-encoding', echo['headers'])
+
+    @data(*VARIANTS)
+    @unpack
+    def test_response_compression(self, transport, lean):
+        client = self.make_client(transport=transport, lean=lean)
+        self.assertIn('gzip', client.get('/echo').json()['headers']['accept-encoding'])
+        self.assertEqual(client.get('/gzip').json(), {'compressed': True})
+
+    @data(*VARIANTS)
+    @unpack
+    def test_response_compression_disabled(self, transport, lean):
+        echo = self.make_client(transport=transport, lean=lean, response_compression=False).get('/echo').json()
+        self.assertEqual(echo['headers']['accept-encoding'], 'identity')
+
+    def test_streamed_response(self):
+        response = self.make_client().get('/gzip', stream=True)
+        self.assertEqual(json.loads(b''.join(response.iter_content(4))), {'compressed': True})
@@ -0,0 +1,173 @@
+"""
+Adaptive concurrency limiting tests.
+"""
+import threading
+
+import requests
+import requests_mock
+from django.test import override_settings
+from pybreaker import CircuitBreakerError
+
+from oauth2_client.concurrency import (
+    AIMDLimit, ConcurrencyLimiter, ConcurrencyLimitExceeded, concurrency_limiter, service_key
+)
+from oauth2_client.deadline import DeadlineExceeded
+from oauth2_client.utils.breaker import CircuitOpenError
+from test_case import ClientTestCase, StandaloneAppTestCase
+from .test_compat import Mock, patch
+
+
+class AIMDLimitTest(StandaloneAppTestCase):
+    """
+    Limit growing while used and fast, shrinking on drops and slow requests.
+    """
+
+    def test_increase(self):
+        limit = AIMDLimit(initial=10, minimum=1, maximum=12)
+        limit.update(0.01, in_flight=5, dropped=False)
+        self.assertEqual(11, limit.limit)
+        for _ in range(5):
+            limit.update(0.01, in_flight=10, dropped=False)
+        self.assertEqual(12, limit.limit)
+
+    def test_not_used(self):
+        limit = AIMDLimit(initial=10, minimum=1, maximum=100)
+        limit.update(0.01, in_flight=4, dropped=False)
+        self.assertEqual(10, limit.limit)
+
+    def test_decrease(self):
+        limit = AIMDLimit(initial=10, minimum=8, maximum=100)
+        limit.update(0.01, in_flight=10, dropped=True)
+        self.assertEqual(9, limit.limit)
+        limit.update(None, in_flight=10, dropped=True)
+        limit.update(None, in_flight=10, dropped=True)
+        self.assertEqual(8, limit.limit)
+
+    def test_latency(self):
+        limit = AIMDLimit(initial=10, minimum=1, maximum=10)
+        for _ in range(AIMDLimit.WARMUP_SAMPLES):
+            limit.update(0.01, in_flight=10, dropped=False)
+        self.assertAlmostEqual(0.01, limit.latency)
+        limit.update(0.015, in_flight=10, dropped=False)
+        self.assertEqual(10, limit.limit)
+        limit.update(0.05, in_flight=10, dropped=False)
+        self.assertEqual(9, limit.limit)
+
+
+class ConcurrencyLimiterTest(StandaloneAppTestCase):
+    """
+    Slots of the requests in flight.
+    """
+
+    def test_reject(self):
+        limiter = ConcurrencyLimiter('https://some-api.com', initial=2, minimum=1, maximum=2, max_wait=0)
+        slots = [limiter.acquire(), limiter.acquire()]
+        with self.assertRaises(ConcurrencyLimitExceeded):
+            limiter.acquire()
+        limiter.release(slots.pop())
+        limiter.acquire()
+        self.assertEqual({'limit': 2, 'in_flight': 2, 'rejected': 1}, {
+            name: value for name, value in limiter.stats().items() if name != 'latency'
+        })
+
+    def test_wait(self):
+        limiter = ConcurrencyLimiter('https://some-api.com', initial=1, minimum=1, maximum=1, max_wait=5)
+        slot = limiter.acquire()
+        acquired = threading.Event()
+
+        def acquire():
+            limiter.acquire()
+            acquired.set()
+
+        thread = threading.Thread(target=acquire)
+        thread.start()
+        self.assertFalse(acquired.wait(0.05))
+        limiter.release(slot)
+        self.assertTrue(acquired.wait(5))
+        thread.join()
+
+    def test_wait_timeout(self):
+        limiter = ConcurrencyLimiter('https://some-api.com', initial=1, minimum=1, maximum=1, max_wait=0.01)
+        limiter.acquire()
+        with self.assertRaises(ConcurrencyLimitExceeded):
+            limiter.acquire()
+
+    def test_service_key(self):
+        self.assertEqual('https://some-api.com:8443', service_key('https://Some-API.com:8443/api/'))
+
+
+@override_settings(OAUTH2_CLIENT_ADAPTIVE_CONCURRENCY=True, OAUTH2_CLIENT_CONCURRENCY_INITIAL_LIMIT=10)
+class ClientConcurrencyTest(ClientTestCase):
+    """
+    Requests of the clients within the limit of their service host.
+    """
+
+    def test_shared_per_host(self):
+        client = self.make_client()
+        self.assertIs(client.concurrency_limiter, self.make_client('other', 'other').concurrency_limiter)
+        self.assertIsNot(
+            client.concurrency_limiter,
+            self.make_client('third', 'third', service_host='https://other-api.com').concurrency_limiter
+        )
+
+    @override_settings(OAUTH2_CLIENT_ADAPTIVE_CONCURRENCY=False)
+    def test_disabled(self):
+        self.assertIsNone(concurrency_limiter('https://some-api.com'))
+        self.assertIsNone(self.make_client().concurrency_limiter)
+
+    def test_outcomes(self):
+        client = self.make_client()
+        limiter = client.concurrency_limiter
+        with patch.object(client, 'protected_request', return_value=Mock(status_code=503)):
+            client.get('/api/hello')
+        self.assertEqual(9, limiter.limit)
+        with patch.object(client, 'protected_request', side_effect=requests.ConnectionError):
+            with self.assertRaises(requests.ConnectionError):
+                client.get('/api/hello')
+        self.assertEqual(8, limiter.limit)
+        self.assertEqual(0, limiter.stats()['in_flight'])
+
+    def test_not_sent(self):
+        """
+        Ensure requests rejected by the breaker or abandoned for the deadline don't lower the limit.
+        """
+        client = self.make_client()
+        limiter = client.concurrency_limiter
+        for error in (CircuitOpenError(), DeadlineExceeded(1)):
+            with patch.object(client, 'protected_request', side_effect=error):
+                with self.assertRaises(type(error)):
+                    client.get('/api/hello')
+        self.assertEqual(10, limiter.limit)
+        self.assertEqual(0, limiter.stats()['in_flight'])
+
+    @requests_mock.Mocker()
+    def test_tripping_failure(self, mock_response):
+        """
+        Ensure the timeout opening the circuit lowers the limit, the requests rejected after it don't.
+        """
+        client = self.make_client(retries=0)
+        limiter = client.concurrency_limiter
+        mock_response.get('https://some-api.com/api/hello', exc=requests.ReadTimeout)
+        with self.assertRaises(CircuitBreakerError):
+            client.get('/api/hello')
+        self.assertEqual(9, limiter.limit)
+        with self.assertRaises(CircuitOpenError):
+            client.get('/api/hello')
+        self.assertEqual(9, limiter.limit)
+        self.assertEqual(1, mock_response.call_count)
+        self.assertEqual(0, limiter.stats()['in_flight'])
+
+    def test_rejected(self):
+        """
+        Ensure rejected requests don't reach the breaker.
+        """
+        from oauth2_client.client import request_breaker
+
+        client = self.make_client()
+        limiter = client.concurrency_limiter
+        limiter.in_flight = limiter.limit
+        with patch.object(client, 'protected_request') as protected_request:
+            with self.assertRaises(ConcurrencyLimitExceeded):
+                client.get('/api/hello')
+        protected_request.assert_not_called()
+        self.assertEqual('closed', request_breaker.current_state)
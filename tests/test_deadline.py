@@ -0,0 +1,138 @@
+"""
+Deadline propagation tests.
+"""
+import time
+
+import requests
+import requests_mock
+from ddt import data, ddt
+from pybreaker import CircuitBreakerError
+
+from oauth2_client.deadline import Deadline, DeadlineExceeded, bounded_wait, current_deadline, timeout_for
+from oauth2_client.models import Application
+from test_case import ClientTestCase, StandaloneAppTestCase
+from .http_server import TestServer
+from .test_client import JWT_INVALID_RESP
+from .test_compat import patch
+
+
+class DeadlineTest(StandaloneAppTestCase):
+    """
+    Timeouts and waits bounded by the time left.
+    """
+
+    def test_timeout(self):
+        deadline = Deadline(10)
+        self.assertAlmostEqual(10, deadline.timeout(), delta=0.1)
+        self.assertEqual(3, deadline.timeout(3))
+        self.assertAlmostEqual(10, deadline.timeout(30), delta=0.1)
+        connect, read = deadline.timeout((3, None))
+        self.assertEqual(3, connect)
+        self.assertAlmostEqual(10, read, delta=0.1)
+
+    def test_expired(self):
+        deadline = Deadline(0)
+        with self.assertRaises(DeadlineExceeded) as raised:
+            deadline.timeout(3)
+        self.assertIsInstance(raised.exception, requests.Timeout)
+
+    def test_current(self):
+        self.assertIsNone(current_deadline())
+        self.assertEqual(5, timeout_for(5))
+        self.assertEqual(5, bounded_wait(5))
+        with Deadline(1) as outer:
+            self.assertIs(outer, current_deadline())
+            self.assertLessEqual(timeout_for(5), 1)
+            self.assertLessEqual(bounded_wait(5), 1)
+            with Deadline(10):
+                # never extends the enclosing deadline
+                self.assertIs(outer, current_deadline())
+            with Deadline(0.5) as inner:
+                self.assertIs(inner, current_deadline())
+            self.assertIs(outer, current_deadline())
+        self.assertIsNone(current_deadline())
+
+    def test_bounded_wait_expired(self):
+        with Deadline(0):
+            self.assertEqual(0, bounded_wait(5))
+
+
+@ddt
+class ClientDeadlineTest(ClientTestCase):
+    """
+    Time budget of the client calls.
+    """
+    insecure_transport = True
+
+    @classmethod
+    def setUpClass(cls):
+        super(ClientDeadlineTest, cls).setUpClass()
+        cls.server = TestServer()
+        cls.server.start()
+        cls.SERVICE_HOST = cls.server.url
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.stop()
+        super(ClientDeadlineTest, cls).tearDownClass()
+
+    @requests_mock.Mocker()
+    def test_timeout_from_budget(self, mock_response):
+        client = self.make_client(service_host='https://some-api.com')
+        mock_response.get('https://some-api.com/api/hello', json={})
+        client.get('/api/hello', timeout_budget=10)
+        connect, read = mock_response.last_request.timeout
+        self.assertEqual(5, connect)
+        self.assertAlmostEqual(10, read, delta=0.1)
+        client.get('/api/hello', timeout_budget=5, timeout=2)
+        self.assertEqual(2, mock_response.last_request.timeout)
+        client.get('/api/hello', timeout_budget=5, timeout=None)
+        self.assertAlmostEqual(5, mock_response.last_request.timeout, delta=0.1)
+
+    @data('requests', 'urllib3')
+    def test_exceeded(self, transport):
+        """
+        Ensure running out of the budget doesn't open the circuit.
+        """
+        from oauth2_client.client import request_breaker
+
+        client = self.make_client(transport=transport)
+        started = time.time()
+        with self.assertRaises(DeadlineExceeded):
+            client.get('/slow', timeout_budget=0.1)
+        self.assertLess(time.time() - started, 0.4)
+        self.assertEqual('closed', request_breaker.current_state)
+        self.assertEqual(200, client.get('/echo').status_code)
+
+    def test_service_timeout(self):
+        """
+        Ensure a timeout shorter than the budget is a failure of the service.
+        """
+        from oauth2_client.client import request_breaker
+
+        with self.assertRaises(CircuitBreakerError):
+            self.make_client().get('/slow', timeout_budget=5, timeout=0.1)
+        self.assertEqual('open', request_breaker.current_state)
+
+    @patch('oauth2_client.client.fetch_and_store_token')
+    @requests_mock.Mocker()
+    def test_budget_spent_renewing_token(self, mock_fetch_token, mock_response):
+        app = self.make_app(service_host='https://some-api.com', authorization_grant_type=Application.GRANT_JWT_BEARER)
+        client = self.client_for(app)
+        mock_fetch_token.side_effect = lambda app: time.sleep(0.2) or client.app.accesstoken_set.get()
+        mock_response.get('https://some-api.com/api/hello', [JWT_INVALID_RESP, {'status_code': 200}])
+        with self.assertRaises(DeadlineExceeded):
+            client.get('/api/hello', timeout_budget=0.1)
+        self.assertEqual(1, mock_response.call_count)
+
+    @patch('oauth2_client.client.fetch_token', side_effect=KeyError('access_token'))
+    def test_no_fetch_retry_past_deadline(self, fetch_token_mock):
+        from oauth2_client.client import fetch_and_store_token
+
+        app = self.make_client().app
+        started = time.time()
+        with Deadline(1):
+            with self.assertRaises(KeyError):
+                fetch_and_store_token(app)
+        self.assertEqual(1, fetch_token_mock.call_count)
+        self.assertLess(time.time() - started, 1)
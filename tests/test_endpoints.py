@@ -0,0 +1,175 @@
+"""
+Token endpoints failover tests.
+"""
+import os
+
+import requests
+import requests_mock
+
+from oauth2_client import endpoints
+from oauth2_client.deadline import DeadlineExceeded
+from oauth2_client.endpoints import (
+    COOLDOWN, TokenEndpointError, call_token_endpoints, endpoint_stats, observe, ordered, token_uris
+)
+from test_case import StandaloneAppTestCase
+from .test_compat import patch
+
+PRIMARY = 'https://auth-1.some-api.com/o/token/'
+SECONDARY = 'https://auth-2.some-api.com/o/token/'
+TERTIARY = 'https://auth-3.some-api.com/o/token/'
+TOKEN_RESPONSE = {'access_token': 'new-token', 'token_type': 'Bearer', 'expires_in': 3600}
+
+
+class FakeClock(object):
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class EndpointsTest(StandaloneAppTestCase):
+    """
+    Order of the endpoints and failover, with a fake clock.
+    """
+
+    def setUp(self):
+        super(EndpointsTest, self).setUp()
+        endpoints.reset()
+        self.clock = FakeClock()
+        patcher = patch('oauth2_client.endpoints.monotonic', self.clock)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def make_app(self):
+        from .ide_test_compat import ApplicationFactory
+
+        return ApplicationFactory(token_uri=PRIMARY, extra_settings={'token_uris': [PRIMARY, SECONDARY, TERTIARY]})
+
+    def test_token_uris(self):
+        self.assertEqual([PRIMARY, SECONDARY, TERTIARY], token_uris(self.make_app()))
+
+    def test_order(self):
+        uris = [PRIMARY, SECONDARY, TERTIARY]
+        self.assertEqual(uris, ordered(uris))
+        observe(PRIMARY, 0.5, failed=False)
+        observe(SECONDARY, 0.1, failed=False)
+        # never observed endpoints are tried first
+        self.assertEqual([TERTIARY, SECONDARY, PRIMARY], ordered(uris))
+        observe(TERTIARY, 0.2, failed=False)
+        self.assertEqual([SECONDARY, TERTIARY, PRIMARY], ordered(uris))
+
+    def test_unhealthy(self):
+        uris = [PRIMARY, SECONDARY]
+        observe(PRIMARY, 0.1, failed=False)
+        observe(SECONDARY, 0.5, failed=False)
+        observe(PRIMARY, 0.1, failed=True)
+        self.assertEqual([PRIMARY, SECONDARY], ordered(uris))
+        observe(PRIMARY, 0.1, failed=True)
+        self.assertEqual([SECONDARY, PRIMARY], ordered(uris))
+        self.assertFalse(endpoint_stats()[PRIMARY]['healthy'])
+        self.clock.now += COOLDOWN
+        self.assertEqual([PRIMARY, SECONDARY], ordered(uris))
+
+    def test_failing_fast(self):
+        """
+        Ensure an endpoint failing fast isn't taken for the fastest one.
+        """
+        observe(PRIMARY, 0.2, failed=False)
+        observe(SECONDARY, 0.001, failed=True)
+        self.assertEqual([PRIMARY, SECONDARY], ordered([PRIMARY, SECONDARY]))
+        observe(SECONDARY, 0.1, failed=False)
+        observe(SECONDARY, 0.001, failed=True)
+        self.assertEqual(0.1, endpoint_stats()[SECONDARY]['latency'])
+
+    def test_failover(self):
+        calls = []
+
+        def func(uri):
+            calls.append(uri)
+            if uri == PRIMARY:
+                self.clock.now += 5
+                raise requests.ReadTimeout('slow')
+            self.clock.now += 0.1
+            return uri
+
+        app = self.make_app()
+        self.assertEqual(SECONDARY, call_token_endpoints(app, func))
+        self.assertEqual([PRIMARY, SECONDARY], calls)
+        stats = endpoint_stats()
+        self.assertIsNone(stats[PRIMARY]['latency'])
+        self.assertEqual(0.3, stats[PRIMARY]['error_rate'])
+        self.assertEqual(0, stats[SECONDARY]['error_rate'])
+        # the tertiary endpoint is still unknown
+        self.assertEqual(TERTIARY, call_token_endpoints(app, func))
+
+    def test_all_failed(self):
+        errors = [requests.ConnectionError('1'), TokenEndpointError(SECONDARY, 503), requests.ConnectTimeout('3')]
+
+        def func(uri):  # pylint: disable=unused-argument
+            raise errors.pop(0)
+
+        with self.assertRaises(requests.ConnectTimeout):
+            call_token_endpoints(self.make_app(), func)
+
+    def test_no_failover(self):
+        app = self.make_app()
+        for error in (ValueError('unparseable'), DeadlineExceeded(1)):
+            calls = []
+
+            def func(uri, error=error):
+                calls.append(uri)
+                raise error
+
+            with self.assertRaises(type(error)):
+                call_token_endpoints(app, func)
+            self.assertEqual(1, len(calls))
+
+
+class FetcherFailoverTest(StandaloneAppTestCase):
+    """
+    Fetchers requesting tokens from the next endpoint.
+    """
+
+    def setUp(self):
+        super(FetcherFailoverTest, self).setUp()
+        endpoints.reset()
+
+    @requests_mock.Mocker()
+    def test_client_credentials(self, mock_response):
+        from .ide_test_compat import ApplicationFactory
+        from oauth2_client.fetcher import fetch_token
+
+        app = ApplicationFactory(
+            authorization_grant_type='client-credentials', token_uri=PRIMARY, extra_settings={'token_uris': [SECONDARY]}
+        )
+        mock_response.post(PRIMARY, status_code=503, text='unavailable')
+        mock_response.post(SECONDARY, json=TOKEN_RESPONSE)
+        self.assertEqual('new-token', fetch_token(app).token)
+        self.assertEqual(0.3, endpoint_stats()[PRIMARY]['error_rate'])
+
+    @requests_mock.Mocker()
+    def test_jwt(self, mock_response):
+        from .ide_test_compat import ApplicationFactory
+        from oauth2_client.fetcher import fetch_token
+
+        app = ApplicationFactory(
+            authorization_grant_type='jwt-bearer', token_uri=PRIMARY,
+            client_secret=os.path.join(os.path.dirname(os.path.abspath(__file__)), 'resources', 'test.key'),
+            extra_settings={'subject': 'xyz@abx.com.lightning', 'token_uris': [SECONDARY]},
+        )
+        mock_response.post(PRIMARY, exc=requests.ConnectTimeout)
+        mock_response.post(SECONDARY, json=TOKEN_RESPONSE)
+        self.assertEqual('new-token', fetch_token(app).token)
+
+    @requests_mock.Mocker()
+    def test_single_endpoint_server_error(self, mock_response):
+        from .ide_test_compat import ApplicationFactory
+        from oauth2_client.fetcher import fetch_token
+
+        app = ApplicationFactory(authorization_grant_type='client-credentials', token_uri=PRIMARY)
+        mock_response.post(PRIMARY, status_code=502, text='bad gateway')
+        with self.assertRaises(TokenEndpointError):
+            fetch_token(app)
+        self.assertEqual({}, endpoint_stats())
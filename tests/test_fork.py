@@ -0,0 +1,79 @@
+"""
+Fork safety tests.
+"""
+import os
+import unittest
+from datetime import timedelta
+
+from django.utils import timezone
+
+from test_case import StandaloneAppTestCase
+from .test_compat import patch
+
+
+class ForkSafetyTest(StandaloneAppTestCase):
+    """
+    State inherited across a fork is re-created in the child, tokens are kept.
+    """
+
+    def setUp(self):
+        super(ForkSafetyTest, self).setUp()
+        from oauth2_client.cache import token_cache
+        token_cache.invalidate()
+
+    def test_reset_after_fork(self):
+        from .ide_test_compat import AccessTokenFactory, ApplicationFactory, OAuth2Client
+        from oauth2_client.client import request_breaker, reset_after_fork
+
+        client = OAuth2Client(AccessTokenFactory(application=ApplicationFactory()))
+        pool_manager = client.adapters['https://'].poolmanager
+        breaker_lock = request_breaker._lock
+
+        reset_after_fork()
+        self.assertIsNot(client.adapters['https://'].poolmanager, pool_manager)
+        self.assertIsNot(request_breaker._lock, breaker_lock)
+
+    @unittest.skipUnless(hasattr(os, 'register_at_fork'), 'python >= 3.7 required')
+    def test_forked_child(self):
+        """
+        Ensure the handlers run in a real forked child, and the warmed tokens are inherited.
+        """
+        from .ide_test_compat import AccessTokenFactory, ApplicationFactory
+        from oauth2_client.cache import token_cache
+        from oauth2_client.tokens import TokenValue
+
+        app = ApplicationFactory()
+        token_cache.set(app, TokenValue.from_token(AccessTokenFactory(application=app, token='warm_token')))
+        parent_lock = token_cache._lock
+
+        read_end, write_end = os.pipe()
+        pid = os.fork()
+        if pid == 0:
+            # child: report and exit right away, without touching the test database
+            ok = token_cache._lock is not parent_lock and token_cache.get(app.name)[1].access_token == 'warm_token'
+            os.write(write_end, b'ok' if ok else b'fail')
+            os._exit(0)
+        os.close(write_end)
+        os.waitpid(pid, 0)
+        self.assertEqual(os.read(read_end, 10), b'ok')
+        os.close(read_end)
+
+    @patch('oauth2_client.client.connections')
+    @patch('oauth2_client.client.fetch_token')
+    def test_warm_tokens(self, fetch_token_mock, mock_connections):
+        """
+        Ensure tokens of all the Applications are cached, and database connections closed.
+        """
+        from .ide_test_compat import AccessToken, ApplicationFactory
+        from oauth2_client.cache import token_cache
+        from oauth2_client.client import warm_tokens
+
+        app = ApplicationFactory()
+        fetch_token_mock.return_value = AccessToken(
+            application=app, token='warm_token', token_type='Bearer', expires=timezone.now() + timedelta(hours=1)
+        )
+        warm_tokens()
+        cached_app, cached_token = token_cache.get(app.name)
+        self.assertEqual(cached_app, app)
+        self.assertEqual(cached_token.access_token, 'warm_token')
+        mock_connections.close_all.assert_called_once_with()
@@ -0,0 +1,222 @@
+"""
+Hedged requests tests.
+"""
+import io
+import threading
+import time
+
+import requests
+from pybreaker import CircuitBreakerError
+from oauth2_client.deadline import current_deadline
+from oauth2_client.hedge import MIN_SAMPLES, RECOMPUTE_EVERY, Hedger, LatencyWindow, hedger, is_repeatable_request
+from oauth2_client.utils.budget import Budget
+from test_case import ClientTestCase, StandaloneAppTestCase
+from .test_compat import Mock, patch
+
+
+class SlowFirst(object):
+    """
+    Request function whose first call is slow, the others fast. The slow call raises `error` if given.
+    """
+
+    def __init__(self, delay=0.3, error=None):
+        self.delay = delay
+        self.error = error
+        self.calls = 0
+        self.responses = []
+        self.lock = threading.Lock()
+
+    def __call__(self, *args, **kwargs):
+        with self.lock:
+            self.calls += 1
+            first = self.calls == 1
+        if first:
+            time.sleep(self.delay)
+            if self.error is not None:
+                raise self.error
+        response = Mock(status_code=200, first=first)
+        self.responses.append(response)
+        return response
+
+
+class BudgetTest(StandaloneAppTestCase):
+    """
+    Budget of extra requests.
+    """
+
+    def test_withdraw(self):
+        budget = Budget(0.5, max_balance=2)
+        self.assertTrue(budget.withdraw())
+        self.assertTrue(budget.withdraw())
+        self.assertFalse(budget.withdraw())
+        budget.deposit()
+        self.assertFalse(budget.withdraw())
+        budget.deposit()
+        self.assertTrue(budget.withdraw())
+        for _ in range(10):
+            budget.deposit()
+        self.assertEqual(2, budget.balance)
+
+
+class HedgerTest(StandaloneAppTestCase):
+    """
+    Attempts of the hedged requests.
+    """
+
+    def test_percentile(self):
+        window = LatencyWindow(95, size=MIN_SAMPLES)
+        for latency in range(MIN_SAMPLES - 1):
+            window.add(latency)
+        self.assertIsNone(window.value)
+        window.add(MIN_SAMPLES - 1)
+        self.assertEqual(MIN_SAMPLES - 1, window.value)
+        for _ in range(RECOMPUTE_EVERY - 1):
+            window.add(1)
+        self.assertEqual(MIN_SAMPLES - 1, window.value)
+        window.add(1)
+        self.assertEqual(1, window.value)
+
+    def test_repeatable_request(self):
+        self.assertTrue(is_repeatable_request('GET', None, {}))
+        self.assertTrue(is_repeatable_request('get', None, {}))
+        self.assertTrue(is_repeatable_request('PUT', b'{}', {}))
+        self.assertTrue(is_repeatable_request('PUT', None, {'json': {'a': 1}}))
+        self.assertFalse(is_repeatable_request('POST', None, {}))
+        self.assertFalse(is_repeatable_request('PUT', io.BytesIO(b'{}'), {}))
+        self.assertFalse(is_repeatable_request('PUT', (chunk for chunk in [b'{}']), {}))
+        self.assertFalse(is_repeatable_request('PUT', None, {'files': {'file': b'{}'}}))
+        self.assertFalse(is_repeatable_request('GET', None, {'stream': True}))
+
+    def test_not_hedged_while_warming_up(self):
+        hedged = Hedger('app', delay=None, percentile=95, budget=1)
+        func = SlowFirst(delay=0.01)
+        hedged.call(func)
+        self.assertEqual(1, func.calls)
+        self.assertEqual(1, len(hedged.latencies._latencies))  # pylint: disable=protected-access
+
+    def test_fast(self):
+        hedged = Hedger('app', delay=0.5, percentile=95, budget=1)
+        self.assertEqual(200, hedged.call(lambda: Mock(status_code=200)).status_code)
+        self.assertEqual(0, hedged.stats()['hedged'])
+
+    def test_hedge_wins(self):
+        hedged = Hedger('app', delay=0.02, percentile=95, budget=1)
+        func = SlowFirst()
+        started = time.time()
+        response = hedged.call(func)
+        self.assertLess(time.time() - started, 0.25)
+        self.assertFalse(response.first)
+        self.assertEqual({'requests': 1, 'hedged': 1, 'hedge_won': 1, 'over_budget': 0, 'delay': 0.02}, hedged.stats())
+        # the slow response is discarded
+        time.sleep(0.4)
+        func.responses[-1].close.assert_called_once_with()
+        response.close.assert_not_called()
+
+    def test_over_budget(self):
+        hedged = Hedger('app', delay=0.02, percentile=95, budget=0)
+        hedged.budget.balance = 0
+        func = SlowFirst(delay=0.1)
+        self.assertTrue(hedged.call(func).first)
+        self.assertEqual(1, func.calls)
+        self.assertEqual(1, hedged.stats()['over_budget'])
+
+    def test_inline_without_budget(self):
+        """
+        Ensure the request runs in the calling thread when no hedge can be sent.
+        """
+        hedged = Hedger('app', delay=0.02, percentile=95, budget=0)
+        hedged.budget.balance = 0
+        threads = []
+        hedged.call(lambda: threads.append(threading.current_thread()) or Mock(status_code=200))
+        self.assertEqual([threading.current_thread()], threads)
+        self.assertEqual(0, hedged.stats()['over_budget'])
+
+    def test_all_failed(self):
+        hedged = Hedger('app', delay=0.01, percentile=95, budget=1)
+        errors = [ValueError('first'), ValueError('second')]
+
+        def func():
+            error = errors.pop(0)
+            time.sleep(0.05)
+            raise error
+
+        with self.assertRaises(ValueError) as raised:
+            hedged.call(func)
+        self.assertEqual('first', str(raised.exception))
+
+
+class ClientHedgeTest(ClientTestCase):
+    """
+    Hedged requests of the clients.
+    """
+
+    def test_configuration(self):
+        self.assertIsNone(self.make_client().hedger)
+        client = self.make_client('other', 'other', hedge=True, hedge_delay=0.1)
+        self.assertEqual((0.1, 95, 0.05), client.hedger.config)
+        self.assertIs(client.hedger, hedger(client.app))
+
+    def test_hedged(self):
+        client = self.make_client(hedge=True, hedge_delay=0.02)
+        func = SlowFirst()
+        with patch.object(client, 'limited_request', side_effect=func):
+            self.assertFalse(client.get('/api/hello').first)
+        self.assertEqual(2, func.calls)
+
+    def test_not_idempotent(self):
+        client = self.make_client(hedge=True, hedge_delay=0.02)
+        func = SlowFirst(delay=0.1)
+        with patch.object(client, 'limited_request', side_effect=func):
+            self.assertTrue(client.post('/api/hello', data='{}').first)
+        self.assertEqual(1, func.calls)
+
+    def test_file_body(self):
+        """
+        Ensure a PUT whose body is read from a file is sent once, the hedge would send it empty.
+        """
+        client = self.make_client(hedge=True, hedge_delay=0.02)
+        func = SlowFirst(delay=0.1)
+        with patch.object(client, 'limited_request', side_effect=func):
+            self.assertTrue(client.put('/api/hello', data=io.BytesIO(b'{}')).first)
+        self.assertEqual(1, func.calls)
+
+    def test_deadline(self):
+        """
+        Ensure the attempts run within the deadline of the caller.
+        """
+        client = self.make_client(hedge=True, hedge_delay=0.5)
+        deadlines = []
+
+        def request(*args, **kwargs):
+            deadlines.append(current_deadline())
+            return Mock(status_code=200)
+
+        with patch.object(client, 'limited_request', side_effect=request):
+            client.get('/api/hello', timeout_budget=5)
+        self.assertEqual(5, deadlines[0].budget)
+
+    def test_loser_failure(self):
+        """
+        Ensure the failure of the attempt which lost doesn't open the circuit.
+        """
+        from oauth2_client.client import request_breaker
+
+        client = self.make_client(hedge=True, hedge_delay=0.02)
+        func = SlowFirst(delay=0.1, error=requests.ReadTimeout())
+        with patch.object(client, 'retried_request', side_effect=func):
+            self.assertFalse(client.get('/api/hello').first)
+            time.sleep(0.2)
+        self.assertEqual(2, func.calls)
+        self.assertEqual('closed', request_breaker.current_state)
+
+    def test_all_attempts_failed(self):
+        """
+        Ensure the failure of the last attempt opens the circuit.
+        """
+        from oauth2_client.client import request_breaker
+
+        client = self.make_client(hedge=True, hedge_delay=0.02)
+        with patch.object(client, 'retried_request', side_effect=requests.ConnectionError):
+            with self.assertRaises(CircuitBreakerError):
+                client.get('/api/hello')
+        self.assertEqual('open', request_breaker.current_state)
@@ -0,0 +1,295 @@
+"""
+Response cache tests.
+"""
+import requests
+import requests_mock
+from django.test import override_settings
+from pybreaker import CircuitBreakerError
+from requests.structures import CaseInsensitiveDict
+
+from oauth2_client.http_cache import CachedResponse, DjangoCacheStorage, MemoryStorage, response_cache
+from test_case import ClientTestCase, StandaloneAppTestCase
+from .http_server import TestServer
+
+API_URL = 'https://some-api.com/api/license/1/'
+
+
+def make_response(headers, content=b'{"a": 1}', status_code=200):
+    response = requests.Response()
+    response.status_code = status_code
+    response.headers = CaseInsensitiveDict(headers)
+    response._content = content  # pylint: disable=protected-access
+    response.url = API_URL
+    return response
+
+
+class CachedResponseTest(StandaloneAppTestCase):
+    """
+    What is stored, and for how long.
+    """
+
+    def test_max_age(self):
+        entry = CachedResponse.from_response(make_response({'Cache-Control': 'max-age=60'}), {}, now=1000)
+        self.assertTrue(entry.is_fresh(now=1059))
+        self.assertFalse(entry.is_fresh(now=1061))
+        self.assertEqual(entry.to_response().json(), {'a': 1})
+
+    def test_age(self):
+        entry = CachedResponse.from_response(make_response({'Cache-Control': 'max-age=60', 'Age': '50'}), {}, now=1000)
+        self.assertFalse(entry.is_fresh(now=1011))
+
+    def test_expires(self):
+        entry = CachedResponse.from_response(make_response({
+            'Date': 'Wed, 21 Oct 2015 07:28:00 GMT', 'Expires': 'Wed, 21 Oct 2015 07:29:00 GMT',
+        }), {})
+        self.assertEqual(entry.max_age, 60)
+
+    def test_validators(self):
+        entry = CachedResponse.from_response(make_response({
+            'ETag': '"v1"', 'Last-Modified': 'Wed, 21 Oct 2015 07:28:00 GMT',
+        }), {})
+        self.assertFalse(entry.is_fresh())
+        self.assertEqual(entry.validators(), {
+            'If-None-Match': '"v1"', 'If-Modified-Since': 'Wed, 21 Oct 2015 07:28:00 GMT',
+        })
+
+    def test_stale_if_error(self):
+        entry = CachedResponse.from_response(
+            make_response({'Cache-Control': 'max-age=10, stale-if-error=20'}), {}, now=1000
+        )
+        self.assertTrue(entry.is_usable_on_error(now=1029))
+        self.assertFalse(entry.is_usable_on_error(now=1031))
+        with override_settings(OAUTH2_CLIENT_RESPONSE_CACHE_STALE_IF_ERROR=5):
+            entry = CachedResponse.from_response(make_response({'Cache-Control': 'max-age=10'}), {})
+            self.assertEqual(entry.stale_if_error, 5)
+
+    def test_not_stored(self):
+        for headers, status_code in [
+            ({'Cache-Control': 'max-age=60'}, 404),
+            ({'Cache-Control': 'no-store, max-age=60'}, 200),
+            ({'Cache-Control': 'max-age=60', 'Vary': '*'}, 200),
+            ({'Content-Type': 'application/json'}, 200),
+        ]:
+            self.assertIsNone(CachedResponse.from_response(make_response(headers, status_code=status_code), {}))
+        with override_settings(OAUTH2_CLIENT_RESPONSE_CACHE_MAX_ENTRY_BYTES=4):
+            self.assertIsNone(CachedResponse.from_response(make_response({'Cache-Control': 'max-age=60'}), {}))
+
+    def test_vary(self):
+        entry = CachedResponse.from_response(
+            make_response({'Cache-Control': 'max-age=60', 'Vary': 'Accept'}),
+            CaseInsensitiveDict({'Accept': 'application/json'}),
+        )
+        self.assertTrue(entry.matches(CaseInsensitiveDict({'accept': 'application/json'})))
+        self.assertFalse(entry.matches(CaseInsensitiveDict({'Accept': 'text/html'})))
+
+
+class MemoryStorageTest(StandaloneAppTestCase):
+    """
+    LRU eviction by number of entries and size.
+    """
+
+    def entry(self, content=b'x'):
+        return CachedResponse.from_response(make_response({'Cache-Control': 'max-age=60'}, content), {})
+
+    def test_max_entries(self):
+        storage = MemoryStorage(max_entries=2, max_bytes=10 ** 6)
+        storage.set('a', self.entry())
+        storage.set('b', self.entry())
+        storage.get('a')
+        storage.set('c', self.entry())
+        self.assertIsNone(storage.get('b'))
+        self.assertIsNotNone(storage.get('a'))
+        self.assertEqual(storage.stats()['entries'], 2)
+
+    def test_max_bytes(self):
+        size = self.entry(b'x' * 100).size
+        storage = MemoryStorage(max_entries=100, max_bytes=size * 2)
+        for key in 'abc':
+            storage.set(key, self.entry(b'x' * 100))
+        self.assertIsNone(storage.get('a'))
+        self.assertEqual(storage.stats(), {'entries': 2, 'bytes': size * 2})
+        storage.delete('b')
+        self.assertEqual(storage.stats(), {'entries': 1, 'bytes': size})
+
+
+@override_settings(OAUTH2_CLIENT_RESPONSE_CACHE='memory')
+class ClientCacheTest(ClientTestCase):
+    """
+    Requests of the client served from the cache.
+    """
+
+    @requests_mock.Mocker()
+    def test_fresh(self, mock_response):
+        mock_response.get(API_URL, json={'a': 1}, headers={'Cache-Control': 'max-age=60'})
+        client = self.make_client()
+        self.assertEqual(client.get('/api/license/1/').json(), {'a': 1})
+        response = client.get('/api/license/1/')
+        self.assertEqual(response.json(), {'a': 1})
+        self.assertEqual(response.headers['Cache-Control'], 'max-age=60')
+        self.assertEqual(mock_response.call_count, 1)
+        stats = response_cache().stats()
+        self.assertEqual((stats['hits'], stats['misses']), (1, 1))
+
+    @requests_mock.Mocker()
+    def test_params(self, mock_response):
+        mock_response.get(API_URL, json={'a': 1}, headers={'Cache-Control': 'max-age=60'})
+        client = self.make_client()
+        client.get('/api/license/1/', params={'page': 1})
+        client.get('/api/license/1/', params={'page': 2})
+        client.get('/api/license/1/', params={'page': 1})
+        self.assertEqual(mock_response.call_count, 2)
+
+    @requests_mock.Mocker()
+    def test_revalidated(self, mock_response):
+        mock_response.get(API_URL, [
+            {'json': {'a': 1}, 'headers': {'ETag': '"v1"'}},
+            {'status_code': 304, 'headers': {'ETag': '"v1"', 'Cache-Control': 'max-age=60'}},
+        ])
+        client = self.make_client()
+        client.get('/api/license/1/')
+        response = client.get('/api/license/1/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), {'a': 1})
+        self.assertEqual(mock_response.last_request.headers['If-None-Match'], '"v1"')
+        # fresh after the revalidation
+        client.get('/api/license/1/')
+        self.assertEqual(mock_response.call_count, 2)
+        self.assertEqual(response_cache().stats()['revalidated'], 1)
+
+    @requests_mock.Mocker()
+    def test_modified(self, mock_response):
+        mock_response.get(API_URL, [
+            {'json': {'a': 1}, 'headers': {'ETag': '"v1"'}},
+            {'json': {'a': 2}, 'headers': {'ETag': '"v2"'}},
+            {'status_code': 304},
+        ])
+        client = self.make_client()
+        client.get('/api/license/1/')
+        self.assertEqual(client.get('/api/license/1/').json(), {'a': 2})
+        self.assertEqual(client.get('/api/license/1/').json(), {'a': 2})
+        self.assertEqual(mock_response.last_request.headers['If-None-Match'], '"v2"')
+
+    @override_settings(OAUTH2_CLIENT_RETRIES=0)
+    @requests_mock.Mocker()
+    def test_stale_if_error(self, mock_response):
+        mock_response.get(API_URL, [
+            {'json': {'a': 1}, 'headers': {'Cache-Control': 'max-age=0, stale-if-error=60'}},
+            {'exc': requests.ConnectionError},
+            {'status_code': 503},
+        ])
+        client = self.make_client()
+        client.get('/api/license/1/')
+        self.assertEqual(client.get('/api/license/1/').json(), {'a': 1})
+        # the circuit is open now
+        self.assertEqual(client.get('/api/license/1/').json(), {'a': 1})
+        from oauth2_client.client import request_breaker
+        request_breaker.close()
+        self.assertEqual(client.get('/api/license/1/').json(), {'a': 1})
+        self.assertEqual(response_cache().stats()['stale_if_error'], 3)
+
+    @requests_mock.Mocker()
+    def test_error_without_stale_if_error(self, mock_response):
+        mock_response.get(API_URL, [
+            {'json': {'a': 1}, 'headers': {'ETag': '"v1"'}},
+            {'exc': requests.ConnectionError},
+        ])
+        client = self.make_client()
+        client.get('/api/license/1/')
+        with self.assertRaises(CircuitBreakerError):
+            client.get('/api/license/1/')
+
+    @requests_mock.Mocker()
+    def test_vary(self, mock_response):
+        mock_response.get(API_URL, json={'a': 1}, headers={'Cache-Control': 'max-age=60', 'Vary': 'Accept'})
+        client = self.make_client()
+        client.get('/api/license/1/', headers={'Accept': 'application/json'})
+        client.get('/api/license/1/', headers={'Accept': 'application/json'})
+        client.get('/api/license/1/', headers={'Accept': 'text/html'})
+        self.assertEqual(mock_response.call_count, 2)
+
+    @requests_mock.Mocker()
+    def test_invalidated(self, mock_response):
+        mock_response.get(API_URL, json={'a': 1}, headers={'Cache-Control': 'max-age=60'})
+        mock_response.put(API_URL, json={})
+        client = self.make_client()
+        client.get('/api/license/1/')
+        client.put('/api/license/1/', json={'a': 2})
+        client.get('/api/license/1/')
+        self.assertEqual(mock_response.call_count, 3)
+
+    @requests_mock.Mocker()
+    def test_not_cached(self, mock_response):
+        """
+        Ensure streamed and conditional requests, and the apps without cache, bypass the cache.
+        """
+        mock_response.get(API_URL, json={'a': 1}, headers={'Cache-Control': 'max-age=60'})
+        client = self.make_client()
+        client.get('/api/license/1/', stream=True)
+        client.get('/api/license/1/', headers={'If-None-Match': '"v1"'})
+        self.assertEqual(mock_response.call_count, 2)
+        client = self.make_client(name='not_cached', token='other', response_cache=False)
+        client.get('/api/license/1/')
+        client.get('/api/license/1/')
+        self.assertEqual(mock_response.call_count, 4)
+
+    @requests_mock.Mocker()
+    @override_settings(OAUTH2_CLIENT_RESPONSE_CACHE='django')
+    def test_django_storage(self, mock_response):
+        response_cache().clear()
+        mock_response.get(API_URL, json={'a': 1}, headers={'Cache-Control': 'max-age=60'})
+        client = self.make_client()
+        client.get('/api/license/1/')
+        self.assertEqual(client.get('/api/license/1/').json(), {'a': 1})
+        self.assertEqual(mock_response.call_count, 1)
+        self.assertEqual(response_cache().stats(), {'hits': 1, 'misses': 1, 'revalidated': 0, 'stale_if_error': 0})
+
+
+class DjangoCacheStorageTest(StandaloneAppTestCase):
+    """
+    Responses stored in a Django cache.
+    """
+
+    def test_timeout(self):
+        storage = DjangoCacheStorage('default')
+        entry = CachedResponse.from_response(make_response({'Cache-Control': 'max-age=3600, stale-if-error=600'}), {})
+        self.assertAlmostEqual(4200, storage.timeout(entry), delta=1)
+        entry = CachedResponse.from_response(make_response({'Cache-Control': 'max-age=10', 'ETag': '"1"'}), {})
+        self.assertEqual(storage.cache.default_timeout, storage.timeout(entry))
+
+    def test_clear(self):
+        """
+        Ensure clearing the response cache leaves the other entries of the Django cache alone.
+        """
+        storage = DjangoCacheStorage('default')
+        storage.cache.set('session', 'kept')
+        storage.clear()
+        self.assertEqual('kept', storage.cache.get('session'))
+
+
+@override_settings(OAUTH2_CLIENT_RESPONSE_CACHE='memory')
+class Urllib3CacheTest(ClientTestCase):
+    """
+    The urllib3 transport gets its cached responses as LightResponse objects.
+    """
+    insecure_transport = True
+
+    @classmethod
+    def setUpClass(cls):
+        super(Urllib3CacheTest, cls).setUpClass()
+        cls.server = TestServer()
+        cls.server.start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.stop()
+        super(Urllib3CacheTest, cls).tearDownClass()
+
+    def test_revalidated(self):
+        from oauth2_client.transport import LightResponse
+
+        client = self.make_client(service_host=self.server.url, transport='urllib3')
+        self.assertEqual(client.get('/etag').json(), {'version': 1})
+        response = client.get('/etag')
+        self.assertIsInstance(response, LightResponse)
+        self.assertEqual((response.status_code, response.json()), (200, {'version': 1}))
+        self.assertEqual(response_cache().stats()['revalidated'], 1)
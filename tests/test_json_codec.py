@@ -0,0 +1,106 @@
+"""
+JSON codec and client JSON helpers tests.
+"""
+import unittest
+
+import requests
+import requests_mock
+from ddt import data, ddt
+from django.test import override_settings
+
+from oauth2_client.utils.json_codec import CODECS, json_codec, load_codec
+from test_case import ClientTestCase
+
+API_URL = 'https://some-api.com/api/hello'
+
+try:
+    import orjson  # noqa: F401  pylint: disable=unused-import
+    HAS_ORJSON = True
+except ImportError:
+    HAS_ORJSON = False
+
+
+def installed_codecs():
+    names = []
+    for name in CODECS:
+        try:
+            load_codec(name)
+        except ImportError:
+            continue
+        names.append(name)
+    return names
+
+
+@ddt
+class JSONCodecTest(unittest.TestCase):
+    """
+    All the installed codecs encode to and decode from bytes the same way.
+    """
+
+    @data(*installed_codecs())
+    def test_round_trip(self, name):
+        codec = load_codec(name)
+        obj = {'a': [1, 2.5, None, True], 'b': u'é'}
+        encoded = codec.dumps(obj)
+        self.assertIsInstance(encoded, bytes)
+        self.assertEqual(codec.loads(encoded), obj)
+        self.assertEqual(codec.loads(encoded.decode('utf-8')), obj)
+
+    @data(*installed_codecs())
+    def test_invalid(self, name):
+        with self.assertRaises(ValueError):
+            load_codec(name).loads(b'{not json')
+
+    @unittest.skipUnless(HAS_ORJSON, 'orjson not installed')
+    def test_auto(self):
+        with override_settings(OAUTH2_CLIENT_JSON_CODEC='auto'):
+            self.assertEqual(json_codec().name, 'orjson')
+
+    def test_configured(self):
+        with override_settings(OAUTH2_CLIENT_JSON_CODEC='json'):
+            self.assertEqual(json_codec().name, 'json')
+
+    def test_unknown(self):
+        with override_settings(OAUTH2_CLIENT_JSON_CODEC='simplejson'):
+            with self.assertRaises(ValueError):
+                json_codec()
+
+
+class ClientJSONTest(ClientTestCase):
+    """
+    `get_json` and `post_json` helpers of the client.
+    """
+
+    @requests_mock.Mocker()
+    def test_get_json(self, mock_response):
+        mock_response.get(API_URL, json={'hello': 'world'})
+        self.assertEqual(self.make_client().get_json('/api/hello', params={'a': 1}), {'hello': 'world'})
+        self.assertEqual(mock_response.last_request.qs, {'a': ['1']})
+        self.assertEqual(mock_response.last_request.headers['Authorization'], 'Bearer token')
+
+    @requests_mock.Mocker()
+    def test_post_json(self, mock_response):
+        mock_response.post(API_URL, json={'id': 1})
+        result = self.make_client().post_json('/api/hello', {'name': 'x'}, headers={'X-Custom': 'custom'})
+        self.assertEqual(result, {'id': 1})
+        request = mock_response.last_request
+        self.assertEqual(request.json(), {'name': 'x'})
+        self.assertEqual(request.headers['Content-Type'], 'application/json')
+        self.assertEqual(request.headers['X-Custom'], 'custom')
+
+    @requests_mock.Mocker()
+    def test_content_type_kept(self, mock_response):
+        mock_response.post(API_URL, json={})
+        self.make_client().post_json('/api/hello', [], headers={'content-type': 'application/vnd.api+json'})
+        self.assertEqual(mock_response.last_request.headers['Content-Type'], 'application/vnd.api+json')
+
+    @requests_mock.Mocker()
+    def test_empty_response(self, mock_response):
+        mock_response.delete(API_URL, status_code=204)
+        self.assertIsNone(self.make_client().request_json('DELETE', '/api/hello'))
+
+    @requests_mock.Mocker()
+    def test_error(self, mock_response):
+        mock_response.get(API_URL, status_code=404, json={'error': 'not found'})
+        with self.assertRaises(requests.HTTPError):
+            self.make_client().get_json('/api/hello')
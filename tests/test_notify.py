@@ -0,0 +1,131 @@
+"""
+Tests for the local token cache and its cross-process invalidation.
+"""
+import json
+import time
+from datetime import timedelta
+
+from django.db import connection
+from django.test import TransactionTestCase, override_settings
+from django.utils import timezone
+
+from test_case import StandaloneAppTestCase, setup_django
+from .test_compat import patch
+
+
+def valid_token(app, token='valid_token'):
+    """
+    Unsaved, valid token.
+    """
+    from .ide_test_compat import AccessToken
+
+    return AccessToken(
+        application=app, token=token, token_type='Bearer', expires=timezone.now() + timedelta(hours=1)
+    )
+
+
+@override_settings(OAUTH2_CLIENT_LOCAL_TOKEN_CACHE=True)
+class LocalTokenCacheTest(StandaloneAppTestCase):
+    """
+    Local token cache tests.
+    """
+
+    def setUp(self):
+        super(LocalTokenCacheTest, self).setUp()
+        from oauth2_client.cache import token_cache
+        token_cache.invalidate()
+
+    @patch('oauth2_client.client.fetch_token')
+    def test_cached_token_used(self, fetch_token_mock):
+        """
+        Ensure the database is not queried while a valid token is cached.
+        """
+        from .ide_test_compat import ApplicationFactory, get_client
+
+        app = ApplicationFactory()
+        fetch_token_mock.return_value = valid_token(app)
+        get_client(app.name)
+        with self.assertNumQueries(0):
+            self.assertEqual(get_client(app.name).token['access_token'], 'valid_token')
+        fetch_token_mock.assert_called_once_with(app)
+
+    def test_application_save_invalidates(self):
+        """
+        Ensure editing an Application drops the cached tokens.
+        """
+        from .ide_test_compat import ApplicationFactory
+        from oauth2_client.cache import token_cache
+        from oauth2_client.tokens import TokenValue
+
+        app = ApplicationFactory()
+        token_cache.set(app, TokenValue.from_token(valid_token(app)))
+        app.save()
+        self.assertIsNone(token_cache.get(app.name))
+
+    def test_notification_invalidates(self):
+        """
+        Ensure token notifications from other processes drop the token of the Application.
+        """
+        from .ide_test_compat import ApplicationFactory
+        from oauth2_client.cache import token_cache
+        from oauth2_client.tokens import TokenValue
+        from oauth2_client.notify import TokenChangeListener, _process_id
+
+        app = ApplicationFactory()
+        listener = TokenChangeListener('channel', 'default')
+        token_cache.set(app, TokenValue.from_token(valid_token(app)))
+
+        listener.handle(json.dumps({'event': 'token', 'app': app.name, 'sender': _process_id}))
+        self.assertIsNotNone(token_cache.get(app.name))
+        listener.handle(json.dumps({'event': 'token', 'app': app.name, 'sender': 'other'}))
+        self.assertIsNone(token_cache.get(app.name))
+
+    def test_process_id_after_fork(self):
+        """
+        Ensure a forked child doesn't take the token notifications of its parent for its own.
+        """
+        from oauth2_client import notify
+
+        parent_id = notify._process_id  # pylint: disable=protected-access
+        with patch.object(notify, '_process_id', parent_id):
+            notify.reset_process_id()
+            self.assertNotEqual(parent_id, notify._process_id)  # pylint: disable=protected-access
+
+
+@override_settings(OAUTH2_CLIENT_LOCAL_TOKEN_CACHE=True, OAUTH2_CLIENT_NOTIFY_CHANNEL='oauth2_client_test')
+class NotifyRoundTripTest(TransactionTestCase):
+    """
+    Notifications are only delivered on commit, so no transaction wrapping here.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        setup_django()
+        super(NotifyRoundTripTest, cls).setUpClass()
+
+    @patch('oauth2_client.notify.TokenChangeListener.POLL_TIMEOUT_S', 0.1)
+    def test_notification_delivered(self):
+        """
+        Ensure a published notification reaches the listener and invalidates the cache.
+        """
+        from .ide_test_compat import ApplicationFactory
+        from oauth2_client.cache import token_cache
+        from oauth2_client.tokens import TokenValue
+        from oauth2_client.notify import start_listener, stop_listener
+
+        app = ApplicationFactory()
+        listener = start_listener()
+        try:
+            time.sleep(0.5)  # let the listener subscribe
+            token_cache.set(app, TokenValue.from_token(valid_token(app)))
+            # as published by another process
+            with connection.cursor() as cursor:
+                payload = json.dumps({'event': 'token', 'app': app.name, 'sender': 'other'})
+                cursor.execute('SELECT pg_notify(%s, %s)', ['oauth2_client_test', payload])
+            deadline = time.time() + 5
+            while token_cache.get(app.name) and time.time() < deadline:
+                time.sleep(0.05)
+            self.assertIsNone(token_cache.get(app.name))
+        finally:
+            stop_listener()
+            listener.join(1)
@@ -0,0 +1,164 @@
+"""
+Client-side rate limiting tests.
+"""
+import requests_mock
+from ddt import data, ddt, unpack
+from requests.structures import CaseInsensitiveDict
+
+from oauth2_client.ratelimit import RateLimited, TokenBucket, rate_limiter, retry_after
+from test_case import ClientTestCase, StandaloneAppTestCase
+from .test_compat import patch
+
+API_URL = 'https://some-api.com/api/hello'
+
+
+class FakeClock(object):
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class TokenBucketTest(StandaloneAppTestCase):
+    """
+    Token bucket, with a fake clock.
+    """
+
+    def setUp(self):
+        super(TokenBucketTest, self).setUp()
+        self.clock = FakeClock()
+        patcher = patch('oauth2_client.ratelimit.monotonic', self.clock)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_burst(self):
+        bucket = TokenBucket(rate=10, burst=2)
+        self.assertEqual(0, bucket.reserve(0))
+        self.assertEqual(0, bucket.reserve(0))
+        self.assertIsNone(bucket.reserve(0))
+        self.assertAlmostEqual(0.1, bucket.reserve(1))
+        # waiting requests are served in order
+        self.assertAlmostEqual(0.2, bucket.reserve(1))
+
+    def test_refill(self):
+        bucket = TokenBucket(rate=10, burst=2)
+        bucket.reserve(0)
+        bucket.reserve(0)
+        self.clock.now += 0.1
+        self.assertEqual(0, bucket.reserve(0))
+        self.clock.now += 10
+        self.assertEqual(0, bucket.wait_time())
+        self.assertEqual(2, bucket.tokens)
+
+    def test_throttled(self):
+        bucket = TokenBucket(rate=10, burst=10)
+        bucket.throttled(retry_after=5)
+        self.assertEqual(5, bucket.current_rate)
+        self.assertIsNone(bucket.reserve(4.9))
+        self.assertAlmostEqual(5.2, bucket.wait_time())
+        for _ in range(10):
+            bucket.throttled()
+        self.assertEqual(1, bucket.current_rate)
+
+    def test_recovery(self):
+        bucket = TokenBucket(rate=10, burst=10)
+        bucket.throttled()
+        for _ in range(4):
+            bucket.succeeded()
+        self.assertEqual(9, bucket.current_rate)
+        bucket.succeeded()
+        bucket.succeeded()
+        self.assertEqual(10, bucket.current_rate)
+
+
+@ddt
+class RetryAfterTest(StandaloneAppTestCase):
+    """
+    `Retry-After` as a delay or an HTTP date.
+    """
+
+    @data(('120', 120), ('0', 0), ('-5', 0), ('soon', None), ('', None))
+    @unpack
+    def test_delay(self, value, expected):
+        self.assertEqual(expected, retry_after(CaseInsensitiveDict({'Retry-After': value})))
+
+    @patch('oauth2_client.ratelimit.time.time', return_value=1445412480)
+    def test_date(self, _):
+        self.assertEqual(60, retry_after(CaseInsensitiveDict({'Retry-After': 'Wed, 21 Oct 2015 07:29:00 GMT'})))
+
+
+class RateLimiterTest(ClientTestCase):
+    """
+    Limiters configured per Application and used by its clients.
+    """
+
+    def test_configuration(self):
+        app = self.make_app(extra_settings={'rate_limit': 5, 'rate_limit_policy': 'fail', 'rate_limit_max_wait': 3})
+        limiter = rate_limiter(app)
+        self.assertEqual((5, 5, 'fail', 3), limiter.config)
+        self.assertIs(limiter, rate_limiter(app))
+        app.extra_settings['rate_limit_burst'] = 10
+        self.assertIsNot(limiter, rate_limiter(app))
+
+    def test_not_configured(self):
+        self.assertIsNone(self.make_client().rate_limiter)
+
+    def test_unknown_policy(self):
+        with self.assertRaises(ValueError):
+            rate_limiter(self.make_app(extra_settings={'rate_limit': 5, 'rate_limit_policy': 'drop'}))
+
+    @requests_mock.Mocker()
+    def test_fail(self, mock_response):
+        from oauth2_client.client import request_breaker
+
+        mock_response.get(API_URL, json={})
+        client = self.make_client(rate_limit=1, rate_limit_policy='fail')
+        client.get('/api/hello')
+        with self.assertRaises(RateLimited) as raised:
+            client.get('/api/hello')
+        self.assertGreater(raised.exception.wait, 0.9)
+        self.assertEqual(1, mock_response.call_count)
+        self.assertEqual('closed', request_breaker.current_state)
+
+    @patch('oauth2_client.ratelimit.time.sleep')
+    @requests_mock.Mocker()
+    def test_block(self, sleep_mock, mock_response):
+        mock_response.get(API_URL, json={})
+        client = self.make_client(rate_limit=1, rate_limit_policy='fail')
+        client.get('/api/hello')
+        client.get('/api/hello', rate_limit='block')
+        self.assertEqual(2, mock_response.call_count)
+        self.assertAlmostEqual(1, sleep_mock.call_args[0][0], delta=0.1)
+
+    @patch('oauth2_client.ratelimit.time.sleep')
+    @requests_mock.Mocker()
+    def test_max_wait(self, sleep_mock, mock_response):
+        mock_response.get(API_URL, json={})
+        client = self.make_client(rate_limit=1, rate_limit_max_wait=0.5)
+        client.get('/api/hello')
+        with self.assertRaises(RateLimited):
+            client.get('/api/hello')
+        sleep_mock.assert_not_called()
+
+    @requests_mock.Mocker()
+    def test_retry_after(self, mock_response):
+        mock_response.get(API_URL, status_code=429, headers={'Retry-After': '30'})
+        client = self.make_client(rate_limit=100, rate_limit_policy='fail')
+        self.assertEqual(429, client.get('/api/hello').status_code)
+        self.assertEqual(50, client.rate_limiter.bucket.current_rate)
+        with self.assertRaises(RateLimited) as raised:
+            client.get('/api/hello')
+        self.assertGreater(raised.exception.wait, 29)
+
+    @requests_mock.Mocker()
+    def test_shared(self, mock_response):
+        """
+        Ensure the clients of an Application share its limit.
+        """
+        mock_response.get(API_URL, json={})
+        app = self.make_app(extra_settings={'rate_limit': 1, 'rate_limit_policy': 'fail'})
+        self.client_for(app, 'one').get('/api/hello')
+        with self.assertRaises(RateLimited):
+            self.client_for(app, 'two').get('/api/hello')
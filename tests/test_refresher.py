@@ -0,0 +1,159 @@
+"""
+Token refresher tests.
+"""
+import threading
+import time
+from datetime import timedelta
+
+from django.db import DatabaseError
+from django.utils import timezone
+
+from oauth2_client.refresher import TokenRefresher
+from oauth2_client.storage import applications_with_token_expiry
+from oauth2_client.utils.date_time import datetime_to_float
+from test_case import StandaloneAppTestCase
+from .test_compat import patch
+
+
+class TokenRefresherTest(StandaloneAppTestCase):
+    """
+    Token refresher tests.
+    """
+
+    def test_schedule(self):
+        """
+        Ensure refreshes are scheduled ahead of expiry, right away for Applications
+        without a token, and not at all for tokens that don't expire.
+        """
+        from .ide_test_compat import AccessTokenFactory, ApplicationFactory
+
+        expires = timezone.now() + timedelta(hours=1)
+        no_token_app = ApplicationFactory(name='no_token')
+        expiring_app = ApplicationFactory(name='expiring')
+        AccessTokenFactory(application=expiring_app, token='expiring_token', expires=expires)
+        AccessTokenFactory(application=ApplicationFactory(name='not_expiring'), token='not_expiring_token')
+
+        refresher = TokenRefresher(lead_time=120, jitter=30, concurrency=1, reload_interval=30)
+        now = time.time()
+        refresher.reload()
+
+        self.assertEqual(set(refresher._due), {no_token_app.name, expiring_app.name})
+        self.assertTrue(now <= refresher._due[no_token_app.name][0] <= now + 30)
+        refresh_at = datetime_to_float(expires) - 120
+        self.assertTrue(refresh_at - 30 <= refresher._due[expiring_app.name][0] <= refresh_at)
+
+    def test_reload_if_changed(self):
+        """
+        Ensure the schedule is rebuilt when an Application is deleted.
+        """
+        from .ide_test_compat import ApplicationFactory
+
+        # not the last updated one
+        deleted_app = ApplicationFactory(name='deleted')
+        ApplicationFactory(name='kept')
+        refresher = TokenRefresher(lead_time=120, jitter=0, concurrency=1, reload_interval=30)
+        refresher.reload()
+        with patch.object(refresher, 'reload') as mock_reload:
+            refresher.reload_if_changed()
+            mock_reload.assert_not_called()
+
+        deleted_app.delete()
+        refresher.reload_if_changed()
+        self.assertEqual(set(refresher._due), {'kept'})
+
+    @patch('oauth2_client.client.fetch_and_store_token')
+    def test_run(self, mock_fetch):
+        """
+        Ensure due tokens are refreshed within the concurrency limit, and rescheduled.
+        """
+        from .ide_test_compat import AccessToken, ApplicationFactory
+
+        apps = [ApplicationFactory(name='app_{}'.format(i)) for i in range(3)]
+        refresher = TokenRefresher(lead_time=120, jitter=0, concurrency=2, reload_interval=60)
+        lock = threading.Lock()
+        running = []
+        max_running = []
+
+        def fetch(app):
+            with lock:
+                running.append(app)
+                max_running.append(len(running))
+            time.sleep(0.05)
+            with lock:
+                running.remove(app)
+                if mock_fetch.call_count == len(apps):
+                    refresher.stop()
+            return AccessToken(application=app, token=app.name, expires=timezone.now() + timedelta(hours=1))
+
+        mock_fetch.side_effect = fetch
+        safety_net = threading.Timer(5, refresher.stop)
+        safety_net.start()
+        refresher.run()
+        safety_net.cancel()
+
+        self.assertEqual({call[0][0] for call in mock_fetch.call_args_list}, set(apps))
+        self.assertEqual(max(max_running), 2)
+        self.assertEqual(set(refresher._due), {app.name for app in apps})
+
+    @patch('oauth2_client.client.fetch_and_store_token')
+    def test_reload_failure(self, mock_fetch):
+        """
+        Ensure a failure to load the Applications is retried at the next reload interval.
+        """
+        from .ide_test_compat import AccessToken, ApplicationFactory
+
+        app = ApplicationFactory(name='app')
+        refresher = TokenRefresher(lead_time=120, jitter=0, concurrency=1, reload_interval=0.05)
+
+        def fetch(app):
+            refresher.stop()
+            return AccessToken(application=app, token=app.name, expires=timezone.now() + timedelta(hours=1))
+
+        mock_fetch.side_effect = fetch
+        safety_net = threading.Timer(5, refresher.stop)
+        safety_net.start()
+        # NOTE: closing the connection of the test thread would end the test transaction
+        with patch('oauth2_client.refresher.close_old_connections') as mock_close:
+            with patch('oauth2_client.refresher.log') as mock_log:
+                with patch('oauth2_client.refresher.applications_with_token_expiry') as mock_load:
+                    mock_load.side_effect = [DatabaseError('connection lost'), applications_with_token_expiry()]
+                    refresher.run()
+        safety_net.cancel()
+
+        self.assertEqual(2, mock_load.call_count)
+        self.assertEqual(1, mock_log.exception.call_count)
+        mock_close.assert_called_once_with()
+        mock_fetch.assert_called_once_with(app)
+
+    @patch('oauth2_client.client.fetch_and_store_token')
+    def test_refresh_reloaded_app(self, mock_fetch):
+        """
+        Ensure a refresh finishing reschedules the Application as last loaded: not at all
+        once deleted, right away once updated.
+        """
+        from .ide_test_compat import AccessToken, ApplicationFactory
+
+        deleted_app = ApplicationFactory(name='deleted')
+        updated_app = ApplicationFactory(name='updated')
+        mock_fetch.side_effect = lambda app: AccessToken(
+            application=app, token=app.name, expires=timezone.now() + timedelta(hours=1)
+        )
+        refresher = TokenRefresher(lead_time=120, jitter=0, concurrency=1, reload_interval=30)
+        refresher.reload()
+        loaded_apps = [refresher._apps['deleted'], refresher._apps['updated']]
+
+        deleted_app.delete()
+        updated_app.extra_settings = {'token_read_timeout': 3}
+        updated_app.save()
+        refresher.reload()
+        now = time.time()
+        for app in loaded_apps:
+            # refreshes run in their own threads, closing their database connections
+            thread = threading.Thread(target=refresher.refresh, args=(app,))
+            thread.start()
+            thread.join()
+
+        self.assertEqual({'updated'}, set(refresher._due))
+        due, scheduled_app = refresher._due['updated']
+        self.assertLess(due - now, 1)
+        self.assertEqual({'token_read_timeout': 3}, scheduled_app.extra_settings)
@@ -0,0 +1,148 @@
+"""
+Request retries tests.
+"""
+import requests
+import requests_mock
+from django.test import override_settings
+from pybreaker import CircuitBreakerError
+
+from oauth2_client import retry
+from oauth2_client.deadline import Deadline
+from oauth2_client.retry import RetryPolicy, retry_budget, retry_policy, retry_stats
+from test_case import ClientTestCase, StandaloneAppTestCase
+from .test_compat import Mock, patch
+
+API_URL = 'https://some-api.com/api/hello'
+
+
+class Responses(object):
+    """
+    Request function returning or raising the given outcomes in order.
+    """
+
+    def __init__(self, *outcomes):
+        self.outcomes = list(outcomes)
+        self.calls = 0
+
+    def __call__(self, *args, **kwargs):
+        self.calls += 1
+        outcome = self.outcomes.pop(0)
+        if isinstance(outcome, Exception):
+            raise outcome
+        if isinstance(outcome, tuple):
+            status_code, headers = outcome
+            return Mock(status_code=status_code, headers=headers)
+        return Mock(status_code=outcome, headers={})
+
+
+class RetryPolicyTest(StandaloneAppTestCase):
+    """
+    Attempts of a request, with a fake sleep.
+    """
+
+    def setUp(self):
+        super(RetryPolicyTest, self).setUp()
+        retry.reset()
+        patcher = patch('oauth2_client.retry.time.sleep')
+        self.sleep = patcher.start()
+        self.addCleanup(patcher.stop)
+        self.policy = RetryPolicy(2, (502, 504), backoff=0.1, max_backoff=0.3)
+
+    def test_connection_error(self):
+        func = Responses(requests.ConnectionError('reset'), requests.ConnectTimeout('timeout'), 200)
+        self.assertEqual(200, self.policy.call(func, 'GET', API_URL).status_code)
+        self.assertEqual(3, func.calls)
+        self.assertEqual(2, self.sleep.call_count)
+        self.assertEqual({'retries': 2, 'over_budget': 0}, retry_stats())
+
+    def test_exhausted(self):
+        func = Responses(requests.ConnectionError('1'), requests.ConnectionError('2'), requests.ConnectionError('3'))
+        with self.assertRaises(requests.ConnectionError) as raised:
+            self.policy.call(func, 'GET', API_URL)
+        self.assertEqual('3', str(raised.exception))
+
+    def test_not_retried_errors(self):
+        for error in (requests.exceptions.SSLError('certificate'), requests.ReadTimeout('read'), ValueError('bug')):
+            func = Responses(error, 200)
+            with self.assertRaises(type(error)):
+                self.policy.call(func, 'GET', API_URL)
+            self.assertEqual(1, func.calls)
+
+    def test_status_codes(self):
+        func = Responses(502, 504, 502)
+        self.assertEqual(502, self.policy.call(func, 'GET', API_URL).status_code)
+        self.assertEqual(3, func.calls)
+        func = Responses(503, 200)
+        self.assertEqual(503, self.policy.call(func, 'GET', API_URL).status_code)
+        self.assertEqual(1, func.calls)
+
+    def test_retry_after(self):
+        """
+        Ensure responses asking to retry later are left to the rate limiter.
+        """
+        policy = RetryPolicy(2, (502, 503, 504), backoff=0.1, max_backoff=0.3)
+        func = Responses((503, {'Retry-After': '5'}), 200)
+        self.assertEqual(503, policy.call(func, 'GET', API_URL).status_code)
+        self.assertEqual(1, func.calls)
+        func = Responses(503, 200)
+        self.assertEqual(200, policy.call(func, 'GET', API_URL).status_code)
+        self.assertEqual(2, func.calls)
+
+    def test_budget(self):
+        retry_budget().balance = 1
+        func = Responses(502, 502, 200)
+        self.assertEqual(502, self.policy.call(func, 'GET', API_URL).status_code)
+        self.assertEqual(2, func.calls)
+        self.assertEqual({'retries': 1, 'over_budget': 1}, retry_stats())
+
+    def test_deadline(self):
+        func = Responses(502, 200)
+        with Deadline(0.05):
+            self.assertEqual(502, self.policy.call(func, 'GET', API_URL).status_code)
+        self.assertEqual(1, func.calls)
+
+    def test_delay(self):
+        for attempt, cap in ((1, 0.1), (2, 0.2), (3, 0.3), (4, 0.3)):
+            self.assertEqual(cap, self.policy.delay_cap(attempt))
+            self.assertTrue(0 <= self.policy.delay(attempt) <= cap)
+
+
+class ClientRetryTest(ClientTestCase):
+    """
+    Retries of the client requests, within the circuit breaker.
+    """
+
+    def setUp(self):
+        super(ClientRetryTest, self).setUp()
+        patcher = patch('oauth2_client.retry.time.sleep')
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_configuration(self):
+        from .ide_test_compat import ApplicationFactory
+
+        self.assertIsNone(self.make_client().retry_policy)
+        app = ApplicationFactory(name='codes', extra_settings={'retries': 2, 'retry_status_codes': [503]})
+        policy = retry_policy(app)
+        self.assertEqual((2, frozenset([503])), (policy.retries, policy.status_codes))
+        with override_settings(OAUTH2_CLIENT_RETRIES=3):
+            self.assertEqual(3, retry_policy(ApplicationFactory(name='enabled')).retries)
+            self.assertIsNone(retry_policy(ApplicationFactory(name='disabled', extra_settings={'retries': 0})))
+
+    @requests_mock.Mocker()
+    def test_reset_connection(self, mock_response):
+        """
+        Ensure a retried connection error doesn't open the circuit.
+        """
+        from oauth2_client.client import request_breaker
+
+        mock_response.get(API_URL, [{'exc': requests.ConnectionError('reset')}, {'json': {}}])
+        self.assertEqual(200, self.make_client(retries=2).get('/api/hello').status_code)
+        self.assertEqual('closed', request_breaker.current_state)
+
+    @requests_mock.Mocker()
+    def test_not_idempotent(self, mock_response):
+        mock_response.post(API_URL, [{'exc': requests.ConnectionError('reset')}, {'json': {}}])
+        with self.assertRaises(CircuitBreakerError):
+            self.make_client(retries=2).post('/api/hello', data='{}')
+        self.assertEqual(1, mock_response.call_count)
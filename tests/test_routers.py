@@ -0,0 +1,89 @@
+"""
+Tests for read replica routing of tokens.
+"""
+from datetime import timedelta
+
+from django.test import override_settings
+from django.utils import timezone
+
+from oauth2_client.routers import TokenRouter
+from test_case import StandaloneAppTestCase
+from .test_compat import patch
+
+
+@override_settings(OAUTH2_CLIENT_READ_DATABASE='replica', OAUTH2_CLIENT_WRITE_DATABASE='default')
+class TokenRouterTest(StandaloneAppTestCase):
+    """
+    Ensure `oauth2_client` models are routed as configured and other models are left alone.
+    """
+
+    def test_routing(self):
+        from .ide_test_compat import AccessToken, Application, TestApplication
+
+        router = TokenRouter()
+        for model in (AccessToken, Application):
+            self.assertEqual(router.db_for_read(model), 'replica')
+            self.assertEqual(router.db_for_write(model), 'default')
+        self.assertIsNone(router.db_for_read(TestApplication))
+        self.assertIsNone(router.db_for_write(TestApplication))
+
+    @override_settings(OAUTH2_CLIENT_UNLOGGED_TOKEN_TABLES=True)
+    def test_unlogged_token_tables(self):
+        """
+        Ensure tokens are read from the primary when their tables are not replicated.
+        """
+        from .ide_test_compat import AccessToken, Application, CurrentAccessToken, RawToken
+
+        router = TokenRouter()
+        for model in (AccessToken, CurrentAccessToken, RawToken):
+            self.assertEqual(router.db_for_read(model), 'default')
+        self.assertEqual(router.db_for_read(Application), 'replica')
+
+    def test_relations_allowed(self):
+        from .ide_test_compat import AccessToken, Application, TestApplication
+
+        router = TokenRouter()
+        self.assertTrue(router.allow_relation(AccessToken(), Application()))
+        self.assertIsNone(router.allow_relation(AccessToken(), TestApplication()))
+
+
+class ReplicaFallbackTest(StandaloneAppTestCase):
+    """
+    A token missing or expired on the replica is looked up on the primary.
+    """
+
+    @patch('oauth2_client.storage.router.db_for_read', return_value='replica')
+    @patch('oauth2_client.storage.query_token')
+    def test_missing_on_replica(self, mock_query_token, _):
+        from .ide_test_compat import AccessToken, ApplicationFactory
+        from oauth2_client.storage import load_token
+
+        primary_token = AccessToken(application=ApplicationFactory(), token='primary_token')
+        mock_query_token.side_effect = [None, primary_token]
+
+        self.assertEqual(load_token('app'), primary_token)
+        mock_query_token.assert_called_with('app', using='default')
+
+    @patch('oauth2_client.storage.router.db_for_read', return_value='replica')
+    @patch('oauth2_client.storage.query_token')
+    def test_expired_on_replica(self, mock_query_token, _):
+        from .ide_test_compat import AccessToken, ApplicationFactory
+        from oauth2_client.storage import load_token
+
+        app = ApplicationFactory()
+        replica_token = AccessToken(application=app, token='stale_token', expires=timezone.now())
+        primary_token = AccessToken(application=app, token='fresh_token', expires=timezone.now() + timedelta(hours=1))
+        mock_query_token.side_effect = [replica_token, primary_token]
+
+        self.assertEqual(load_token(app.name), primary_token)
+
+    @patch('oauth2_client.storage.query_token')
+    def test_no_replica(self, mock_query_token):
+        """
+        Without a replica configured, the primary is queried only once.
+        """
+        from oauth2_client.storage import load_token
+
+        mock_query_token.return_value = None
+        self.assertIsNone(load_token('app'))
+        mock_query_token.assert_called_once_with('app')
@@ -0,0 +1,142 @@
+"""
+Token storage modes tests.
+"""
+from datetime import timedelta
+
+from django.test import override_settings
+from django.utils import timezone
+
+from test_case import StandaloneAppTestCase
+from .test_compat import patch
+
+
+def provider_token(app, token):
+    """
+    A valid, unsaved token, like the one returned by a Fetcher.
+    """
+    from .ide_test_compat import AccessToken
+
+    return AccessToken(
+        application=app,
+        token=token,
+        token_type='Bearer',
+        expires=timezone.now() + timedelta(seconds=AccessToken.TIMEOUT_SECONDS + 10),
+    )
+
+
+@override_settings(OAUTH2_CLIENT_TOKEN_STORAGE='current')
+class CurrentTokenStorageTest(StandaloneAppTestCase):
+    """
+    `current` token storage mode: one token row per Application, updated in place.
+    """
+
+    @patch('oauth2_client.client.fetch_token')
+    def test_token_replaced_in_place(self, fetch_token_mock):
+        """
+        Ensure refreshing a token updates the one current token row and
+        doesn't add any rows to the history table.
+        """
+        from .ide_test_compat import AccessToken, ApplicationFactory, CurrentAccessToken, get_client
+        from oauth2_client.client import fetch_and_store_token
+
+        app = ApplicationFactory()
+        fetch_token_mock.return_value = provider_token(app, 'first_token')
+        self.assertEqual(get_client(app.name).token['access_token'], 'first_token')
+
+        fetch_token_mock.return_value = provider_token(app, 'second_token')
+        fetch_and_store_token(app)
+
+        self.assertEqual(CurrentAccessToken.objects.get().token, 'second_token')
+        self.assertEqual(get_client(app.name).token['access_token'], 'second_token')
+        self.assertFalse(AccessToken.objects.exists())
+        self.assertEqual(fetch_token_mock.call_count, 2)
+
+    @override_settings(OAUTH2_CLIENT_TOKEN_HISTORY=True)
+    @patch('oauth2_client.client.fetch_token')
+    def test_token_history(self, fetch_token_mock):
+        """
+        Ensure every fetched token is appended to the history table, when requested.
+        """
+        from .ide_test_compat import AccessToken, ApplicationFactory, CurrentAccessToken
+        from oauth2_client.client import fetch_and_store_token
+
+        app = ApplicationFactory()
+        for token in ('first_token', 'second_token'):
+            fetch_token_mock.return_value = provider_token(app, token)
+            fetch_and_store_token(app)
+
+        self.assertEqual(CurrentAccessToken.objects.get().token, 'second_token')
+        self.assertEqual(
+            ['first_token', 'second_token'],
+            list(AccessToken.objects.order_by('created').values_list('token', flat=True))
+        )
+
+    def test_older_token_not_stored(self):
+        """
+        Ensure a refresh finishing after a newer one doesn't overwrite its token.
+        """
+        from .ide_test_compat import ApplicationFactory, CurrentAccessToken
+        from oauth2_client.storage import upsert_current_token
+
+        app = ApplicationFactory()
+        older = provider_token(app, 'older_token')
+        newer = provider_token(app, 'newer_token')
+        newer.expires += timedelta(seconds=1)
+
+        self.assertEqual('newer_token', upsert_current_token(newer).token)
+        self.assertEqual('newer_token', upsert_current_token(older).token)
+        self.assertEqual('newer_token', CurrentAccessToken.objects.get().token)
+
+    @patch('oauth2_client.client.fetch_token')
+    def test_expired_current_token(self, fetch_token_mock):
+        """
+        Ensure an expired current token gets refreshed.
+        """
+        from .ide_test_compat import ApplicationFactory, CurrentAccessToken, get_client
+
+        app = ApplicationFactory()
+        CurrentAccessToken.objects.create(
+            application=app, token='expired_token', token_type='Bearer', expires=timezone.now()
+        )
+        fetch_token_mock.return_value = provider_token(app, 'valid_token')
+
+        self.assertEqual(get_client(app.name).token['access_token'], 'valid_token')
+        self.assertEqual(CurrentAccessToken.objects.get().token, 'valid_token')
+
+
+class RawTokenStorageTest(StandaloneAppTestCase):
+    """
+    Raw provider payloads are stored apart from the tokens, only when sampled.
+    """
+
+    def fetched_token(self, app):
+        """
+        Unsaved token carrying the raw provider payload, as returned by a Fetcher.
+        """
+        token = provider_token(app, 'some_token')
+        token.raw_token = {'access_token': 'some_token', 'token_type': 'Bearer'}
+        return token
+
+    def test_raw_token_not_stored_by_default(self):
+        """
+        Ensure raw payloads are not stored unless asked to.
+        """
+        from .ide_test_compat import ApplicationFactory, RawToken
+        from oauth2_client.storage import store_token
+
+        store_token(self.fetched_token(ApplicationFactory()))
+        self.assertFalse(RawToken.objects.exists())
+
+    @override_settings(OAUTH2_CLIENT_RAW_TOKEN_SAMPLE_RATE=1.0)
+    def test_raw_token_stored(self):
+        """
+        Ensure sampled raw payloads end up in the side table.
+        """
+        from .ide_test_compat import ApplicationFactory, RawToken
+        from oauth2_client.storage import store_token
+
+        app = ApplicationFactory()
+        store_token(self.fetched_token(app))
+        raw_token = RawToken.objects.get()
+        self.assertEqual(raw_token.application, app)
+        self.assertEqual(raw_token.raw_token['access_token'], 'some_token')
@@ -0,0 +1,77 @@
+"""
+Default timeouts tests.
+"""
+import os
+
+import requests_mock
+from django.test import override_settings
+
+from oauth2_client.timeouts import request_timeout, token_timeout
+from test_case import ClientTestCase, StandaloneAppTestCase
+
+TOKEN_RESPONSE = {'access_token': 'new-token', 'token_type': 'Bearer', 'expires_in': 3600}
+
+
+class TimeoutsTest(StandaloneAppTestCase):
+    """
+    Timeouts from the settings and the `extra_settings` of the Applications.
+    """
+
+    def test_defaults(self):
+        from .ide_test_compat import ApplicationFactory
+
+        app = ApplicationFactory()
+        self.assertEqual((5.0, 30.0), request_timeout(app))
+        self.assertEqual((5.0, 15.0), token_timeout(app))
+
+    @override_settings(OAUTH2_CLIENT_REQUEST_CONNECT_TIMEOUT=1, OAUTH2_CLIENT_TOKEN_READ_TIMEOUT=None)
+    def test_per_app(self):
+        from .ide_test_compat import ApplicationFactory
+
+        app = ApplicationFactory(extra_settings={'read_timeout': 60, 'token_connect_timeout': 2})
+        self.assertEqual((1, 60), request_timeout(app))
+        self.assertEqual((2, None), token_timeout(app))
+        app.extra_settings = {'connect_timeout': None, 'read_timeout': None}
+        self.assertIsNone(request_timeout(app))
+
+
+class OutboundTimeoutsTest(ClientTestCase):
+    """
+    Timeouts of the requests made by the clients and the fetchers.
+    """
+
+    @requests_mock.Mocker()
+    def test_client(self, mock_response):
+        client = self.make_client(read_timeout=60)
+        mock_response.get('https://some-api.com/api/hello', json={})
+        client.get('/api/hello')
+        self.assertEqual((5.0, 60), mock_response.last_request.timeout)
+        client.get('/api/hello', timeout=2)
+        self.assertEqual(2, mock_response.last_request.timeout)
+        client.get('/api/hello', timeout=None)
+        self.assertIsNone(mock_response.last_request.timeout)
+
+    @requests_mock.Mocker()
+    def test_client_credentials_fetcher(self, mock_response):
+        from oauth2_client.fetcher import fetch_token
+
+        app = self.make_app(
+            authorization_grant_type='client-credentials', token_uri='https://auth.some-api.com/o/token/',
+            extra_settings={'token_read_timeout': 3},
+        )
+        mock_response.post(app.token_uri, json=TOKEN_RESPONSE)
+        fetch_token(app)
+        self.assertEqual((5.0, 3), mock_response.last_request.timeout)
+
+    @requests_mock.Mocker()
+    def test_jwt_fetcher(self, mock_response):
+        from oauth2_client.fetcher import fetch_token
+
+        app = self.make_app(
+            authorization_grant_type='jwt-bearer', token_uri='https://test.salesforce.com/services/oauth2/token',
+            client_secret=os.path.join(os.path.dirname(os.path.abspath(__file__)), 'resources', 'test.key'),
+            extra_settings={'subject': 'xyz@abx.com.lightning', 'token_connect_timeout': 1},
+        )
+        mock_response.post(app.token_uri, json=TOKEN_RESPONSE)
+        fetch_token(app)
+        self.assertEqual((1, 15.0), mock_response.last_request.timeout)
@@ -0,0 +1,68 @@
+"""
+Token value tests.
+"""
+from datetime import datetime, timedelta
+
+import pytz
+
+from tests.test_compat import patch
+from test_case import StandaloneAppTestCase
+
+
+class TokenValueTest(StandaloneAppTestCase):
+    """
+    TokenValue behaves like the token it was created from.
+    """
+
+    def test_from_token(self):
+        """
+        Ensure TokenValue gets transformed to the same dict as the token model.
+        """
+        from .ide_test_compat import AccessTokenFactory, ApplicationFactory
+        from oauth2_client.tokens import TokenValue
+
+        now = datetime(1970, 1, 1, 0, 0, tzinfo=pytz.UTC)
+        token = AccessTokenFactory(
+            token="this-is-token",
+            token_type="bearer",
+            expires=now + timedelta(hours=1),
+            scope='read write',
+            application=ApplicationFactory()
+        )
+        with patch('oauth2_client.tokens.timezone.now', return_value=now), \
+                patch('oauth2_client.tokens.monotonic', return_value=100.0):
+            value = TokenValue.from_token(token)
+            self.assertEqual(value.deadline, 3700.0)
+            self.assertEqual(value.app_key, token.application.name)
+            self.assertEqual(value.to_client_dict(), {
+                'expires_in': 3600,
+                'access_token': 'this-is-token',
+                'token_type': 'bearer',
+                'scope': 'read write'
+            })
+
+    def test_is_expired(self):
+        """
+        Ensure the TIMEOUT_SECONDS margin applies, and tokens without expiry info never expire.
+        """
+        from oauth2_client.tokens import TokenValue
+
+        value = TokenValue('token', 'Bearer', '', 1000.0, 'app')
+        with patch('oauth2_client.tokens.monotonic', return_value=939.0):
+            self.assertFalse(value.is_expired())
+        with patch('oauth2_client.tokens.monotonic', return_value=940.0):
+            self.assertTrue(value.is_expired())
+
+        value = TokenValue('token', 'Bearer', '', None, 'app')
+        self.assertFalse(value.is_expired())
+        self.assertIsNone(value.expires_in())
+        self.assertNotIn('expires_in', value.to_client_dict())
+
+    def test_immutable(self):
+        from oauth2_client.tokens import TokenValue
+
+        value = TokenValue('token', 'Bearer', '', None, 'app')
+        with self.assertRaises(AttributeError):
+            value.access_token = 'other'
+        with self.assertRaises(AttributeError):
+            value.other = 'other'
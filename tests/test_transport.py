@@ -0,0 +1,147 @@
+"""
+Compatibility tests of the client transports: the same requests made with `requests`,
+in lean mode and with the urllib3 transport give the same responses.
+"""
+import requests
+from ddt import data, ddt, unpack
+from django.test import override_settings
+
+from test_case import ClientTestCase
+from .http_server import TestServer
+from .test_compat import patch
+
+# (transport, lean) of the clients compared to the regular `requests` client
+VARIANTS = [('requests', True), ('urllib3', False)]
+
+# headers set by the client, expected to be sent the same way by all the transports
+SENT_HEADERS = ('authorization', 'accept', 'accept-encoding', 'content-type', 'content-length', 'x-custom')
+
+
+def summary(response):
+    """
+    The parts of a response expected to be the same, whatever the transport.
+    """
+    result = {
+        'status_code': response.status_code,
+        'ok': response.ok,
+        'url': response.url,
+        'content-type': response.headers.get('content-type'),
+        'json': response.json(),
+    }
+    if 'headers' in result['json']:
+        headers = result['json'].pop('headers')
+        result['sent_headers'] = {name: headers.get(name) for name in SENT_HEADERS}
+    return result
+
+
+@ddt
+# JSON bodies are compared byte for byte, so encode them as `requests` does
+@override_settings(OAUTH2_CLIENT_JSON_CODEC='json')
+class TransportCompatibilityTest(ClientTestCase):
+    """
+    Every request of the matrix is made by the regular client, and by a client of each other variant.
+    """
+    insecure_transport = True
+
+    @classmethod
+    def setUpClass(cls):
+        super(TransportCompatibilityTest, cls).setUpClass()
+        cls.server = TestServer()
+        cls.server.start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.stop()
+        super(TransportCompatibilityTest, cls).tearDownClass()
+
+    def setUp(self):
+        super(TransportCompatibilityTest, self).setUp()
+        self.token = self.make_token()
+
+    def make_token(self, token='token', **app_fields):
+        from .ide_test_compat import AccessTokenFactory
+
+        return AccessTokenFactory(application=self.make_app(service_host=self.server.url, **app_fields), token=token)
+
+    def variant_client(self, transport='requests', lean=False, token=None):
+        """
+        Client of the token shared by the variants, unless another one is given.
+        """
+        from .ide_test_compat import OAuth2Client
+
+        return OAuth2Client(token or self.token, lean=lean, transport=transport)
+
+    @data(
+        ('GET', '/echo', {}),
+        ('GET', '/echo', {'params': {'a': [1, 2], 'b': 'x'}}),
+        ('GET', '/echo?x=1', {'params': {'a': 1}}),
+        ('GET', '/echo', {'headers': {'X-Custom': 'custom', 'Accept': 'application/json'}}),
+        ('POST', '/echo', {'json': {'a': 1, 'b': [1, 2]}}),
+        ('POST', '/echo', {'data': {'a': 'b', 'c': 'd'}}),
+        ('PUT', '/echo', {'data': 'raw body', 'headers': {'Content-Type': 'text/plain'}}),
+        ('PATCH', '/echo', {'json': {'a': None}, 'timeout': 5}),
+        ('DELETE', '/echo', {}),
+        ('GET', '/status/404', {}),
+        ('GET', '/status/500', {}),
+        ('GET', '/redirect', {}),
+        ('GET', '/redirect', {'allow_redirects': False}),
+        ('GET', '/gzip', {}),
+    )
+    @unpack
+    def test_same_response(self, method, url, kwargs):
+        if url == '/redirect' and kwargs.get('allow_redirects') is False:
+            # no body to compare
+            expected = self.variant_client().request(method, url, **kwargs)
+            for transport, lean in VARIANTS:
+                actual = self.variant_client(transport, lean).request(method, url, **kwargs)
+                self.assertEqual(expected.status_code, actual.status_code)
+                self.assertEqual(expected.headers['Location'], actual.headers['Location'])
+            return
+        expected = summary(self.variant_client().request(method, url, **kwargs))
+        for transport, lean in VARIANTS:
+            actual = summary(self.variant_client(transport, lean).request(method, url, **kwargs))
+            self.assertEqual(expected, actual, '{} lean={}'.format(transport, lean))
+
+    @data(*VARIANTS)
+    @unpack
+    def test_raise_for_status(self, transport, lean):
+        with self.assertRaises(requests.HTTPError) as raised:
+            self.variant_client(transport, lean).get('/status/404').raise_for_status()
+        self.assertEqual(raised.exception.response.status_code, 404)
+
+    @data(*VARIANTS)
+    @unpack
+    def test_cookies_not_sent(self, transport, lean):
+        client = self.variant_client(transport, lean)
+        client.get('/cookie')
+        self.assertNotIn('cookie', client.get('/echo').json()['headers'])
+
+    @data(*VARIANTS)
+    @unpack
+    def test_read_timeout(self, transport, lean):
+        with self.assertRaises(requests.ReadTimeout):
+            self.variant_client(transport, lean).make_request('GET', self.server.url + '/slow', timeout=0.1)
+
+    @data(*VARIANTS)
+    @unpack
+    def test_connection_error(self, transport, lean):
+        with self.assertRaises(requests.ConnectionError):
+            self.variant_client(transport, lean).make_request('GET', 'http://127.0.0.1:1/echo')
+
+    @patch('oauth2_client.client.renew_token')
+    def test_jwt_expiry_detected(self, renew_token_mock):
+        """
+        Ensure the urllib3 transport detects the expired JWT token, and retries with the new one.
+        """
+        from .ide_test_compat import AccessTokenFactory, Application
+        from oauth2_client.tokens import TokenValue
+
+        token = self.make_token(
+            'expired-token', name='jwt_app', authorization_grant_type=Application.GRANT_JWT_BEARER
+        )
+        client = self.variant_client('urllib3', token=token)
+        renew_token_mock.return_value = TokenValue.from_token(AccessTokenFactory(application=client.app))
+        with patch.object(client, 'make_request', wraps=client.make_request) as mock_make_request:
+            client.get('/jwt-invalid')
+        self.assertEqual(mock_make_request.call_count, 2)
+        renew_token_mock.assert_called_once_with(client.app, 'expired-token')
@@ -0,0 +1,65 @@
+"""
+Tests for the opt-in UNLOGGED token tables migration and command.
+"""
+from importlib import import_module
+
+from django.apps import apps
+from django.core.management import call_command
+from django.db import connection
+from django.test import override_settings
+
+from test_case import StandaloneAppTestCase
+
+migration = import_module('oauth2_client.migrations.0006_unlogged_token_tables')
+
+
+def table_persistence(table):
+    """
+    PostgreSQL persistence of a table: `p` for permanent, `u` for unlogged.
+    """
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT relpersistence FROM pg_class WHERE relname = %s", [table])
+        return cursor.fetchone()[0]
+
+
+class UnloggedTokenTablesTest(StandaloneAppTestCase):
+    """
+    Token tables become UNLOGGED only when the setting asks for it.
+    """
+
+    def token_tables_persistence(self):
+        return {
+            table_persistence(apps.get_model('oauth2_client', model_name)._meta.db_table)
+            for model_name in migration.TOKEN_TABLES
+        }
+
+    def test_tables_logged_by_default(self):
+        """
+        Ensure the migration leaves the tables alone by default.
+        """
+        with connection.schema_editor() as schema_editor:
+            migration.set_unlogged(apps, schema_editor)
+        self.assertEqual(self.token_tables_persistence(), {'p'})
+
+    @override_settings(OAUTH2_CLIENT_UNLOGGED_TOKEN_TABLES=True)
+    def test_tables_unlogged(self):
+        """
+        Ensure the tables are switched to UNLOGGED, and back when the migration is reverted.
+        """
+        with connection.schema_editor() as schema_editor:
+            migration.set_unlogged(apps, schema_editor)
+        self.assertEqual(self.token_tables_persistence(), {'u'})
+
+        with connection.schema_editor() as schema_editor:
+            migration.set_logged(apps, schema_editor)
+        self.assertEqual(self.token_tables_persistence(), {'p'})
+
+    def test_command(self):
+        """
+        Ensure the command switches the tables as the setting is toggled.
+        """
+        with override_settings(OAUTH2_CLIENT_UNLOGGED_TOKEN_TABLES=True):
+            call_command('oauth2client_token_tables')
+        self.assertEqual(self.token_tables_persistence(), {'u'})
+        call_command('oauth2client_token_tables')
+        self.assertEqual(self.token_tables_persistence(), {'p'})